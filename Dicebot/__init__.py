@@ -31,8 +31,7 @@
 Dice bot
 """
 
-import supybot
-import supybot.world as world
+import sys
 
 # Use this for the version of this plugin.  You may wish to put a CVS keyword
 # in here if you're keeping the plugin in CVS or some similar system.
@@ -44,23 +43,54 @@ __author__ = "Andrey Rahmatullin <wrar@wrar.name>"
 # contributions.
 __contributors__ = {}
 
-from . import config
-from . import plugin
-from . import deck
-from . import money
-from imp import reload
-# In case we're being reloaded.
-reload(deck)
-reload(money)
-reload(plugin) 
-# Add more reloads here if you add third-party modules and want them to be
-# reloaded when this plugin is reloaded.  Don't forget to import them as well!
+# The bot and supybot-test set up supybot.conf before loading the plugin. The
+# dice engine (engine.py) and its command line interface (cli.py) work without
+# supybot, importing it there would log to stdout and create the bot
+# directories in the current one.
+if 'supybot.conf' in sys.modules:
+    import supybot.world as world
+    from . import config
+    from . import plugin
+    from . import budget
+    from . import deck
+    from . import expression
+    from . import engine
+    from . import formatter
+    from . import history
+    from . import audit
+    from . import macros
+    from . import metrics
+    from . import profiling
+    from . import rollpool
+    from . import stats
+    from imp import reload
+    # In case we're being reloaded.
+    reload(budget)
+    reload(deck)
+    reload(expression)
+    reload(engine)
+    reload(formatter)
+    reload(history)
+    reload(audit)
+    reload(macros)
+    reload(metrics)
+    reload(profiling)
+    reload(rollpool)
+    reload(stats)
+    # These are imported by the plugin on first use, only reload them if they
+    # were.
+    for name in ('money', 'sevenSea2EdRaiseRoller', 'simulation'):
+        if __name__ + '.' + name in sys.modules:
+            reload(sys.modules[__name__ + '.' + name])
+    reload(plugin)
+    # Add more reloads here if you add third-party modules and want them to be
+    # reloaded when this plugin is reloaded.  Don't forget to import them as well!
 
-if world.testing:
-    from . import test
+    if world.testing:
+        from . import test
 
-Class = plugin.Class
-configure = config.configure
+    Class = plugin.Class
+    configure = config.configure
 
 
 # vim:set shiftwidth=4 tabstop=8 expandtab textwidth=78:
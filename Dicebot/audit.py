@@ -0,0 +1,198 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+"""
+Verifiable audit log of rolls.
+
+Every audited roll draws its dice from a generator seeded with the HMAC of a
+secret key and a counter (see Seeder). AuditLog only writes the counter, the
+expression and the totals of the roll, so an entry takes the same space
+however many dice were rolled; verify() rolls the expression again from the
+same seed and checks the totals, and can show all the dice:
+
+    python -m Dicebot.audit [--dice] KEY_FILE LOG_FILE
+"""
+
+import argparse
+import hashlib
+import hmac
+import os
+import random
+import struct
+import sys
+
+from .history import HistoryLog, packEntry, readEntry
+
+COUNTER = struct.Struct('<Q')
+
+# counters reserved on disk at once, so that restarts never reuse them
+BLOCK = 10000
+
+
+def deriveSeed(key, counter):
+    """
+    Return the seed of roll number counter, HMAC-SHA256 of the counter with
+    key.
+    """
+    digest = hmac.new(key, COUNTER.pack(counter), hashlib.sha256).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class Seeder:
+    """
+    Source of roll counters from start on and the generators of their seeds.
+    """
+
+    def __init__(self, key, start=0):
+        self.key = key
+        self.counter = start
+
+    def next(self):
+        counter = self.counter
+        self.counter += 1
+        return counter
+
+    def rng(self, counter):
+        return random.Random(deriveSeed(self.key, counter))
+
+
+def loadKey(filename):
+    """
+    Return the secret key kept in filename, creating it if there is none.
+    """
+    try:
+        with open(filename, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    key = os.urandom(32)
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    return key
+
+
+class AuditLog(HistoryLog):
+    """
+    History log of audited rolls, each entry preceded by the counter of its
+    seed.
+
+    The key is kept in filename.key. reserve() hands out counters, the next
+    unreserved block of them is saved in filename.next before they are used,
+    so counters are never reused, only skipped after a restart.
+    """
+
+    def __init__(self, filename, maxBuffer=1 << 20):
+        super(AuditLog, self).__init__(filename, maxBuffer)
+        self.key = loadKey(filename + '.key')
+        try:
+            with open(filename + '.next') as f:
+                self.counter = int(f.read())
+        except FileNotFoundError:
+            self.counter = 0
+        self.limit = self.counter
+
+    def reserve(self, count):
+        """
+        Return a Seeder of count counters not used before.
+        """
+        with self.lock:
+            start = self.counter
+            self.counter += count
+            if self.counter > self.limit:
+                self.limit = self.counter + BLOCK
+                with open(self.filename + '.next.tmp', 'w') as f:
+                    f.write(str(self.limit))
+                os.replace(self.filename + '.next.tmp',
+                           self.filename + '.next')
+        return Seeder(self.key, start)
+
+    def add(self, when, channel, nick, record, maxValues=32):
+        self._append(COUNTER.pack(record.seed) +
+                     packEntry(when, channel, nick, record, maxValues))
+
+
+def readAudit(f):
+    """
+    Yield (counter, Entry) pairs of an audit log opened in binary mode.
+    """
+    while True:
+        data = f.read(COUNTER.size)
+        if len(data) < COUNTER.size:
+            return
+        yield (COUNTER.unpack(data)[0], readEntry(f))
+
+
+def verify(entries, key, engine=None):
+    """
+    Roll the (counter, Entry) pairs of an audit log again, yield for each
+    the counter, the entry, the new record (None if the expression no longer
+    rolls) and whether its totals match the logged ones.
+    """
+    from .engine import DiceEngine
+    engine = engine or DiceEngine()
+    for (counter, entry) in entries:
+        engine.seeder = Seeder(key, counter)
+        try:
+            records = engine.evaluate(entry.expression, [entry.system])
+        finally:
+            engine.seeder = None
+        record = records[0] if len(records) == 1 else None
+        ok = record is not None and \
+            list(record.totals[:len(entry.values)]) == entry.values
+        yield (counter, entry, record, ok)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m Dicebot.audit',
+                                     description='Verify an audit log of rolls.')
+    parser.add_argument('key', help='file with the secret key')
+    parser.add_argument('log', help='audit log file')
+    parser.add_argument('--dice', action='store_true',
+                        help='show every roll with its dice')
+    args = parser.parse_args(argv)
+
+    from .formatter import render
+    with open(args.key, 'rb') as f:
+        key = f.read()
+    failed = 0
+    with open(args.log, 'rb') as f:
+        for (counter, entry, record, ok) in verify(readAudit(f), key):
+            failed += not ok
+            line = '%d %s %s %s: %s' % (counter, entry.channel, entry.nick,
+                                        entry.expression,
+                                        'ok' if ok else 'MISMATCH')
+            if args.dice and record is not None:
+                line += ' ' + render(record)
+            print(line)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
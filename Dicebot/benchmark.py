@@ -0,0 +1,439 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+"""
+Benchmarks of the plugin import, the roll parsers and formatters, the dice
+primitives, messages repeating expressions (also counting their dice or
+auditing them), roll macros, the expression matching, the auto-roll settings
+lookup, the 7th Sea 2ed raise roller and its simulation, the roll history,
+the deck and the money converter.
+
+Run as python -m Dicebot.benchmark, no IRC server or network is needed: the
+plugin gets a fake irc object and currency rates come from a stub requester.
+Results are written as JSON and can be compared with a saved baseline:
+
+    python -m Dicebot.benchmark --output baseline.json
+    python -m Dicebot.benchmark --baseline baseline.json --threshold 0.2
+
+The exit status is 1 if any benchmark got slower than the threshold allows.
+"""
+
+import argparse
+import importlib
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import timeit
+
+from .deck import Deck
+from .engine import DiceEngine
+from .expression import Count, Explode, Keep, Reroll, Roll, Sum
+from .formatter import render
+from .money import MoneyConverter
+from .sevenSea2EdRaiseRoller import SevenSea2EdRaiseRoller
+
+PARSER_SAMPLES = [
+    ('rollReStandard', '_parseStandardRoll', '3#2d6+1d4+2'),
+    ('rollReSR', '_parseShadowrunRoll', '12#sd'),
+    ('rollReSRX', '_parseShadowrunXRoll', '12#sdx'),
+    ('rollReSRE', '_parseShadowrunExtRoll', '12,10#sde'),
+    ('rollRe7Sea', '_parse7SeaRoll', '3#6k3+2'),
+    ('rollRe7Sea2ed', '_parse7Sea2edRoll', '8s3l1ex'),
+    ('rollReWoD', '_parseWoDRoll', '8w9'),
+    ('rollReDH', '_parseDHRoll', '3vs(40+10)'),
+    ('rollReWG', '_parseWGRoll', '8#wg'),
+]
+
+EXPRESSION_SAMPLES = ['4d6kh3', '10d10!>=8', '2d20kl1', '8d6r<=2!', '1000d6']
+
+# plans of the shared primitives, as the parsers build them
+PLAN_SAMPLES = [
+    ('roll', (Roll(1000, 6), Sum())),
+    ('count', (Roll(1000, 6), Count(5))),
+    ('explode', (Roll(1000, 10), Explode(8, False), Count(8))),
+    ('compound', (Roll(1000, 10), Explode(10, True), Sum())),
+    ('reroll', (Roll(1000, 6), Reroll(2, False), Sum())),
+    ('keep', (Roll(1000, 6), Keep(500, True), Sum())),
+]
+
+POOL_SIZES = [1, 5, 10, 20, 30]
+
+CHANNELS = 5000
+
+# the bot has these loaded long before it loads plugins
+IMPORT_PRELOAD = ('import supybot.callbacks, supybot.commands, supybot.conf, '
+                  'supybot.ircmsgs, supybot.schedule')
+
+CHAT_LINE = 'ok I attack the orc with my sword, 1d20+5 to hit and 2d6+3 damage'
+
+# a full round of attacks, rolled as one message
+REPEATED_LINE = ' '.join(['1d20+7'] * 24 + ['2d6+4'] * 24 + ['8w'] * 12)
+
+# the expressions of a typical attack macro
+MACRO_LINE = '1d20+7 2d6+4 1d8'
+
+
+class FakeIrc:
+    """
+    Just enough of an Irc object to create the plugin and collect replies.
+    """
+    network = 'benchmark'
+    nick = 'dicebot'
+
+    def __init__(self):
+        self.replies = []
+
+    def isChannel(self, channel):
+        return channel.startswith('#')
+
+    def reply(self, s, *args, **kwargs):
+        self.replies.append(s)
+
+    def error(self, s, *args, **kwargs):
+        self.replies.append('Error: ' + s)
+
+
+class StubRequester:
+    """
+    HttpRequester replacement answering every pair with the same rate.
+    """
+
+    def __init__(self, rate=1.5):
+        self.rate = rate
+        self.query_count = 0
+
+    def request(self, query):
+        self.query_count += 1
+        return {query: self.rate}
+
+
+def measure(function, repeat=5):
+    """
+    Return the best time of a single call of function, in seconds.
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def import_time(module, preload=IMPORT_PRELOAD):
+    """
+    Return the time of importing module in a new interpreter, after running
+    the preload statement.
+    """
+    code = ('{0}\nimport time\nstart = time.perf_counter()\nimport {1}\n'
+            'print("import-time", time.perf_counter() - start)'.format(preload, module))
+    path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [path, env.get('PYTHONPATH')]))
+    output = subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            universal_newlines=True).stdout
+    for line in output.splitlines():
+        if line.startswith('import-time '):
+            return float(line.split()[1])
+    raise RuntimeError('no import time in the output of ' + module)
+
+
+def import_cases():
+    def plugin():
+        return import_time(__package__ + '.plugin')
+    # timed as a whole, a module is only imported once per interpreter
+    plugin.measured = True
+    yield ('import.plugin', plugin)
+
+
+def parser_cases():
+    engine = DiceEngine()
+    for (regex, parser, text) in PARSER_SAMPLES:
+        m = getattr(engine, regex).match(text)
+        yield ('parser.' + parser, lambda p=getattr(engine, parser), m=m: p(m))
+
+
+def expression_cases():
+    engine = DiceEngine()
+    for text in EXPRESSION_SAMPLES:
+        m = engine.rollReStandard.match(text)
+        yield ('expression.' + text,
+               lambda p=engine._parseStandardRoll, m=m: p(m))
+    for (name, ops) in PLAN_SAMPLES:
+        yield ('plan.' + name, lambda ops=ops: engine._execute(ops))
+
+
+def repeat_cases():
+    engine = DiceEngine()
+    words = REPEATED_LINE.split()
+    yield ('repeat.message', lambda: engine.evaluate(REPEATED_LINE))
+    # every word matched, parsed and rolled on its own
+    yield ('repeat.wordwise',
+           lambda: [engine.evaluate(word) for word in words])
+
+
+def audit_cases():
+    from .audit import Seeder
+
+    def audited():
+        engine.seeder = Seeder(b'key')
+        try:
+            return engine.evaluate(REPEATED_LINE)
+        finally:
+            engine.seeder = None
+    engine = DiceEngine()
+    # the same message with every roll drawn from its own audit seed
+    yield ('audit.message', audited)
+
+
+def macro_cases():
+    from .macros import MacroStore
+    engine = DiceEngine()
+    (matcher, checklist) = engine.checklist()
+    store = MacroStore()
+    store.set('nick', 'attack', MACRO_LINE)
+
+    def compiled():
+        matched = store.compiled('nick', 'attack', matcher, checklist,
+                                 engine.match)
+        return engine.rollPlans([(word, candidates)
+                                 for (word, candidates, dice) in matched])
+    yield ('macro.compiled', compiled)
+    # the same expressions typed in a message
+    yield ('macro.parsed', lambda: engine.evaluate(MACRO_LINE))
+
+
+def stats_cases():
+    from .stats import Tally
+
+    def counted():
+        engine.tally = Tally()
+        try:
+            return engine.evaluate(REPEATED_LINE)
+        finally:
+            engine.tally = None
+    engine = DiceEngine()
+    # the same message with the faces counted for the dice statistics
+    yield ('stats.message', counted)
+
+
+def format_cases():
+    engine = DiceEngine()
+    for (regex, parser, text) in PARSER_SAMPLES:
+        m = getattr(engine, regex).match(text)
+        record = None
+        while record is None:
+            # Wrath & Glory rolls without icons give no record
+            record = getattr(engine, parser)(m)
+        yield ('format.' + parser, lambda r=record: render(r))
+
+
+def autoroll_cases(plugin, channels=CHANNELS):
+    import supybot.conf as conf
+    autoRoll = conf.supybot.plugins.Dicebot.autoRoll
+    names = ['#channel{0}'.format(i) for i in range(channels)]
+    for (i, name) in enumerate(names):
+        autoRoll.get(name).setValue(i % 2 == 0)
+    irc = FakeIrc()
+    cached = itertools.cycle(names)
+    yield ('autoroll.cached',
+           lambda: plugin._autoRollEnabled(irc, next(cached)))
+    # the lookup done for every message before the settings were cached
+    uncached = itertools.cycle(names)
+    yield ('autoroll.registry',
+           lambda: plugin.registryValue('autoRoll', next(uncached)))
+
+
+def match_words(matcher, checklist, words):
+    for word in words:
+        if matcher is None or matcher.match(word):
+            for (regex, parser, cost) in checklist:
+                regex.match(word)
+
+
+def matcher_cases(plugin):
+    import supybot.conf as conf
+    words = CHAT_LINE.split()
+    (matcher, checklist) = plugin._checklist(None)
+    # matching every word with every expression form, as before the matcher
+    yield ('matcher.unfiltered',
+           lambda: [regex.match(word) for word in words
+                    for (regex, parser, cost) in checklist])
+    yield ('matcher.all', lambda: match_words(matcher, checklist, words))
+    conf.supybot.plugins.Dicebot.systems.get('#standard').setValue(['standard'])
+    (standard, standardChecklist) = plugin._checklist('#standard')
+    yield ('matcher.standard',
+           lambda: match_words(standard, standardChecklist, words))
+
+
+def raise_cases():
+    roller = lambda x: [random.randint(1, 10) for _ in range(x)]
+    for skill in (1, 4):
+        raise_roller = SevenSea2EdRaiseRoller(roller, skill_rank=skill)
+        for size in POOL_SIZES:
+            yield ('raise.skill{0}.{1:02d}'.format(skill, size),
+                   lambda r=raise_roller, n=size: r.roll_and_count(n))
+
+
+def simulation_cases():
+    from .simulation import runChunk
+    yield ('simulate.8s3l1ex', lambda: runChunk('8s3l1ex', 100, 1))
+
+
+def history_cases():
+    from .engine import RollRecord
+    from .history import RollHistory
+    history = RollHistory(1000)
+    record = RollRecord('standard', '3#1d20+5', totals=[12, 20, 7])
+    yield ('history.append', lambda: history.append(0.0, 'nick', record))
+    yield ('history.last', lambda: history.last(5))
+
+
+def deck_cases():
+    deck = Deck()
+    yield ('deck.draw', lambda: next(deck))
+    yield ('deck.shuffle', deck.shuffle)
+
+
+def money_cases():
+    hit = MoneyConverter(StubRequester())
+    hit.convert(10, 'USD', ['EUR'])
+    yield ('money.hit', lambda: hit.convert(10, 'USD', ['EUR']))
+    # nothing is ever kept in an empty cache, so every lookup is a miss
+    miss = MoneyConverter(StubRequester(), cache_size=0)
+    yield ('money.miss', lambda: miss.convert(10, 'USD', ['EUR']))
+
+
+def cases(plugin=None):
+    """
+    Yield (name, function) pairs to benchmark. Matcher and settings
+    benchmarks need a plugin instance.
+    """
+    yield from parser_cases()
+    yield from format_cases()
+    yield from expression_cases()
+    yield from repeat_cases()
+    yield from stats_cases()
+    yield from macro_cases()
+    yield from audit_cases()
+    if plugin is not None:
+        yield from autoroll_cases(plugin)
+        yield from matcher_cases(plugin)
+    yield from import_cases()
+    yield from raise_cases()
+    yield from simulation_cases()
+    yield from history_cases()
+    yield from deck_cases()
+    yield from money_cases()
+
+
+def run(cases, repeat=5, pattern=None, seed=0):
+    """
+    Benchmark the cases whose names contain pattern and return a dict of
+    seconds per call by name.
+    """
+    results = {}
+    for (name, function) in cases:
+        if pattern and pattern not in name:
+            continue
+        random.seed(seed)
+        if getattr(function, 'measured', False):
+            results[name] = min(function() for _ in range(repeat))
+        else:
+            results[name] = measure(function, repeat)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Return (name, old, new) for every result slower than its baseline by
+    more than threshold (a fraction of the baseline time).
+    """
+    return [(name, baseline[name], seconds)
+            for (name, seconds) in sorted(results.items())
+            if name in baseline and seconds > baseline[name] * (1 + threshold)]
+
+
+def report(results, baseline=None, out=sys.stdout):
+    for (name, seconds) in sorted(results.items()):
+        line = '{0:<32} {1:>12.2f} us'.format(name, seconds * 1e6)
+        if baseline and name in baseline:
+            line += ' {0:>+8.1%}'.format(seconds / baseline[name] - 1)
+        print(line, file=out)
+
+
+def make_plugin():
+    # the package only loads the configuration in the bot, the plugin reads
+    # its values from the registry
+    importlib.import_module('.config', __package__)
+    from .plugin import Dicebot
+    return Dicebot(FakeIrc())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m Dicebot.benchmark',
+                                     description='Benchmark Dicebot hot paths.')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare with results in this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown against the baseline (default 0.2)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='timing repetitions, the best one is kept (default 5)')
+    parser.add_argument('--filter', help='only run benchmarks containing this string')
+    args = parser.parse_args(argv)
+
+    plugin = make_plugin()
+    try:
+        results = run(cases(plugin), args.repeat, args.filter)
+    finally:
+        plugin.die()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    report(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'results': results},
+                      f, indent=2, sort_keys=True)
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        for (name, old, new) in regressions:
+            print('{0} regressed: {1:.2f} us -> {2:.2f} us'.format(
+                name, old * 1e6, new * 1e6), file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
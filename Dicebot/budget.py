@@ -0,0 +1,144 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to capacity tokens, refilled at rate tokens per
+    second.
+    """
+
+    def __init__(self, capacity, rate, now=None):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic() if now is None else now
+
+    def level(self, now):
+        """
+        Refill the bucket for the time passed and return the available tokens.
+        """
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+        return self.tokens
+
+    def consume(self, amount, now):
+        self.level(now)
+        self.tokens -= amount
+
+
+class WorkBudget:
+    """
+    Dice budgets for a single message, per user and per channel.
+
+    A message may draw at most message_limit dice. Every user and every
+    channel has a token bucket of dice, which limits the sustained rate of
+    rolling. Idle full buckets are dropped once there are more than max_keys
+    of them. The buckets are only changed under the lock; messages checked
+    at the same time may both get the same allowance, the buckets then go
+    below zero and the next messages wait longer.
+    """
+
+    def __init__(self, message_limit, user_capacity, user_rate,
+                 channel_capacity, channel_rate, max_keys=1000):
+        self.message_limit = message_limit
+        self.user_capacity = user_capacity
+        self.user_rate = user_rate
+        self.channel_capacity = channel_capacity
+        self.channel_rate = channel_rate
+        self.max_keys = max_keys
+        self.users = {}
+        self.channels = {}
+        self.rejected_tokens = 0
+        self.rejected_dice = 0
+        self.truncated_messages = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _bucket(buckets, key, capacity, rate, now):
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(capacity, rate, now)
+        else:
+            bucket.capacity = capacity
+            bucket.rate = rate
+        return bucket
+
+    def _prune(self, buckets, now):
+        if len(buckets) > self.max_keys:
+            for key in [k for (k, v) in buckets.items()
+                        if v.level(now) >= v.capacity]:
+                del buckets[key]
+
+    def allowance(self, user, channel, now=None):
+        """
+        Return how many dice the next message of user in channel may draw.
+        """
+        now = time.monotonic() if now is None else now
+        allowance = self.message_limit
+        with self.lock:
+            if user is not None:
+                bucket = self._bucket(self.users, user, self.user_capacity,
+                                      self.user_rate, now)
+                allowance = min(allowance, bucket.level(now))
+            if channel is not None:
+                bucket = self._bucket(self.channels, channel,
+                                      self.channel_capacity, self.channel_rate,
+                                      now)
+                allowance = min(allowance, bucket.level(now))
+        return max(0, int(allowance))
+
+    def consume(self, user, channel, dice, now=None):
+        """
+        Charge dice drawn by a message of user in channel.
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if user is not None:
+                self._bucket(self.users, user, self.user_capacity,
+                             self.user_rate, now).consume(dice, now)
+                self._prune(self.users, now)
+            if channel is not None:
+                self._bucket(self.channels, channel, self.channel_capacity,
+                             self.channel_rate, now).consume(dice, now)
+                self._prune(self.channels, now)
+
+    def reject(self, tokens, dice):
+        """
+        Count work rejected from a single message.
+        """
+        with self.lock:
+            self.rejected_tokens += tokens
+            self.rejected_dice += dice
+            self.truncated_messages += 1
@@ -0,0 +1,113 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+"""
+Command line interface of the dice engine, it does not need supybot.
+
+    python -m Dicebot.cli [--json] [--systems standard,wod] < expressions
+
+Every line of the input is handled like a message the bot sees: all
+expressions in it are rolled. One line of output is written for every line
+of input, the results joined with '; ' (empty if there were none) or, with
+--json, a JSON object with the input and the list of results, each with its
+dice, totals and flags as well as its text. Lines are
+processed one at a time, so the input may be of any size.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from .engine import DiceEngine, SYSTEMS
+from .formatter import renderReply, toDict
+
+
+def run(lines, out, engine=None, systems=None, as_json=False):
+    """
+    Roll the expressions of every line and write the results to out.
+
+    Returns the number of lines processed.
+    """
+    engine = engine or DiceEngine()
+    count = 0
+    for line in lines:
+        line = line.rstrip('\r\n')
+        records = engine.evaluate(line, systems)
+        if as_json:
+            out.write(json.dumps({'input': line,
+                                  'results': [toDict(r) for r in records]},
+                                 ensure_ascii=False))
+        else:
+            out.write(renderReply(records))
+        out.write('\n')
+        count += 1
+    return count
+
+
+def parse_systems(value):
+    systems = [x for x in value.split(',') if x]
+    unknown = [x for x in systems if x not in SYSTEMS]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            'unknown systems: %s (known: %s)' % (', '.join(unknown), ', '.join(SYSTEMS)))
+    return systems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m Dicebot.cli',
+                                     description='Roll dice expressions read from stdin.')
+    parser.add_argument('--json', action='store_true',
+                        help='write JSON Lines instead of text')
+    parser.add_argument('--systems', type=parse_systems,
+                        help='comma-separated game systems to roll (default: all)')
+    parser.add_argument('--seed', type=int, help='seed the random generator')
+    parser.add_argument('--stats', action='store_true',
+                        help='report lines and dice per second to stderr')
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    engine = DiceEngine()
+    start = time.perf_counter()
+    try:
+        count = run(sys.stdin, sys.stdout, engine, args.systems, args.json)
+    except BrokenPipeError:
+        return 1
+    if args.stats:
+        elapsed = time.perf_counter() - start or float('inf')
+        print('%d lines, %d dice in %.2f s: %.0f lines/s, %.0f dice/s' % (
+            count, engine.diceDrawn, elapsed, count / elapsed,
+            engine.diceDrawn / elapsed), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
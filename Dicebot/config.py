@@ -29,6 +29,7 @@
 
 import supybot.conf as conf
 import supybot.registry as registry
+from .engine import SYSTEMS
 
 def configure(advanced):
     # This will be called by supybot to configure this module.  advanced is
@@ -38,6 +39,15 @@ def configure(advanced):
     conf.registerPlugin('Dicebot', True)
 
 
+class Systems(registry.SpaceSeparatedListOfStrings):
+    """Valid game systems are standard, shadowrun, 7sea, 7sea2ed, wod, dh and
+    wg."""
+    def setValue(self, v):
+        if any(system not in SYSTEMS for system in v):
+            self.error()
+        super(Systems, self).setValue(v)
+
+
 Dicebot = conf.registerPlugin('Dicebot')
 conf.registerChannelValue(Dicebot, 'autoRoll',
     registry.Boolean(False, """Determines whether the bot will automatically
@@ -45,5 +55,124 @@ conf.registerChannelValue(Dicebot, 'autoRoll',
 conf.registerGlobalValue(Dicebot, 'autoRollInPrivate',
     registry.Boolean(False, """Determines whether the bot will automatically
     roll the dice it sees in private messages."""))
+conf.registerChannelValue(Dicebot, 'systems',
+    Systems(SYSTEMS, """Determines which game systems the bot rolls in the
+    channel, both automatically and with the roll command. Known systems are
+    standard, shadowrun, 7sea, 7sea2ed, wod, dh and wg."""))
+
+conf.registerGroup(Dicebot, 'budget')
+conf.registerGlobalValue(Dicebot.budget, 'messageDice',
+    registry.PositiveInteger(50000, """Determines how many dice a single
+    message may roll. Expressions above this limit are skipped."""))
+conf.registerGlobalValue(Dicebot.budget, 'userDice',
+    registry.PositiveInteger(100000, """Determines how many dice a user may
+    roll in a burst."""))
+conf.registerGlobalValue(Dicebot.budget, 'userDicePerSecond',
+    registry.PositiveInteger(10000, """Determines how many dice per second
+    a user may roll after exhausting the burst."""))
+conf.registerGlobalValue(Dicebot.budget, 'channelDice',
+    registry.PositiveInteger(200000, """Determines how many dice may be
+    rolled in a channel in a burst."""))
+conf.registerGlobalValue(Dicebot.budget, 'channelDicePerSecond',
+    registry.PositiveInteger(20000, """Determines how many dice per second
+    may be rolled in a channel after exhausting the burst."""))
+
+conf.registerGroup(Dicebot, 'pool')
+conf.registerGlobalValue(Dicebot.pool, 'workers',
+    registry.NonNegativeInteger(2, """Determines how many expensive rolls
+    may run in worker processes at the same time. 0 rolls everything in the
+    bot process."""))
+conf.registerGlobalValue(Dicebot.pool, 'minDice',
+    registry.PositiveInteger(5000, """Determines how many dice a message
+    has to roll to be rolled in a worker process."""))
+conf.registerGlobalValue(Dicebot.pool, 'timeout',
+    registry.PositiveInteger(10, """Determines how many seconds a worker
+    process may roll before it is killed."""))
+
+conf.registerGroup(Dicebot, 'simulation')
+conf.registerGlobalValue(Dicebot.simulation, 'maxTrials',
+    registry.PositiveInteger(100000, """Determines how many rolls a single
+    simulate command may make."""))
+conf.registerGlobalValue(Dicebot.simulation, 'workers',
+    registry.PositiveInteger(4, """Determines how many worker processes (out
+    of pool.workers) a simulation is split across."""))
+
+conf.registerGroup(Dicebot, 'history')
+conf.registerGlobalValue(Dicebot.history, 'size',
+    registry.NonNegativeInteger(100, """Determines how many recent rolls of
+    every channel are kept for the lastroll and history commands. 0 disables
+    the history. Takes effect on plugin reload."""))
+conf.registerGlobalValue(Dicebot.history, 'logFile',
+    registry.String('', """Determines the file in the data directory all
+    rolls are appended to in a binary format. Empty value disables the
+    log."""))
+conf.registerGlobalValue(Dicebot.history, 'flushInterval',
+    registry.PositiveInteger(60, """Determines how often, in seconds, the
+    rolls are written to history.logFile."""))
+
+conf.registerGroup(Dicebot, 'audit')
+conf.registerGlobalValue(Dicebot.audit, 'logFile',
+    registry.String('', """Determines the file in the data directory the
+    audit log is written to. Every roll is then drawn from its own seed,
+    derived from the secret key in the .key file next to it, and can be
+    verified later with python -m Dicebot.audit. Empty value disables
+    auditing."""))
+conf.registerGlobalValue(Dicebot.audit, 'flushInterval',
+    registry.PositiveInteger(60, """Determines how often, in seconds, the
+    audited rolls are written to audit.logFile."""))
+
+conf.registerGroup(Dicebot, 'macros')
+conf.registerGlobalValue(Dicebot.macros, 'file',
+    registry.String('DicebotMacros.json', """Determines the file in the data
+    directory the roll macros of the users are kept in. Empty value keeps
+    them in memory only. Takes effect on plugin reload."""))
+conf.registerGlobalValue(Dicebot.macros, 'maxPerUser',
+    registry.PositiveInteger(20, """Determines how many macros a user may
+    have."""))
+
+conf.registerGroup(Dicebot, 'stats')
+conf.registerGlobalValue(Dicebot.stats, 'enabled',
+    registry.Boolean(False, """Determines whether the bot counts the faces
+    every user rolls on every die size, shown by the dicestats command."""))
+conf.registerGlobalValue(Dicebot.stats, 'file',
+    registry.String('DicebotStats.json', """Determines the file in the data
+    directory the counters are kept in. Empty value keeps them in memory
+    only."""))
+conf.registerGlobalValue(Dicebot.stats, 'flushInterval',
+    registry.PositiveInteger(300, """Determines how often, in seconds, the
+    counters are written to stats.file."""))
+
+conf.registerGroup(Dicebot, 'metrics')
+conf.registerGlobalValue(Dicebot.metrics, 'enabled',
+    registry.Boolean(False, """Determines whether the bot collects call
+    counts, dice drawn and latencies of the game systems, shown by the
+    dicestats command."""))
+conf.registerGlobalValue(Dicebot.metrics, 'file',
+    registry.String('', """Determines the file in the data directory the
+    metrics are periodically written to in the Prometheus text format. Empty
+    value disables writing."""))
+conf.registerGlobalValue(Dicebot.metrics, 'interval',
+    registry.PositiveInteger(60, """Determines how often, in seconds, the
+    metrics are written to metrics.file."""))
+
+conf.registerGroup(Dicebot, 'money')
+conf.registerGlobalValue(Dicebot.money, 'providers',
+    registry.SpaceSeparatedListOfStrings(['currencyconverterapi',
+    'exchangerate-api'], """Determines which currency rate providers are
+    used, in order of preference. A provider is skipped for a while after
+    several failures, and the next one is also queried when it is slower
+    than usual. Known providers are currencyconverterapi and
+    exchangerate-api. Takes effect on plugin reload."""))
+conf.registerGlobalValue(Dicebot.money, 'cacheSize',
+    registry.PositiveInteger(1000, """Determines how many currency rates
+    (including unknown currencies) are cached. Least recently used rates are
+    evicted first. Takes effect on plugin reload."""))
+conf.registerGlobalValue(Dicebot.money, 'prefetchCount',
+    registry.NonNegativeInteger(5, """Determines how many of the most popular
+    currency pairs are refreshed in background after the daily rate
+    expiration. 0 disables prefetching."""))
+conf.registerGlobalValue(Dicebot.money, 'prefetchDelay',
+    registry.NonNegativeInteger(300, """Determines how many seconds after UTC
+    midnight the popular currency pairs are prefetched."""))
 
 # vim:set shiftwidth=4 tabstop=8 expandtab textwidth=78
@@ -29,13 +29,15 @@
 ###
 
 import random
+import threading
 
 class Deck:
     """
     54-card deck simulator.
 
     This class represents a standard 54-card deck (with 2 different Jokers)
-    and supports shuffling and drawing.
+    and supports shuffling and drawing. It may be used from several threads,
+    draw() deals several cards at once.
     """
     titles = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
     suits = ['♣', '♦', '♥', '♠']
@@ -45,6 +47,7 @@ class Deck:
         Initialize a new deck and shuffle it.
         """
         self.deck = []
+        self.lock = threading.Lock()
         self.base_deck = ['Black Joker', 'Red Joker'] + [t + s
                                                          for t in self.titles
                                                          for s in self.suits]
@@ -56,6 +59,10 @@ class Deck:
 
         All cards are returned to the deck and then shuffled randomly.
         """
+        with self.lock:
+            self._restore()
+
+    def _restore(self):
         new_deck = self.base_deck[:]
         random.shuffle(new_deck)
         self.deck = new_deck
@@ -67,7 +74,16 @@ class Deck:
         Drawn card is removed from the deck. If it was the last card, deck is
         shuffled.
         """
-        card = self.deck.pop()
-        if not self.deck:
-            self.shuffle()
-        return card
+        return self.draw(1)[0]
+
+    def draw(self, count):
+        """
+        Draw count cards from the top of the deck, see __next__.
+        """
+        cards = []
+        with self.lock:
+            for i in range(count):
+                cards.append(self.deck.pop())
+                if not self.deck:
+                    self._restore()
+        return cards
@@ -0,0 +1,650 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+"""
+Dice rolling engine: the expression forms of all game systems, their parsers
+and cost estimates. It does not depend on supybot, the plugin wraps it and
+it can be used on its own, see cli.py.
+"""
+
+import logging
+import random
+import re
+import threading
+
+from .expression import (Add, Count, Explode, Keep, Roll, Sampler, Sum,
+                         compileStandard, execute, executePlan, rollDice)
+
+SYSTEMS = ['standard', 'shadowrun', '7sea', '7sea2ed', 'wod', 'dh', 'wg']
+
+
+class RollRecord:
+    """
+    Result of a single rolled expression, formatter.render() gives its text.
+
+    system is the game system and expression the word rolled. values holds
+    the dice (a list per series for several series), totals the numbers the
+    roll yields: sums, hits, successes or margins. flags marks outcomes such
+    as 'glitch' or 'critical', params holds whatever else the system shows,
+    such as the pool size. seed is the counter of the seed the dice were
+    drawn from when the roll was audited, see DiceEngine.seeder.
+    """
+
+    __slots__ = ('system', 'expression', 'values', 'totals', 'flags', 'params',
+                 'seed')
+
+    def __init__(self, system, expression, values=(), totals=(), flags=(),
+                 params=None, seed=None):
+        self.system = system
+        self.expression = expression
+        self.values = values
+        self.totals = totals
+        self.flags = flags
+        self.params = params or {}
+        self.seed = seed
+
+    def __eq__(self, other):
+        if not isinstance(other, RollRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name)
+                   for name in self.__slots__)
+
+    def __repr__(self):
+        return 'RollRecord(%s)' % ', '.join(
+            '%s=%r' % (name, getattr(self, name)) for name in self.__slots__)
+
+
+class RollState(threading.local):
+    """
+    State of the rolls in progress, separate for every thread.
+    """
+
+    diceDrawn = 0
+    sampler = None
+    tally = None
+    rng = random
+    seeder = None
+
+
+def _rollState(name):
+    return property(lambda self: getattr(self.state, name),
+                    lambda self, value: setattr(self.state, name, value))
+
+
+class DiceEngine:
+    """
+    Parser and roller of the dice expressions of all supported systems.
+
+    checklist() gives the expression forms of some systems, evaluate() rolls
+    all expressions found in a line of text. Parsers return a RollRecord, or
+    None if they do not accept the expression. diceDrawn counts the dice
+    rolled so far; the faces drawn are also added to tally if one is set.
+
+    Dice come from rng (the random module by default). When seeder is set,
+    every roll gets a counter from seeder.next() and its dice come from
+    seeder.rng(counter) instead, see audit.Seeder.
+
+    The engine may be used from several threads at once: diceDrawn, tally,
+    rng and seeder (and the sampler of repeated rolls) belong to the calling
+    thread, see RollState. The caches of checklists and plans are only
+    changed by single dict operations and hold values which are never
+    changed, so they need no locks.
+    """
+
+    rollReStandard    = re.compile(r'((?P<rolls>\d+)#)?(?P<spec>[+-]?(\d*d\d+(r(o)?(<=)?\d+)?(!(>=\d+)?)?((k[hl]?|d[hl])\d+)?|\d+)'
+                                   r'([+-](\d*d\d+(r(o)?(<=)?\d+)?(!(>=\d+)?)?((k[hl]?|d[hl])\d+)?|\d+))*)$')
+    rollReSR          = re.compile(r'(?P<rolls>\d+)#sd$')
+    rollReSRX         = re.compile(r'(?P<rolls>\d+)#sdx$')
+    rollReSRE         = re.compile(r'(?P<pool>\d+),(?P<thr>\d+)#sde$')
+    rollRe7Sea        = re.compile(r'((?P<count>\d+)#)?(?P<prefix>[-+])?(?P<rolls>\d+)(?P<k>k{1,2})(?P<keep>\d+)(?P<mod>[+-]\d+)?$')
+    rollRe7Sea2ed     = re.compile(r'(?P<rolls>([-+]|\d)+)s(?P<skill>\d)(?P<vivre>-)?(l(?P<lashes>\d+))?(?P<explode>ex)?(?P<cursed>r15)?$')
+    rollReWoD         = re.compile(r'(?P<rolls>\d+)w(?P<explode>\d|-)?$')
+    rollReDH          = re.compile(r'(?P<rolls>\d*)vs\((?P<thr>([-+]|\d)+)\)$')
+    rollReWG          = re.compile(r'(?P<rolls>\d+)#wg$')
+
+    validationDH      = re.compile(r'^[+\-]?\d{1,4}([+\-]\d{1,4})*$')
+    validation7sea2ed = re.compile(r'^[+\-]?\d{1,2}([+\-]\d{1,2})*$')
+
+    # system, expression form, parser and cost estimator, in the order of
+    # precedence
+    checks = [
+        ('standard', rollReStandard, '_parseStandardRoll', '_costStandardRoll'),
+        ('shadowrun', rollReSR, '_parseShadowrunRoll', '_costShadowrunRoll'),
+        ('shadowrun', rollReSRX, '_parseShadowrunXRoll', '_costShadowrunXRoll'),
+        ('shadowrun', rollReSRE, '_parseShadowrunExtRoll', '_costShadowrunExtRoll'),
+        ('7sea', rollRe7Sea, '_parse7SeaRoll', '_cost7SeaRoll'),
+        ('7sea2ed', rollRe7Sea2ed, '_parse7Sea2edRoll', '_cost7Sea2edRoll'),
+        ('wod', rollReWoD, '_parseWoDRoll', '_costWoDRoll'),
+        ('dh', rollReDH, '_parseDHRoll', '_costDHRoll'),
+        ('wg', rollReWG, '_parseWGRoll', '_costWGRoll'),
+    ]
+    groupName = re.compile(r'\(\?P<\w+>')
+
+    MAX_DICE = 1000
+    MIN_SIDES = 2
+    MAX_SIDES = 100
+    MAX_ROLLS = 30
+    MAX_PLANS = 1000
+
+    diceDrawn = _rollState('diceDrawn')
+    sampler = _rollState('sampler')
+    tally = _rollState('tally')
+    rng = _rollState('rng')
+    seeder = _rollState('seeder')
+
+    def __init__(self, log=None):
+        self.log = log or logging.getLogger(__name__)
+        self.state = RollState()
+        self.checklists = {}
+        self.plans = {}
+
+    def checklist(self, systems=None):
+        """
+        Return the matcher and the checklist of systems (all by default).
+
+        The checklist holds (expression form, parser, cost estimator) triples.
+        The matcher is a single regex matching the words any of them would
+        match, so that other words are skipped at once. It is None if no
+        systems are given.
+        """
+        key = tuple(SYSTEMS if systems is None else systems)
+        try:
+            return self.checklists[key]
+        except KeyError:
+            pass
+        checks = [(regex, getattr(self, parser), getattr(self, cost))
+                  for (system, regex, parser, cost) in self.checks
+                  if system in key]
+        matcher = None
+        if checks:
+            matcher = re.compile('|'.join(
+                '(?:%s)' % self.groupName.sub('(', regex.pattern)
+                for (regex, parser, cost) in checks))
+        result = self.checklists[key] = (matcher, checks)
+        return result
+
+    def evaluate(self, text, systems=None):
+        """
+        Roll every expression in text and return the list of records.
+
+        Each word is rolled by the first expression form whose parser accepts
+        it. There are no limits on the total number of dice.
+        """
+        (matcher, checklist) = self.checklist(systems)
+        plans = []
+        seen = {}
+        for word in text.split():
+            entry = seen.get(word)
+            if entry is None:
+                entry = seen[word] = self.match(word, matcher, checklist)
+            if entry[0]:
+                plans.append((word, entry[0]))
+        return self.rollPlans(plans)
+
+    @staticmethod
+    def match(word, matcher, checklist):
+        """
+        Match a word against a checklist, return the list of (parser, match)
+        pairs of the expression forms it matches and the highest estimate of
+        the dice they draw.
+        """
+        candidates = []
+        dice = 0
+        if matcher is None or not matcher.match(word):
+            return (candidates, dice)
+        for expr, parser, cost in checklist:
+            m = expr.match(word)
+            if m:
+                candidates.append((parser, m))
+                dice = max(dice, cost(m))
+        return (candidates, dice)
+
+    def rollPlans(self, plans, call=None):
+        """
+        Roll (word, candidates) pairs and return the records in their order.
+
+        candidates are the (parser, match) pairs of the word, the first
+        parser which accepts the match gives the record. Repeated words are
+        matched once and rolled together, see rollRepeated(). Parsers are
+        called through call(parser, match) if it is given.
+        """
+        groups = {}
+        for (i, (word, candidates)) in enumerate(plans):
+            groups.setdefault(word, (candidates, []))[1].append(i)
+        records = [None] * len(plans)
+        for (candidates, positions) in groups.values():
+            rolled = self.rollRepeated(candidates, len(positions), call)
+            for (i, record) in zip(positions, rolled):
+                records[i] = record
+        return [r for r in records if r]
+
+    def rollRepeated(self, candidates, count, call=None):
+        """
+        Roll a word count times, return the list of records (None where no
+        parser accepted it).
+
+        The first roll of each parser notes the dice it draws, the dice of
+        the remaining rolls are then drawn in one batch per die size. Audited
+        rolls are drawn one by one instead, each from the generator of its
+        own seed, which every parser tried starts over.
+        """
+        records = [None] * count
+        pending = range(count)
+        state = self.state
+        seeder = state.seeder
+        seeds = [None] * count
+        rng = state.rng
+        for (parser, m) in candidates:
+            if not pending:
+                break
+            missed = []
+            if len(pending) > 1 and seeder is None:
+                state.sampler = Sampler()
+            try:
+                for (n, i) in enumerate(pending):
+                    if n == 1 and state.sampler is not None:
+                        state.sampler.reserve(len(pending) - 1)
+                    if seeder is not None:
+                        if seeds[i] is None:
+                            seeds[i] = seeder.next()
+                        state.rng = seeder.rng(seeds[i])
+                    r = parser(m) if call is None else call(parser, m)
+                    if r:
+                        if seeder is not None:
+                            r.seed = seeds[i]
+                        records[i] = r
+                    else:
+                        missed.append(i)
+            finally:
+                state.sampler = None
+                state.rng = rng
+            pending = missed
+        return records
+
+    def _draw(self, dice, sides):
+        """
+        Roll dice dice of sides sides at once, return the list of results.
+        All dice are rolled here, from the sampler of repeated rolls if one
+        is set.
+        """
+        state = self.state
+        state.diceDrawn += dice
+        if state.sampler is not None:
+            results = state.sampler.draw(dice, sides)
+        else:
+            results = rollDice(dice, sides, state.rng)
+        if state.tally is not None:
+            state.tally.add(sides, results)
+        return results
+
+    def _execute(self, ops):
+        return execute(ops, self._draw)
+
+    def _compileStandard(self, spec):
+        """
+        Return the Plan of a standard roll spec, or None if it is invalid.
+        Plans are cached, they are used both for the cost and the roll.
+        """
+        try:
+            return self.plans[spec]
+        except KeyError:
+            pass
+        if len(self.plans) >= self.MAX_PLANS:
+            self.plans.clear()
+        plan = self.plans[spec] = compileStandard(
+            spec, self.MAX_DICE, self.MIN_SIDES, self.MAX_SIDES)
+        return plan
+
+    def _costStandardRoll(self, m):
+        """
+        Estimate the number of dice drawn by a parsed roll expression.
+
+        The _cost* estimates are used for the work budgets and must not roll
+        anything. Expressions the parsers reject cost nothing.
+        """
+        plan = self._compileStandard(m.group('spec'))
+        if plan is None:
+            return 0
+        return int(m.group('rolls') or 1) * int(sum(t.cost for t in plan.terms))
+
+    def _costShadowrunRoll(self, m):
+        rolls = int(m.group('rolls'))
+        if rolls > self.MAX_DICE:
+            return 0
+        return rolls
+
+    def _costShadowrunXRoll(self, m):
+        # sixes explode, 1/5 more dice on average
+        return self._costShadowrunRoll(m) * 6 // 5
+
+    def _costShadowrunExtRoll(self, m):
+        # a third of the dice are hits, so the threshold takes about 3 dice
+        # per hit, but at least one full pool
+        pool = int(m.group('pool'))
+        threshold = int(m.group('thr'))
+        if pool > self.MAX_DICE or threshold > self.MAX_DICE:
+            return 0
+        return max(pool, 3 * threshold)
+
+    def _cost7SeaRoll(self, m):
+        # tens explode, 1/9 more dice on average
+        rolls = int(m.group('rolls'))
+        if rolls > self.MAX_ROLLS or int(m.group('keep')) > self.MAX_ROLLS:
+            return 0
+        return int(m.group('count') or 1) * min(rolls, 10) * 10 // 9
+
+    def _cost7Sea2edRoll(self, m):
+        rolls = m.group('rolls')
+        if not self.validation7sea2ed.match(rolls):
+            return 0
+        dice = sum(int(x) for x in re.findall(r'[-+]?\d+', rolls))
+        if dice < 1 or dice > self.MAX_ROLLS:
+            return 0
+        return dice * 10 // 9 + 1
+
+    def _costWoDRoll(self, m):
+        rolls = int(m.group('rolls'))
+        if rolls > self.MAX_ROLLS:
+            return 0
+        return rolls * 10 // 9
+
+    def _costDHRoll(self, m):
+        rolls = int(m.group('rolls') or 1)
+        if rolls > self.MAX_ROLLS:
+            return 0
+        return rolls
+
+    def _costWGRoll(self, m):
+        rolls = int(m.group('rolls'))
+        if rolls > self.MAX_ROLLS:
+            return 0
+        return rolls
+
+    def _parseStandardRoll(self, m):
+        """
+        Parse rolls such as 3#2d6+1d4+2 or 4d6kh3.
+
+        This is a roll (or several rolls) of several dice with optional
+        static modifiers. It yields one number (the sum of results and
+        modifiers) for each roll series. Each term may be followed by
+        modifiers: reroll (r<=T, or ro<=T to reroll once), explode (! or
+        !>=T) and keep or drop (khK, klK, dhK, dlK), in that order.
+        """
+        rolls = int(m.group('rolls') or 1)
+        plan = self._compileStandard(m.group('spec'))
+        if plan is None or not plan.terms:
+            return
+
+        results = []
+        values = []
+        for _ in range(rolls):
+            (total, dice) = executePlan(plan, self._draw)
+            results.append(total)
+            values.append(dice)
+        self.log.debug('%r', plan)
+        return RollRecord('standard', m.group(0), values, results,
+                          params={'terms': [(t.sign, t.dice, t.sides, t.suffix)
+                                            for t in plan.terms],
+                                  'mod': plan.mod})
+
+    def _parseShadowrunRoll(self, m):
+        """
+        Parse Shadowrun-specific roll such as 3#sd.
+        """
+        rolls = int(m.group('rolls'))
+        if rolls < 1 or rolls > self.MAX_DICE:
+            return
+        pool = self._execute((Roll(rolls, 6), Count(5)))
+        self.log.debug('%r', pool.dice)
+        return self._processSRResults(m.group(0), pool, rolls)
+
+    def _parseShadowrunXRoll(self, m):
+        """
+        Parse Shadowrun-specific 'exploding' roll such as 3#sdx.
+        """
+        rolls = int(m.group('rolls'))
+        if rolls < 1 or rolls > self.MAX_DICE:
+            return
+        pool = self._execute((Roll(rolls, 6), Explode(6, False), Count(5)))
+        self.log.debug('%r', pool.dice)
+        return self._processSRResults(m.group(0), pool, rolls, True)
+
+    @staticmethod
+    def _processSRResults(expression, pool, size, isExploding=False):
+        # dice added by explosions are sixes rerolled, they never glitch
+        hits = pool.total
+        isHit = hits > 0
+        isGlitch = pool.dice[:size].count(1) >= (size + 1) / 2
+        flags = ('exploding',) if isExploding else ()
+        if isGlitch:
+            flags += ('glitch',) if isHit else ('critical',)
+        return RollRecord('shadowrun', expression, pool.dice, [hits], flags,
+                          {'pool': size})
+
+    def _parseShadowrunExtRoll(self, m):
+        """
+        Parse Shadowrun-specific Extended test roll such as 14,3#sde.
+        """
+        pool = int(m.group('pool'))
+        if pool < 1 or pool > self.MAX_DICE:
+            return
+        threshold = int(m.group('thr'))
+        if threshold < 1 or threshold > self.MAX_DICE:
+            return
+        result = 0
+        passes = 0
+        glitches = []
+        critGlitch = None
+        ops = (Roll(pool, 6), Count(5))
+        while result < threshold:
+            rolled = self._execute(ops)
+            self.log.debug('%r', rolled.dice)
+            hits = rolled.total
+            result += hits
+            passes += 1
+            isHit = hits > 0
+            isGlitch = rolled.dice.count(1) >= (pool + 1) / 2
+            if isGlitch:
+                if not isHit:
+                    critGlitch = passes
+                    break
+                glitches.append(passes)
+
+        flags = ('glitch',) if glitches else ()
+        if critGlitch is not None:
+            flags += ('critical',)
+        return RollRecord('shadowrun', m.group(0), totals=[result], flags=flags,
+                          params={'pool': pool, 'threshold': threshold,
+                                  'passes': passes, 'glitches': glitches})
+
+    def raiseRoller(self, m, draw=None):
+        """
+        Build the 7th Sea 2ed roller of a rollRe7Sea2ed match.
+
+        Returns the number of dice to roll and the SevenSea2EdRaiseRoller, or
+        None if the expression is invalid. The roller draws dice with
+        draw(n), by default from this engine.
+        """
+        rolls = m.group('rolls')
+        if rolls is None:
+            return
+        # additional validation
+        if not re.match(self.validation7sea2ed, rolls):
+            return
+
+        roll_count = eval(rolls)
+        if roll_count < 1 or roll_count > self.MAX_ROLLS:
+            return
+        skill = int(m.group('skill'))
+        vivre = m.group('vivre') == '-'
+        explode = m.group('explode') == 'ex'
+        lashes = 0 if m.group('lashes') is None else int(m.group('lashes'))
+        cursed = m.group('cursed') is not None
+        self.log.debug('7sea2ed: %i (%s) dices at %i skill. lashes = %i. explode is %s. vivre is %s',
+            roll_count,
+            str(rolls),
+            skill,
+            lashes,
+            "enabled" if explode else "disabled",
+            "enabled" if vivre else "disabled"
+        )
+        from .sevenSea2EdRaiseRoller import SevenSea2EdRaiseRoller
+        roller = SevenSea2EdRaiseRoller(
+            draw or (lambda x: self._draw(x, 10)),
+            skill_rank=skill,
+            explode=explode,
+            lash_count=lashes,
+            joie_de_vivre=vivre,
+            raise_target=15 if cursed else 10)
+        return (roll_count, roller)
+
+    def _parse7Sea2edRoll(self, m):
+        """
+        Parse 7th Sea 2ed roll (4s2 is its simplest form). Full spec: https://redd.it/80l7jm
+        """
+        parsed = self.raiseRoller(m)
+        if parsed is None:
+            return
+        (roll_count, roller) = parsed
+        result = roller.roll_and_count(roll_count)
+        return RollRecord('7sea2ed', m.group(0),
+                          totals=[sum(x.raise_count for x in result.raises)],
+                          params={'result': result})
+
+
+    def _parse7SeaRoll(self, m):
+        """
+        Parse 7th Sea-specific roll (4k2 is its simplest form).
+        """
+        rolls = int(m.group('rolls'))
+        if rolls < 1 or rolls > self.MAX_ROLLS:
+            return
+        count = int(m.group('count') or 1)
+        keep = int(m.group('keep'))
+        mod = int(m.group('mod') or 0)
+        prefix = m.group('prefix')
+        k = m.group('k')
+        explode = prefix != '-'
+        if keep < 1 or keep > self.MAX_ROLLS:
+            return
+        if keep > rolls:
+            keep = rolls
+        if rolls > 10:
+            keep += rolls - 10
+            rolls = 10
+        if keep > 10:
+            mod += (keep - 10) * 10
+            keep = 10
+        unkept = (prefix == '+' or k == 'kk') and keep < rolls
+        ops = [Roll(rolls, 10), Keep(keep, True), Sum(), Add(mod)]
+        if explode:
+            ops.insert(1, Explode(10, True))
+        series = []
+        totals = []
+        for _ in range(count):
+            pool = self._execute(ops)
+            self.log.debug('%r', pool.dice)
+            series.append(pool.dice + pool.dropped)
+            totals.append(pool.total)
+
+        return RollRecord('7sea', m.group(0), series, totals,
+                          ('exploding',) if explode else (),
+                          {'rolls': rolls, 'keep': keep, 'mod': mod,
+                           'showUnkept': unkept})
+
+    def _parseWoDRoll(self, m):
+        """
+        Parse New World of Darkness roll (5w)
+        """
+        rolls = int(m.group('rolls'))
+        if rolls < 1 or rolls > self.MAX_ROLLS:
+            return
+        if m.group('explode') == '-':
+            explode = 0
+        elif m.group('explode') is not None and m.group('explode').isdigit():
+            explode = int(m.group('explode'))
+            if explode < 8 or explode > 10:
+                explode = 10
+        else:
+            explode = 10
+        ops = [Roll(rolls, 10), Count(8)]
+        if explode:
+            ops.insert(1, Explode(explode, False))
+        pool = self._execute(ops)
+        self.log.debug('%r', pool.dice)
+        return RollRecord('wod', m.group(0), pool.dice, [pool.total],
+                          params={'rolls': rolls, 'explode': explode})
+
+    def _parseDHRoll(self, m):
+        """
+        Parse Dark Heresy roll (3vs(20+30-10))
+        """
+        rolls = int(m.group('rolls') or 1)
+        if rolls < 1 or rolls > self.MAX_ROLLS:
+            return
+
+        thresholdExpr = m.group('thr')
+        # additional validation
+        if not re.match(self.validationDH, thresholdExpr):
+            return
+
+        threshold = eval(thresholdExpr)
+        rollResults = self._draw(rolls, 100)
+        results = [threshold - roll for roll in rollResults]
+        return RollRecord('dh', m.group(0), rollResults, results,
+                          params={'threshold': threshold})
+
+    def _parseWGRoll(self, m):
+        """
+        Parse WH40K: Wrath & Glory roll (10#wg)
+        """
+        rolls = int(m.group('rolls') or 1)
+        if rolls < 1 or rolls > self.MAX_ROLLS:
+            return
+
+        L = self._draw(rolls, 6)
+        self.log.debug('%r', L)
+        return self._processWGResults(m.group(0), L, rolls)
+
+    @staticmethod
+    def _processWGResults(expression, results, pool):
+        wrathDie = results.pop(0)
+        icons = 2 * results.count(6) + results.count(5) + results.count(4)
+
+        flags = ()
+        if wrathDie == 6:
+            flags = ('glory',)
+            icons += 2
+        elif wrathDie > 3:
+            icons += 1
+        elif wrathDie == 1:
+            flags = ('complication',)
+        if icons > 0:
+            return RollRecord('wg', expression, results, [icons], flags,
+                              {'pool': pool, 'wrath': wrathDie})
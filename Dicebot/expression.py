@@ -0,0 +1,295 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+"""
+Compiled dice expressions.
+
+Every syntax is compiled into a plan: a sequence of operations on a pool of
+dice (roll N dice of S sides, reroll low dice, explode on T or more, keep the
+highest or lowest K, count successes of T or more, sum, add a modifier). The
+operations are executed by the batched primitives below; each primitive draws
+all dice it needs at once. The parsers of DiceEngine are front-ends building
+such plans, compileStandard() compiles the standard syntax with its term
+modifiers, such as 4d6kh3, 10d10!>=8 or 2d20kl1.
+"""
+
+from collections import namedtuple
+import random
+import re
+
+Roll = namedtuple('Roll', 'dice sides')
+# reroll dice of threshold or less, once or until they are higher
+Reroll = namedtuple('Reroll', 'threshold once')
+# roll another die for every die of threshold or more, or add it to the die
+# itself if compound
+Explode = namedtuple('Explode', 'threshold compound')
+Keep = namedtuple('Keep', 'count highest')
+Count = namedtuple('Count', 'threshold')
+Sum = namedtuple('Sum', '')
+Add = namedtuple('Add', 'mod')
+
+# a term of a standard expression, sign is 1 or -1 and suffix the canonical
+# form of its modifiers
+Term = namedtuple('Term', 'sign dice sides suffix ops cost')
+Plan = namedtuple('Plan', 'terms mod')
+
+
+def rollDice(dice, sides, rng=random):
+    """
+    Return a list of dice rolls of a die with sides sides, drawn from rng (a
+    random.Random or the random module).
+    """
+    return rng.choices(range(1, sides + 1), k=dice)
+
+
+class Sampler:
+    """
+    Batched source of dice for rolling the same expression several times.
+
+    draw() serves dice from the batches drawn by reserve(), or from source
+    when they run out. reserve(count) draws at once, for each die size, the
+    dice count rolls like the ones since the last reserve() would need. Dice
+    left over are discarded, which does not skew anything as all dice are
+    independent.
+    """
+
+    __slots__ = ('source', 'batches', 'demand')
+
+    def __init__(self, source=rollDice):
+        self.source = source
+        self.batches = {}
+        self.demand = {}
+
+    def draw(self, dice, sides):
+        self.demand[sides] = self.demand.get(sides, 0) + dice
+        batch = self.batches.get(sides)
+        if batch is None:
+            return self.source(dice, sides)
+        (rolls, start) = batch
+        result = rolls[start:start + dice]
+        if len(result) < dice:
+            del self.batches[sides]
+            result += self.source(dice - len(result), sides)
+        else:
+            self.batches[sides] = (rolls, start + dice)
+        return result
+
+    def reserve(self, count):
+        self.batches = {sides: (self.source(dice * count, sides), 0)
+                        for (sides, dice) in self.demand.items()}
+        self.demand = {}
+
+
+class Pool:
+    """
+    Dice a plan is executed on. Kept dice are in dice, the ones dropped by
+    Keep in dropped.
+    """
+
+    __slots__ = ('sides', 'dice', 'dropped', 'total')
+
+    def __init__(self):
+        self.sides = 0
+        self.dice = []
+        self.dropped = []
+        self.total = 0
+
+
+def _roll(pool, op, draw):
+    pool.sides = op.sides
+    pool.dice = draw(op.dice, op.sides)
+    pool.dropped = []
+
+
+def _reroll(pool, op, draw):
+    dice = pool.dice
+    low = [i for (i, x) in enumerate(dice) if x <= op.threshold]
+    while low:
+        for (i, x) in zip(low, draw(len(low), pool.sides)):
+            dice[i] = x
+        if op.once:
+            break
+        low = [i for i in low if dice[i] <= op.threshold]
+
+
+def _explode(pool, op, draw):
+    dice = pool.dice
+    threshold = op.threshold
+    if op.compound:
+        live = [i for (i, x) in enumerate(dice) if x >= threshold]
+        while live:
+            rolled = draw(len(live), pool.sides)
+            for (i, x) in zip(live, rolled):
+                dice[i] += x
+            live = [i for (i, x) in zip(live, rolled) if x >= threshold]
+    else:
+        count = sum(1 for x in dice if x >= threshold)
+        while count:
+            rolled = draw(count, pool.sides)
+            dice.extend(rolled)
+            count = sum(1 for x in rolled if x >= threshold)
+
+
+def _keep(pool, op, draw):
+    dice = sorted(pool.dice, reverse=op.highest)
+    pool.dice = dice[:op.count]
+    pool.dropped = dice[op.count:]
+
+
+def _count(pool, op, draw):
+    pool.total = sum(1 for x in pool.dice if x >= op.threshold)
+
+
+def _sum(pool, op, draw):
+    pool.total = sum(pool.dice)
+
+
+def _add(pool, op, draw):
+    pool.total += op.mod
+
+
+PRIMITIVES = {
+    Roll: _roll,
+    Reroll: _reroll,
+    Explode: _explode,
+    Keep: _keep,
+    Count: _count,
+    Sum: _sum,
+    Add: _add,
+}
+
+
+def execute(ops, draw):
+    """
+    Execute a sequence of operations and return the resulting Pool.
+
+    draw(n, sides) must return a list of n rolls of a die with that many
+    sides.
+    """
+    pool = Pool()
+    for op in ops:
+        PRIMITIVES[type(op)](pool, op, draw)
+    return pool
+
+
+def executePlan(plan, draw):
+    """
+    Execute a standard expression plan once, return the total and the list
+    of all dice rolled.
+    """
+    total = plan.mod
+    dice = []
+    for term in plan.terms:
+        pool = execute(term.ops, draw)
+        total += term.sign * pool.total
+        dice.extend(pool.dice)
+        dice.extend(pool.dropped)
+    return (total, dice)
+
+
+termRe = re.compile(r'(?P<sign>[+-])(?:(?P<dice>\d*)d(?P<sides>\d+)'
+                    r'(?:r(?P<once>o)?(?:<=)?(?P<reroll>\d+))?'
+                    r'(?:!(?:>=(?P<explode>\d+))?(?P<bang>))?'
+                    r'(?:(?P<keep>k[hl]?|d[hl])(?P<count>\d+))?'
+                    r'|(?P<mod>\d+))')
+
+
+def _compileTerm(g):
+    sign = 1 if g.group('sign') == '+' else -1
+    dice = int(g.group('dice') or 1)
+    sides = int(g.group('sides'))
+    ops = [Roll(dice, sides)]
+    suffix = ''
+    # expected number of dice drawn per die
+    cost = 1.0
+    if g.group('reroll') is not None:
+        threshold = int(g.group('reroll'))
+        if threshold < 1 or threshold >= sides:
+            return
+        once = g.group('once') is not None
+        ops.append(Reroll(threshold, once))
+        suffix += '%s<=%d' % ('ro' if once else 'r', threshold)
+        low = threshold / sides
+        cost += low if once else low / (1 - low)
+    if g.group('bang') is not None:
+        threshold = int(g.group('explode') or sides)
+        if threshold < 2 or threshold > sides:
+            return
+        ops.append(Explode(threshold, False))
+        suffix += '!' if threshold == sides else '!>=%d' % threshold
+        cost *= sides / (threshold - 1)
+    if g.group('keep') is not None:
+        count = int(g.group('count'))
+        if g.group('keep')[0] == 'd':
+            count = dice - count
+            highest = g.group('keep') == 'dl'
+        else:
+            highest = g.group('keep') != 'kl'
+        if count < 1 or count > dice:
+            return
+        ops.append(Keep(count, highest))
+        suffix += '%s%d' % ('kh' if highest else 'kl', count)
+    ops.append(Sum())
+    return Term(sign, dice, sides, suffix, tuple(ops), dice * cost)
+
+
+def compileStandard(spec, maxDice, minSides, maxSides):
+    """
+    Compile the spec of a standard roll, such as 2d6+1d4kh1-2, into a Plan.
+
+    Terms without modifiers are merged by sides and sign, terms are ordered
+    by sides for display. Returns None if a term has more than maxDice dice,
+    sides out of range or a modifier out of range.
+    """
+    if spec[0] not in '+-':
+        spec = '+' + spec
+    mod = 0
+    terms = []
+    plain = {}
+    for g in termRe.finditer(spec):
+        if g.group('mod') is not None:
+            mod += int(g.group('sign') + g.group('mod'))
+            continue
+        term = _compileTerm(g)
+        if (term is None or term.dice > maxDice or
+                term.sides < minSides or term.sides > maxSides):
+            return
+        if term.suffix:
+            terms.append(term)
+            continue
+        key = (term.sign, term.sides)
+        if key in plain:
+            dice = plain[key].dice + term.dice
+            plain[key] = term._replace(dice=dice, cost=dice,
+                                       ops=(Roll(dice, term.sides), Sum()))
+        else:
+            plain[key] = term
+    terms.extend(plain.values())
+    terms.sort(key=lambda t: t.sign * t.sides, reverse=True)
+    return Plan(tuple(terms), mod)
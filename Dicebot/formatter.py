@@ -0,0 +1,224 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+"""
+Rendering of roll records (see engine.RollRecord) as the text shown on IRC and
+by the command line, or as plain data for JSON. Parsers only collect numbers,
+a reply is rendered once, when it is sent.
+"""
+
+
+def nItems(n, item):
+    """
+    Return n and item, pluralized unless n is 1: nItems(2, 'hit') is
+    '2 hits'. Same as the %n of supybot's format for the words used here.
+    """
+    if n == 1:
+        return '%d %s' % (n, item)
+    return '%d %s%s' % (n, item, 'es' if item.endswith(('s', 'x', 'ch', 'sh')) else 's')
+
+
+def commaAndify(items):
+    """
+    Join items as an English list: 'a', 'a and b', 'a, b, and c'.
+    """
+    items = list(items)
+    if len(items) < 3:
+        return ' and '.join(items)
+    return ', '.join(items[:-1]) + ', and ' + items[-1]
+
+
+def ordinal(i):
+    """
+    Return i with the ordinal indicator: 1st, 2nd, 3rd, 4th, 11th, 21st.
+    """
+    if i % 100 in (11, 12, 13):
+        return '%dth' % i
+    return '%d%s' % (i, {1: 'st', 2: 'nd', 3: 'rd'}.get(i % 10, 'th'))
+
+
+def formatMod(mod):
+    """
+    Format a numeric modifier for printing expressions such as 1d20+3.
+
+    Nonzero numbers are formatted with a sign, zero is formatted as an
+    empty string.
+    """
+    return ('%+d' % mod) if mod != 0 else ''
+
+
+def joinNumbers(numbers):
+    return ', '.join(map(str, numbers))
+
+
+def _formatStandard(record):
+    spec = ''
+    for sign, dice, sides, suffix in record.params['terms']:
+        if sign < 0:
+            spec += '-'
+        elif spec:
+            spec += '+'
+        spec += '%dd%d%s' % (dice, sides, suffix)
+    spec += formatMod(record.params['mod'])
+    return '[%s] %s' % (spec, joinNumbers(record.totals))
+
+
+def _formatShadowrun(record):
+    params = record.params
+    hits = record.totals[0]
+    if 'threshold' in params:
+        glitches = [ordinal(i) for i in params['glitches']]
+        glitchStr = ', glitch at ' + commaAndify(glitches) if glitches else ''
+        if 'critical' not in record.flags:
+            return '(pool %d, threshold %d) %s, %s%s' % (
+                params['pool'], params['threshold'],
+                nItems(params['passes'], 'pass'), nItems(hits, 'hit'), glitchStr)
+        return '(pool %d, threshold %d) critical glitch at %s pass%s, %s so far' % (
+            params['pool'], params['threshold'], ordinal(params['passes']),
+            glitchStr, nItems(hits, 'hit'))
+    explStr = ', exploding' if 'exploding' in record.flags else ''
+    if 'critical' in record.flags:
+        return '(pool %d%s) critical glitch!' % (params['pool'], explStr)
+    if hits:
+        glitchStr = ', glitch' if 'glitch' in record.flags else ''
+        return '(pool %d%s) %s%s' % (params['pool'], explStr,
+                                     nItems(hits, 'hit'), glitchStr)
+    return '(pool %d%s) 0 hits' % (params['pool'], explStr)
+
+
+def _format7Sea(record):
+    params = record.params
+    keep = params['keep']
+    series = []
+    for total, rolled in zip(record.totals, record.values):
+        unkeptStr = ' | ' + joinNumbers(rolled[keep:]) if params['showUnkept'] else ''
+        series.append('(%d) %s%s' % (total, joinNumbers(rolled[:keep]), unkeptStr))
+    explodeStr = ', not exploding' if 'exploding' not in record.flags else ''
+    return '[%dk%d%s%s] %s' % (params['rolls'], keep, formatMod(params['mod']),
+                               explodeStr, '; '.join(series))
+
+
+def _format7Sea2ed(record):
+    return '[%s]: %s' % (record.expression, record.params['result'])
+
+
+def _formatWoD(record):
+    explode = record.params['explode']
+    if explode == 0:
+        explStr = ', not exploding'
+    elif explode != 10:
+        explStr = ', %d-again' % explode
+    else:
+        explStr = ''
+    successes = record.totals[0]
+    result = nItems(successes, 'success') if successes > 0 else 'FAIL'
+    return '(%d%s) %s' % (record.params['rolls'], explStr, result)
+
+
+def _formatDH(record):
+    return '%s (%s vs %d)' % (joinNumbers(record.totals),
+                              joinNumbers(record.values),
+                              record.params['threshold'])
+
+
+WRATH_SYMBOLS = ['❶', '❷', '❸', '❹', '❺', '❻']
+
+
+def _formatWG(record):
+    values = record.values
+    symbols = (WRATH_SYMBOLS[record.params['wrath'] - 1] + ' ' +
+               values.count(6) * '➅ ' + values.count(5) * '5 ' +
+               values.count(4) * '4 ')
+    if 'glory' in record.flags:
+        symbols += '| Glory'
+    elif 'complication' in record.flags:
+        symbols += '| Complication'
+    return '[pool %d] %d icon(s): %s' % (record.params['pool'],
+                                         record.totals[0], symbols)
+
+
+FORMATTERS = {
+    'standard': _formatStandard,
+    'shadowrun': _formatShadowrun,
+    '7sea': _format7Sea,
+    '7sea2ed': _format7Sea2ed,
+    'wod': _formatWoD,
+    'dh': _formatDH,
+    'wg': _formatWG,
+}
+
+
+def render(record):
+    """
+    Return the text of a single roll record.
+    """
+    return FORMATTERS[record.system](record)
+
+
+def renderReply(records, note=None):
+    """
+    Return the text of a reply with all records of a message and an optional
+    note, separated with semicolons.
+    """
+    parts = [render(record) for record in records]
+    if note:
+        parts.append(note)
+    return '; '.join(parts)
+
+
+def _raiseData(result):
+    return {
+        'raises': [{'raises': r.raise_count, 'dice': [d.value for d in r.rolls]}
+                   for r in result.raises],
+        'unused': [d.value for d in result.unused],
+        'discarded': [d.value for d in result.discarded or []],
+    }
+
+
+def toDict(record):
+    """
+    Return a record as a dict of plain data which can be serialized to JSON,
+    with its text under 'text'.
+    """
+    params = dict(record.params)
+    if record.system == '7sea2ed':
+        params.update(_raiseData(params.pop('result')))
+    elif record.system == 'standard':
+        params['terms'] = [{'sign': sign, 'dice': dice, 'sides': sides,
+                            'modifiers': suffix}
+                           for (sign, dice, sides, suffix) in params['terms']]
+    return {
+        'system': record.system,
+        'expression': record.expression,
+        'values': list(record.values),
+        'totals': list(record.totals),
+        'flags': list(record.flags),
+        'params': params,
+        'text': render(record),
+    }
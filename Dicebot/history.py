@@ -0,0 +1,220 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+"""
+History of recent rolls of every channel.
+
+RollHistory keeps the last rolls of a channel in preallocated arrays, so its
+memory does not grow after creation. HistoryLog appends rolls to a binary
+file in batches, readLog() reads them back.
+"""
+
+from array import array
+from collections import namedtuple
+import struct
+import sys
+import threading
+
+from .engine import SYSTEMS
+
+Entry = namedtuple('Entry', 'when channel nick system expression values')
+
+# time, system, lengths of channel, nick and expression in bytes, number of
+# values, then the strings and the values
+ENTRY = struct.Struct('<dBHHHH')
+VALUE = struct.Struct('<q')
+VALUE_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+
+def packEntry(when, channel, nick, record, maxValues=32):
+    """
+    Return the binary log form of a roll, see readEntry().
+    """
+    values = entryValues(record.totals, maxValues) or []
+    strings = [s.encode('utf-8') for s in (channel, nick, record.expression)]
+    data = ENTRY.pack(when, SYSTEMS.index(record.system),
+                      *([len(s) for s in strings] + [len(values)]))
+    data += b''.join(strings)
+    data += b''.join(VALUE.pack(v) for v in values)
+    return data
+
+
+def readEntry(f):
+    """
+    Read a roll written by packEntry() from a file opened in binary mode,
+    return the Entry or None at the end of the file.
+    """
+    data = f.read(ENTRY.size)
+    if len(data) < ENTRY.size:
+        return None
+    (when, system, channelLength, nickLength, expressionLength,
+     valueCount) = ENTRY.unpack(data)
+    strings = []
+    for length in (channelLength, nickLength, expressionLength):
+        strings.append(f.read(length).decode('utf-8'))
+    values = [VALUE.unpack(f.read(VALUE.size))[0] for _ in range(valueCount)]
+    return Entry(when, strings[0], strings[1], SYSTEMS[system], strings[2],
+                 values)
+
+
+def entryValues(totals, limit):
+    """
+    Return the first limit totals of a record, or None if any of them does
+    not fit the arrays.
+    """
+    values = totals[:limit]
+    for value in values:
+        if not VALUE_RANGE[0] <= value <= VALUE_RANGE[1]:
+            return None
+    return values
+
+
+class RollHistory:
+    """
+    Ring buffer of the last size rolls of a channel.
+
+    Every roll takes one slot of the arrays of times, systems and value
+    offsets; the nick and the expression are kept as interned strings.
+    Results are kept in a separate ring of valuesPerRoll values per slot on
+    average, the values of old rolls are dropped when it wraps. At most
+    maxValues values of a roll are kept.
+    """
+
+    def __init__(self, size, valuesPerRoll=4, maxValues=32):
+        self.size = size
+        self.maxValues = maxValues
+        self.count = 0
+        self.times = array('d', bytes(8 * size))
+        self.systems = array('B', bytes(size))
+        self.nicks = [None] * size
+        self.expressions = [None] * size
+        self.starts = array('q', bytes(8 * size))
+        self.lengths = array('H', bytes(2 * size))
+        self.values = array('q', bytes(8 * size * valuesPerRoll))
+        self.written = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def append(self, when, nick, record):
+        values = entryValues(record.totals, self.maxValues)
+        with self.lock:
+            i = self.count % self.size
+            self.count += 1
+            self.times[i] = when
+            self.systems[i] = SYSTEMS.index(record.system)
+            self.nicks[i] = sys.intern(nick)
+            self.expressions[i] = sys.intern(record.expression)
+            capacity = len(self.values)
+            if values is None or len(values) > capacity:
+                self.starts[i] = -1
+                return
+            start = self.written
+            for (k, value) in enumerate(values):
+                self.values[(start + k) % capacity] = value
+            self.written += len(values)
+            self.starts[i] = start
+            self.lengths[i] = len(values)
+
+    def _entry(self, i):
+        start = self.starts[i]
+        values = None
+        capacity = len(self.values)
+        # values of old rolls are overwritten when the ring wraps
+        if start >= 0 and start >= self.written - capacity:
+            values = [self.values[(start + k) % capacity]
+                      for k in range(self.lengths[i])]
+        return Entry(self.times[i], None, self.nicks[i],
+                     SYSTEMS[self.systems[i]], self.expressions[i], values)
+
+    def last(self, count=None, nick=None, key=None):
+        """
+        Return up to count last rolls (of nick, if given), newest first.
+        Nicks are compared through key (such as ircutils.toLower) if it is
+        given. values of an Entry are None when they are no longer kept.
+        """
+        if key is not None and nick is not None:
+            nick = key(nick)
+        result = []
+        with self.lock:
+            for n in range(len(self)):
+                i = (self.count - 1 - n) % self.size
+                if nick is not None and \
+                        (self.nicks[i] if key is None else key(self.nicks[i])) != nick:
+                    continue
+                result.append(self._entry(i))
+                if count is not None and len(result) >= count:
+                    break
+        return result
+
+
+class HistoryLog:
+    """
+    Buffer of rolls appended to a binary file by flush().
+
+    Rolls are encoded when added; flush() writes everything buffered with a
+    single write, add() only flushes by itself when more than maxBuffer bytes
+    are waiting.
+    """
+
+    def __init__(self, filename, maxBuffer=1 << 20):
+        self.filename = filename
+        self.maxBuffer = maxBuffer
+        self.buffer = bytearray()
+        self.lock = threading.Lock()
+
+    def add(self, when, channel, nick, record, maxValues=32):
+        self._append(packEntry(when, channel, nick, record, maxValues))
+
+    def _append(self, data):
+        with self.lock:
+            self.buffer += data
+            full = len(self.buffer) > self.maxBuffer
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            data = bytes(self.buffer)
+            self.buffer.clear()
+            if data:
+                with open(self.filename, 'ab') as f:
+                    f.write(data)
+
+
+def readLog(f):
+    """
+    Yield the Entries of a binary history log opened in binary mode.
+    """
+    while True:
+        entry = readEntry(f)
+        if entry is None:
+            return
+        yield entry
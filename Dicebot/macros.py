@@ -0,0 +1,166 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+"""
+Roll macros of the users.
+
+A macro is a named line of dice expressions. MacroStore keeps the macros of
+all users in a JSON file, read on first use and rewritten on every change,
+and the expressions of every macro matched once per checklist.
+"""
+
+import json
+import os
+import re
+import threading
+
+
+class MacroError(ValueError):
+    pass
+
+
+class MacroStore:
+    """
+    Macros of every user, by name.
+
+    compiled() matches the words of a macro against a checklist (see
+    DiceEngine.checklist) once and keeps the result until the macro is set
+    again or removed, so rolling a macro does not parse its text.
+    """
+
+    nameRe = re.compile(r'[a-zA-Z_][\w-]{0,31}$')
+
+    MAX_WORDS = 20
+
+    def __init__(self, filename=None, maxPerUser=20):
+        self.filename = filename
+        self.maxPerUser = maxPerUser
+        self.macros = None
+        self.compiledMacros = {}
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if self.macros is not None:
+            return
+        self.macros = {}
+        if self.filename is None:
+            return
+        try:
+            with open(self.filename) as f:
+                self.macros = json.load(f)
+        except FileNotFoundError:
+            pass
+
+    def _save(self):
+        if self.filename is None:
+            return
+        with open(self.filename + '.tmp', 'w') as f:
+            json.dump(self.macros, f, separators=(',', ':'))
+        os.replace(self.filename + '.tmp', self.filename)
+
+    def validate(self, name, text, matcher, checklist, match):
+        """
+        Raise MacroError unless name is a valid macro name and every word of
+        text is an expression of checklist. Names which are expressions
+        themselves are not valid.
+        """
+        if not self.nameRe.match(name) or match(name, matcher, checklist)[0]:
+            raise MacroError('%s is not a valid macro name' % name)
+        words = text.split()
+        if not words or len(words) > self.MAX_WORDS:
+            raise MacroError('a macro has 1 to %d expressions' % self.MAX_WORDS)
+        for word in words:
+            if not match(word, matcher, checklist)[0]:
+                raise MacroError('%s is not a dice expression' % word)
+
+    def get(self, user, name):
+        with self.lock:
+            self._load()
+            return self.macros.get(user, {}).get(name)
+
+    def names(self, user):
+        with self.lock:
+            self._load()
+            return sorted(self.macros.get(user, {}))
+
+    def set(self, user, name, text):
+        """
+        Set the macro name of user to text, see validate().
+        """
+        with self.lock:
+            self._load()
+            macros = self.macros.setdefault(user, {})
+            if name not in macros and len(macros) >= self.maxPerUser:
+                raise MacroError('you cannot have more than %d macros'
+                                 % self.maxPerUser)
+            macros[name] = ' '.join(text.split())
+            self.compiledMacros.pop((user, name), None)
+            self._save()
+
+    def remove(self, user, name):
+        """
+        Remove the macro name of user, return whether there was one.
+        """
+        with self.lock:
+            self._load()
+            macros = self.macros.get(user, {})
+            if name not in macros:
+                return False
+            del macros[name]
+            if not macros:
+                del self.macros[user]
+            self.compiledMacros.pop((user, name), None)
+            self._save()
+            return True
+
+    def compiled(self, user, name, matcher, checklist, match):
+        """
+        Return the (word, candidates, dice) triples of the words of the macro
+        name of user matched by match(word, matcher, checklist), see
+        DiceEngine.match, or None if there is no such macro. Words the
+        checklist does not accept are left out.
+        """
+        with self.lock:
+            compiled = self.compiledMacros.get((user, name))
+            if compiled is not None and matcher in compiled:
+                return compiled[matcher]
+            self._load()
+            text = self.macros.get(user, {}).get(name)
+            if text is None:
+                return None
+            matched = []
+            seen = {}
+            for word in text.split():
+                entry = seen.get(word)
+                if entry is None:
+                    entry = seen[word] = match(word, matcher, checklist)
+                if entry[0]:
+                    matched.append((word,) + entry)
+            self.compiledMacros.setdefault((user, name), {})[matcher] = matched
+            return matched
@@ -0,0 +1,176 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+from bisect import bisect_left
+import threading
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of durations in seconds.
+
+    counts[i] is the number of observations not greater than bounds[i], the
+    last count is for the larger ones.
+    """
+    BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+              0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, bounds=BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        for (i, count) in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def percentile(self, p):
+        """
+        Upper bound of the bucket containing the p-th percentile
+        """
+        if not self.count:
+            return 0.0
+        rank = p * self.count / 100
+        seen = 0
+        for (bound, count) in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    """
+    Counters and histograms identified by a name and a tuple of label pairs.
+
+    Updates hold a single lock, they are cheap enough to be done inline from
+    any thread. Metrics gathered in another process can be added with merge.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.RLock()
+
+    def __getstate__(self):
+        with self.lock:
+            return (dict(self.counters), dict(self.histograms))
+
+    def __setstate__(self, state):
+        (self.counters, self.histograms) = state
+        self.lock = threading.RLock()
+
+    def inc(self, name, labels=(), amount=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def counter(self, name, labels=()):
+        return self.counters.get((name, labels), 0)
+
+    def histogram(self, name, labels=()):
+        return self.histograms.get((name, labels)) or Histogram()
+
+    def labels(self, name, label):
+        """
+        Return the values of label used with name, sorted
+        """
+        with self.lock:
+            keys = list(self.counters) + list(self.histograms)
+        return sorted(set(dict(labels)[label] for (n, labels) in keys
+                          if n == name and label in dict(labels)))
+
+    def merge(self, other):
+        with self.lock:
+            for ((name, labels), value) in other.counters.items():
+                self.inc(name, labels, value)
+            for (key, histogram) in other.histograms.items():
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(histogram.bounds)
+                self.histograms[key].merge(histogram)
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ''
+        return '{%s}' % ','.join('%s="%s"' % (k, v) for (k, v) in labels)
+
+    def prometheus(self, gauges=()):
+        """
+        Format all the metrics in the Prometheus text exposition format.
+
+        gauges is an optional list of (name, labels, value) of values which
+        are not tracked here.
+        """
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda x: x[0])
+        lines = []
+        typed = set()
+        def type_line(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append('# TYPE %s %s' % (name, kind))
+
+        for ((name, labels), value) in counters:
+            type_line(name, 'counter')
+            lines.append('%s%s %s' % (name, self._format_labels(labels), value))
+        for (name, labels, value) in gauges:
+            type_line(name, 'gauge')
+            lines.append('%s%s %s' % (name, self._format_labels(labels), value))
+        for ((name, labels), histogram) in histograms:
+            type_line(name, 'histogram')
+            cumulative = 0
+            bounds = [repr(float(x)) for x in histogram.bounds] + ['+Inf']
+            for (bound, count) in zip(bounds, histogram.counts):
+                cumulative += count
+                lines.append('%s_bucket%s %d' % (
+                    name, self._format_labels(labels + (('le', bound),)),
+                    cumulative))
+            lines.append('%s_sum%s %r' % (name, self._format_labels(labels),
+                                           histogram.sum))
+            lines.append('%s_count%s %d' % (name, self._format_labels(labels),
+                                             histogram.count))
+        return '\n'.join(lines) + '\n'
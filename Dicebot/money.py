@@ -28,32 +28,297 @@
 # POSSIBILITY OF SUCH DAMAGE.
 ###
 
-import requests
 import datetime
+import math
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 
 class HttpRequester:
+    def __init__(self, url="https://free.currencyconverterapi.com/api/v6/convert?q={0}&compact=ultra", timeout=10):
+        self.url = url
+        self.timeout = timeout
+
     def request(self, key):
-        r = requests.get("https://free.currencyconverterapi.com/api/v6/convert?q={0}&compact=ultra".format(key))
+        import requests
+        r = requests.get(self.url.format(key), timeout=self.timeout)
+        r.raise_for_status()
         return r.json()
 
 
+class UnknownCurrencyError(KeyError):
+    pass
+
+
+class NoProviderError(Exception):
+    pass
+
+
+class CurrencyConverterProvider:
+    """
+    Rates from https://free.currencyconverterapi.com/
+    """
+    name = 'currencyconverterapi'
+
+    def __init__(self, requester=None):
+        self.requester = requester or HttpRequester()
+
+    def get_rate(self, input_currency, output_currency):
+        query = "{0}_{1}".format(input_currency, output_currency)
+        result = self.requester.request(query)
+        if not result:
+            raise UnknownCurrencyError(query)
+        return result[query]
+
+
+class ExchangeRateApiProvider:
+    """
+    Rates from https://open.er-api.com/
+    """
+    name = 'exchangerate-api'
+
+    def __init__(self, requester=None):
+        self.requester = requester or HttpRequester("https://open.er-api.com/v6/latest/{0}")
+
+    def get_rate(self, input_currency, output_currency):
+        result = self.requester.request(input_currency)
+        if result.get('error-type') == 'unsupported-code' or \
+                output_currency not in result['rates']:
+            raise UnknownCurrencyError("{0}_{1}".format(input_currency, output_currency))
+        return result['rates'][output_currency]
+
+
+PROVIDERS = {x.name: x for x in [CurrencyConverterProvider, ExchangeRateApiProvider]}
+
+
+class ProviderHealth:
+    """
+    Latency and failure tracking of a rate provider
+
+    After failure_threshold consecutive failures the circuit opens and the
+    provider is skipped for cooldown seconds, then it gets another chance.
+    """
+
+    def __init__(self, failure_threshold=3, cooldown=60, default_delay=1.0, window=100):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.default_delay = default_delay
+        self.latencies = deque(maxlen=window)
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def success(self, latency):
+        with self.lock:
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def available(self):
+        opened_at = self.opened_at
+        return opened_at is None or time.monotonic() - opened_at >= self.cooldown
+
+    def p95(self):
+        """
+        95th percentile of the recent latencies, default_delay until there are
+        enough samples
+        """
+        with self.lock:
+            latencies = sorted(self.latencies)
+        if len(latencies) < 5:
+            return self.default_delay
+        return latencies[math.ceil(len(latencies) * 0.95) - 1]
+
+
+class ProviderSet:
+    """
+    Rate providers queried in order, with failover and hedged requests
+
+    If the current provider has not answered within its p95 latency, the next
+    one is queried too and the first answer wins. Failed providers are
+    replaced by the next one immediately.
+    """
+
+    def __init__(self, providers, timeout=10, health=ProviderHealth):
+        self.providers = providers
+        self.timeout = timeout
+        self.health = {x: health() for x in providers}
+        self.executor = ThreadPoolExecutor(max_workers=2 * len(providers))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    def call(self, provider, input_currency, output_currency):
+        health = self.health[provider]
+        start = time.monotonic()
+        try:
+            rate = provider.get_rate(input_currency, output_currency)
+        except UnknownCurrencyError:
+            health.success(time.monotonic() - start)
+            raise
+        except Exception:
+            health.failure()
+            raise
+        health.success(time.monotonic() - start)
+        return rate
+
+    def get_rate(self, input_currency, output_currency):
+        queue = [x for x in self.providers if self.health[x].available()]
+        if not queue:
+            raise NoProviderError("all currency rate providers are failing")
+        if len(self.providers) == 1:
+            return self.call(queue[0], input_currency, output_currency)
+
+        deadline = time.monotonic() + self.timeout
+        pending = set()
+        errors = []
+        while queue or pending:
+            if queue:
+                provider = queue.pop(0)
+                pending.add(self.executor.submit(self.call, provider, input_currency, output_currency))
+                timeout = self.health[provider].p95() if queue else None
+            else:
+                timeout = None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("currency rate providers did not answer in time")
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+            done, pending = wait(pending, timeout, FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    errors.append(e)
+
+        for e in errors:
+            if not isinstance(e, UnknownCurrencyError):
+                raise e
+        raise errors[0]
+
+
 class CachedRate:
+    __slots__ = ('rate', 'created_at')
+
     def __init__(self, rate):
         self.rate = rate
         self.created_at = datetime.datetime.utcnow().date()
 
 
+class RateCache:
+    """
+    Bounded cache of CachedRate values
+
+    Least recently used entries are evicted when max_size is reached, entries
+    created before the current UTC day are purged once the day changes.
+    All operations hold the lock, as even reads reorder the entries.
+    """
+
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.date = None
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def entry_size(key, value):
+        return sys.getsizeof(key) + sys.getsizeof(value) + \
+            sys.getsizeof(value.rate) + sys.getsizeof(value.created_at)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __getitem__(self, key):
+        with self.lock:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = value
+            self.bytes += self.entry_size(key, value)
+            while len(self.entries) > self.max_size:
+                self.remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def remove(self, key):
+        with self.lock:
+            value = self.entries.pop(key)
+            self.bytes -= self.entry_size(key, value)
+
+    def get(self, key, date):
+        """
+        Return the entry for key if it was created at date, None otherwise
+        """
+        with self.lock:
+            if date != self.date:
+                self.purge(date)
+            if key not in self.entries:
+                return None
+            value = self[key]
+            if value.created_at != date:
+                self.remove(key)
+                self.expirations += 1
+                return None
+            return value
+
+    def purge(self, date):
+        """
+        Remove all entries not created at date
+        """
+        with self.lock:
+            self.date = date
+            for key in [k for (k, v) in self.entries.items()
+                        if v.created_at != date]:
+                self.remove(key)
+                self.expirations += 1
+
+
 class MoneyConverter:
     """
     Conversion rate bot
 
-    Requests https://free.currencyconverterapi.com/ and cache value for a day
+    Requests rates from the providers (https://free.currencyconverterapi.com/
+    by default) and cache value for a day.
+    Concurrent misses for the same pair share a single upstream request.
+    Unknown currencies are cached too, so they are not requested again.
+    The converter may be used from several threads, the statistics are
+    updated under stats_lock.
     """
 
-    def __init__(self, requester):
-        self.requester = requester
-        self.cache = {}
+    def __init__(self, requester, fetch_timeout=10, cache_size=1000, providers=None):
+        self.providers = providers or ProviderSet([CurrencyConverterProvider(requester)])
+        self.fetch_timeout = fetch_timeout
+        self.cache = RateCache(cache_size)
+        self.inflight = {}
+        self.inflight_lock = threading.Lock()
+        self.coalesced = 0
+        self.stats_lock = threading.Lock()
+        self.popularity = Counter()
+        self.hits = 0
+        self.misses = 0
+        self.prefetches = 0
+        self.prefetch_errors = 0
         self.synonims = {
             "₽": "RUB",
             "РУБ": "RUB",
@@ -80,20 +345,53 @@ class MoneyConverter:
         }
 
     def get_rate_from_origin(self, input_currency, output_currency):
-        query = "{0}_{1}".format(input_currency, output_currency)
-        result = self.requester.request(query)
-        return result[query]
+        return self.providers.get_rate(input_currency, output_currency)
 
-    def get_rates(self, input_currency, output_currencies):
-        def request(input, output):
-            key = "{0}_{1}".format(input, output)
-            rate = self.get_rate_from_origin(input, output)
+    def close(self):
+        self.providers.close()
+
+    def request(self, input, output):
+        """
+        Request the rate from origin and cache it.
+
+        Only the first caller for a pair performs the request, callers
+        arriving while it is in flight wait for the same result, up to
+        fetch_timeout seconds.
+        """
+        key = "{0}_{1}".format(input, output)
+        with self.inflight_lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            try:
+                return future.result(self.fetch_timeout)
+            except FutureTimeoutError:
+                raise TimeoutError("currency rate request for {0} timed out".format(key))
+
+        try:
+            try:
+                rate = self.get_rate_from_origin(input, output)
+            except UnknownCurrencyError:
+                rate = None
             result = self.cache[key] = CachedRate(rate)
 
             inverted_key = "{1}_{0}".format(input, output)
-            self.cache[inverted_key] = CachedRate(1 / rate)
+            self.cache[inverted_key] = CachedRate(None if rate is None else 1 / rate)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
             return result
+        finally:
+            with self.inflight_lock:
+                del self.inflight[key]
 
+    def get_rates(self, input_currency, output_currencies):
         result = {}
         utc_date = datetime.datetime.utcnow().date()
         input = self.normalize(input_currency)
@@ -104,16 +402,58 @@ class MoneyConverter:
                 continue
 
             key = "{0}_{1}".format(input, output)
-            if key in self.cache:
-                cached_rate = self.cache[key]
-                if cached_rate.created_at != utc_date:
-                    cached_rate = request(input, output)
-            else:
-                cached_rate = request(input, output)
+            cached_rate = self.cache.get(key, utc_date)
+            with self.stats_lock:
+                if cached_rate is not None:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            if cached_rate is None:
+                cached_rate = self.request(input, output)
 
+            if cached_rate.rate is None:
+                raise UnknownCurrencyError(key)
+            with self.stats_lock:
+                self.popularity[(input, output)] += 1
             result[cur] = cached_rate.rate
         return result
 
+    @property
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def popular_pairs(self, count):
+        """
+        Return up to count most requested (input, output) pairs
+        """
+        with self.stats_lock:
+            return [pair for (pair, _) in self.popularity.most_common(count)]
+
+    def prefetch(self, count):
+        """
+        Refresh stale cached rates of the count most popular pairs, so that
+        user-facing lookups hit a warm cache after the daily expiration.
+
+        Returns the number of rates actually requested.
+        """
+        utc_date = datetime.datetime.utcnow().date()
+        fetched = 0
+        for (input, output) in self.popular_pairs(count):
+            key = "{0}_{1}".format(input, output)
+            if self.cache.get(key, utc_date) is not None:
+                continue
+            try:
+                self.request(input, output)
+            except Exception:
+                with self.stats_lock:
+                    self.prefetch_errors += 1
+                continue
+            fetched += 1
+        with self.stats_lock:
+            self.prefetches += fetched
+        return fetched
+
     def normalize(self, cur):
         cur = cur.upper()
         return self.synonims[cur] if cur in self.synonims else cur
@@ -124,8 +464,23 @@ class MoneyConverter:
         return output_format.format(int(amount) if isinstance(amount, int) or amount.is_integer() else "{0:.2f}".format(amount))
 
     def convert(self, amount, input, output):
-        normalized_input = self.normalize(input)
-        rates = self.get_rates(input, [x for x in output if self.normalize(x) != normalized_input] if len(output) > 1 else output)
-        return "{0}: {1}".format(
-            self.format_money(amount, input),
-            ', '.join(self.format_money(val * amount, key) for (key, val) in rates.items()))
+        return self.convert_many([(amount, input)], output)
+
+    def convert_many(self, amounts, output):
+        """
+        Convert several (amount, currency) pairs to the same output currencies
+
+        Rates are requested once per distinct input currency, results are
+        joined in one line in the original order.
+        """
+        rates_by_input = {}
+        results = []
+        for (amount, input) in amounts:
+            normalized_input = self.normalize(input)
+            if normalized_input not in rates_by_input:
+                rates_by_input[normalized_input] = self.get_rates(input, [x for x in output if self.normalize(x) != normalized_input] if len(output) > 1 else output)
+            rates = rates_by_input[normalized_input]
+            results.append("{0}: {1}".format(
+                self.format_money(amount, input),
+                ', '.join(self.format_money(val * amount, key) for (key, val) in rates.items())))
+        return '; '.join(results)
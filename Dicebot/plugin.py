@@ -27,17 +27,31 @@
 # POSSIBILITY OF SUCH DAMAGE.
 ###
 
+from .audit import AuditLog
+from .budget import WorkBudget
 from .deck import Deck
-from .sevenSea2EdRaiseRoller import SevenSea2EdRaiseRoller
-from .money import MoneyConverter, HttpRequester
-
-from operator import itemgetter
+from .engine import DiceEngine
+from .formatter import joinNumbers, renderReply
+from .history import HistoryLog, RollHistory
+from .macros import MacroError, MacroStore
+from .metrics import Metrics
+from .profiling import MethodProfiler
+from .rollpool import RollPool, PoolBusyError
+from .stats import DiceStats, Tally
+
+import importlib
+import os
 import re
-import random
+import threading
+import time
 
-from supybot.commands import additional, wrap, rest
-from supybot.utils.str import format, ordinal
+from supybot.commands import additional, optional, thread, wrap, rest
+from supybot.utils.str import format
+import supybot.conf as conf
+import supybot.ircdb as ircdb
 import supybot.ircmsgs as ircmsgs
+import supybot.ircutils as ircutils
+import supybot.schedule as schedule
 import supybot.callbacks as callbacks
 
 class Dicebot(callbacks.Plugin):
@@ -47,439 +61,703 @@ class Dicebot(callbacks.Plugin):
     autoRollInPrivate option is enabled).
     """
 
-    rollReStandard    = re.compile(r'((?P<rolls>\d+)#)?(?P<spec>[+-]?(\d*d\d+|\d+)([+-](\d*d\d+|\d+))*)$')
-    rollReSR          = re.compile(r'(?P<rolls>\d+)#sd$')
-    rollReSRX         = re.compile(r'(?P<rolls>\d+)#sdx$')
-    rollReSRE         = re.compile(r'(?P<pool>\d+),(?P<thr>\d+)#sde$')
-    rollRe7Sea        = re.compile(r'((?P<count>\d+)#)?(?P<prefix>[-+])?(?P<rolls>\d+)(?P<k>k{1,2})(?P<keep>\d+)(?P<mod>[+-]\d+)?$')
-    rollRe7Sea2ed     = re.compile(r'(?P<rolls>([-+]|\d)+)s(?P<skill>\d)(?P<vivre>-)?(l(?P<lashes>\d+))?(?P<explode>ex)?(?P<cursed>r15)?$')
-    rollReWoD         = re.compile(r'(?P<rolls>\d+)w(?P<explode>\d|-)?$')
-    rollReDH          = re.compile(r'(?P<rolls>\d*)vs\((?P<thr>([-+]|\d)+)\)$')
-    rollReWG          = re.compile(r'(?P<rolls>\d+)#wg$')
-
-    validationDH      = re.compile(r'^[+\-]?\d{1,4}([+\-]\d{1,4})*$')
-    validation7sea2ed = re.compile(r'^[+\-]?\d{1,2}([+\-]\d{1,2})*$')
-
-    convertMoney      = re.compile(r'((?P<prefix>(?P<p_curr>[$€£₴₽¥元])(?P<p_amount>(\d+[\.,]\d+)|([\.,]\d+)|(\d+)))|(?P<suffix>(?P<s_amount>(\d+[\.,]\d+)|([\.,]\d+)|(\d+))( ?(?P<s_curr>[^\d\s]+))))(?P<output>( [^\d\s]+)*)')
+    # An amount with a suffix currency never starts in the middle of a number,
+    # otherwise finditer retries every position of a long run of digits and
+    # the scan is quadratic.
+    convertMoney      = re.compile(r'((?P<prefix>(?P<p_curr>[$€£₴₽¥元])(?P<p_amount>(\d+[\.,]\d+)|([\.,]\d+)|(\d+)))|(?P<suffix>(?!(?<=\d)\d)(?P<s_amount>(\d+[\.,]\d+)|([\.,]\d+)|(\d+))( ?(?P<s_curr>[^\d\s]+))))(?P<output>( [^\d\s]+(?=\s|$))*)')
 
-    MAX_DICE = 1000
-    MIN_SIDES = 2
-    MAX_SIDES = 100
-    MAX_ROLLS = 30
+    PREFETCH_EVENT = 'Dicebot.prefetchRates'
+    METRICS_EVENT = 'Dicebot.dumpMetrics'
+    PROFILE_EVENT = 'Dicebot.stopProfile'
+    HISTORY_EVENT = 'Dicebot.flushHistory'
+    STATS_EVENT = 'Dicebot.saveStats'
+    AUDIT_EVENT = 'Dicebot.flushAudit'
 
     def __init__(self, irc):
         super(Dicebot, self).__init__(irc)
-        self.deck = Deck()
-        self.money = MoneyConverter(HttpRequester())
-
-    def _roll(self, dice, sides, mod=0):
-        """
-        Roll a die several times, return sum of the results plus the static modifier.
-
-        Arguments:
-        dice -- number of dice rolled;
-        sides -- number of sides each die has;
-        mod -- number added to the total result (optional);
-        """
-        res = int(mod)
-        for _ in range(dice):
-            res += random.randrange(1, sides+1)
-        return res
-
-    def _rollMultiple(self, dice, sides, rolls=1, mod=0):
-        """
-        Roll several dice several times, return a list of results.
-
-        Specified number of dice with specified sides is rolled several times.
-        Each time the sum of results is calculated, with optional modifier
-        added. The list of these sums is returned.
-
-        Arguments:
-        dice -- number of dice rolled each time;
-        sides -- number of sides each die has;
-        rolls -- number of times dice are rolled;
-        mod -- number added to the each total result (optional);
-        """
-        return [self._roll(dice, sides, mod) for i in range(rolls)]
-
-    @staticmethod
-    def _formatMod(mod):
-        """
-        Format a numeric modifier for printing expressions such as 1d20+3.
-
-        Nonzero numbers are formatted with a sign, zero is formatted as an
-        empty string.
-        """
-        return ('%+d' % mod) if mod != 0 else ''
-
-    def _process(self, irc, text):
+        self.engine = DiceEngine(self.log)
+        # guards the creation of the lazily created objects and the setting
+        # watches, which may be asked for by several command threads
+        self.lock = threading.Lock()
+        self.deck = None
+        self.macros = None
+        self.budget = WorkBudget(0, 0, 0, 0, 0)
+        self.pool = RollPool()
+        self.moneyConverter = None
+        self._schedulePrefetch()
+        self.profiler = None
+        self.settingsCache = {}
+        self.watchedSettings = {}
+        plugin = conf.supybot.plugins.Dicebot
+        for value in (plugin.autoRoll, plugin.autoRollInPrivate):
+            self._watchSetting(value)
+        self.metrics = None
+        metrics = conf.supybot.plugins.Dicebot.metrics
+        for value in (metrics.enabled, metrics.file, metrics.interval):
+            value.addCallback(self._metricsChanged)
+        self._metricsChanged()
+        self.histories = {}
+        self.historyLog = None
+        history = conf.supybot.plugins.Dicebot.history
+        for value in (history.logFile, history.flushInterval):
+            value.addCallback(self._historyLogChanged)
+        self._historyLogChanged()
+        self.stats = None
+        stats = conf.supybot.plugins.Dicebot.stats
+        for value in (stats.enabled, stats.file, stats.flushInterval):
+            value.addCallback(self._statsChanged)
+        self._statsChanged()
+        self.auditLog = None
+        audit = conf.supybot.plugins.Dicebot.audit
+        for value in (audit.logFile, audit.flushInterval):
+            value.addCallback(self._auditLogChanged)
+        self._auditLogChanged()
+
+    def die(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+        for event in (self.PREFETCH_EVENT, self.METRICS_EVENT,
+                      self.PROFILE_EVENT, self.HISTORY_EVENT,
+                      self.STATS_EVENT, self.AUDIT_EVENT):
+            try:
+                schedule.removeEvent(event)
+            except KeyError:
+                pass
+        metrics = conf.supybot.plugins.Dicebot.metrics
+        for value in (metrics.enabled, metrics.file, metrics.interval):
+            value.removeCallback(self._metricsChanged)
+        for value in self.watchedSettings.values():
+            value.removeCallback(self._settingsChanged)
+        history = conf.supybot.plugins.Dicebot.history
+        for value in (history.logFile, history.flushInterval):
+            value.removeCallback(self._historyLogChanged)
+        if self.historyLog is not None:
+            self.historyLog.flush()
+        stats = conf.supybot.plugins.Dicebot.stats
+        for value in (stats.enabled, stats.file, stats.flushInterval):
+            value.removeCallback(self._statsChanged)
+        if self.stats is not None:
+            self.stats.save()
+        audit = conf.supybot.plugins.Dicebot.audit
+        for value in (audit.logFile, audit.flushInterval):
+            value.removeCallback(self._auditLogChanged)
+        if self.auditLog is not None:
+            self.auditLog.flush()
+        if self.moneyConverter is not None:
+            self.moneyConverter.close()
+        self.pool.close()
+        super(Dicebot, self).die()
+
+    def _metricsChanged(self):
+        """
+        Start or stop collecting metrics when the configuration changes.
+
+        When metrics are disabled, self.metrics is None and the roll code
+        only checks for that.
+        """
+        if not self.registryValue('metrics.enabled'):
+            self.metrics = None
+        elif self.metrics is None:
+            self.metrics = Metrics()
+        try:
+            schedule.removeEvent(self.METRICS_EVENT)
+        except KeyError:
+            pass
+        if self.metrics is not None and self.registryValue('metrics.file'):
+            schedule.addPeriodicEvent(self._dumpMetrics,
+                                      self.registryValue('metrics.interval'),
+                                      self.METRICS_EVENT, now=False)
+
+    def _historyLogChanged(self):
+        """
+        Open the history log and schedule its flushing when the configuration
+        changes.
+        """
+        if self.historyLog is not None:
+            self.historyLog.flush()
+            self.historyLog = None
+        try:
+            schedule.removeEvent(self.HISTORY_EVENT)
+        except KeyError:
+            pass
+        filename = self.registryValue('history.logFile')
+        if filename:
+            self.historyLog = HistoryLog(
+                conf.supybot.directories.data.dirize(filename))
+            schedule.addPeriodicEvent(self._flushHistory,
+                                      self.registryValue('history.flushInterval'),
+                                      self.HISTORY_EVENT, now=False)
+
+    def _flushHistory(self):
+        if self.historyLog is not None:
+            self.historyLog.flush()
+
+    def _auditLogChanged(self):
+        """
+        Open the audit log and schedule its flushing when the configuration
+        changes.
+        """
+        if self.auditLog is not None:
+            self.auditLog.flush()
+            self.auditLog = None
+        try:
+            schedule.removeEvent(self.AUDIT_EVENT)
+        except KeyError:
+            pass
+        filename = self.registryValue('audit.logFile')
+        if filename:
+            self.auditLog = AuditLog(
+                conf.supybot.directories.data.dirize(filename))
+            schedule.addPeriodicEvent(self._flushAudit,
+                                      self.registryValue('audit.flushInterval'),
+                                      self.AUDIT_EVENT, now=False)
+
+    def _flushAudit(self):
+        if self.auditLog is not None:
+            self.auditLog.flush()
+
+    def _remember(self, irc, msg, channel, records, tally=None):
+        """
+        Add the rolls of a message to the dice stats (from tally) and the
+        audit log, and the rolls of a channel message to the history and its
+        log.
+        """
+        if tally is not None and self.stats is not None:
+            self.stats.add(ircutils.toLower(msg.nick), tally)
+        audit = self.auditLog
+        if audit is not None:
+            now = time.time()
+            for record in records:
+                if record.seed is not None:
+                    audit.add(now, channel or '', msg.nick, record)
+        if channel is None or not records:
+            return
+        key = (irc.network, channel)
+        history = self.histories.get(key)
+        if history is None:
+            size = self.registryValue('history.size')
+            if not size:
+                return
+            history = self.histories.setdefault(key, RollHistory(size))
+        log = self.historyLog
+        now = time.time()
+        for record in records:
+            history.append(now, msg.nick, record)
+            if log is not None:
+                log.add(now, channel, msg.nick, record)
+
+    def _statsChanged(self):
+        """
+        Load the dice statistics and schedule their saving when the
+        configuration changes.
+        """
+        if self.stats is not None:
+            self.stats.save()
+            self.stats = None
+        try:
+            schedule.removeEvent(self.STATS_EVENT)
+        except KeyError:
+            pass
+        if not self.registryValue('stats.enabled'):
+            return
+        filename = self.registryValue('stats.file')
+        self.stats = DiceStats(
+            conf.supybot.directories.data.dirize(filename) if filename else None)
+        self.stats.load()
+        if filename:
+            schedule.addPeriodicEvent(self._saveStats,
+                                      self.registryValue('stats.flushInterval'),
+                                      self.STATS_EVENT, now=False)
+
+    def _saveStats(self):
+        if self.stats is not None:
+            self.stats.save()
+
+    def _watchSetting(self, value):
+        with self.lock:
+            if id(value) not in self.watchedSettings:
+                value.addCallback(self._settingsChanged)
+                self.watchedSettings[id(value)] = value
+
+    def _settingsChanged(self):
+        # a new dict rather than clear(), so that a value looked up from the
+        # old settings by another thread only goes to the old cache
+        self.settingsCache = {}
+
+    def _channelValue(self, name, channel):
+        """
+        Return the value of a channel-specific setting, cached.
+
+        The channel value of every cached setting gets a registry callback
+        replacing the cache. Setting the global value goes through the
+        callbacks of the channel values which were not set explicitly.
+        """
+        cache = self.settingsCache
+        key = (name, channel)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        value = self.registryValue(name, channel, value=False)
+        self._watchSetting(value)
+        result = cache[key] = value()
+        return result
+
+    def _checklist(self, channel):
+        """
+        Return the matcher and the checklist of the systems enabled in channel,
+        see DiceEngine.checklist.
+        """
+        cache = self.settingsCache
+        key = ('checklist', channel)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        result = cache[key] = self.engine.checklist(
+            self._channelValue('systems', channel))
+        return result
+
+    def _metricsText(self):
+        money = self.moneyConverter
+        # the converter is created on first use, report zeros until then
+        (hits, misses, entries, size) = (0, 0, 0, 0) if money is None else \
+            (money.hits, money.misses, len(money.cache), money.cache.bytes)
+        return self.metrics.prometheus([
+            ('dicebot_money_lookups', (('result', 'hit'),), hits),
+            ('dicebot_money_lookups', (('result', 'miss'),), misses),
+            ('dicebot_money_cache_entries', (), entries),
+            ('dicebot_money_cache_bytes', (), size),
+            ('dicebot_budget_rejected_dice', (), self.budget.rejected_dice),
+            ('dicebot_pool_timeouts', (), self.pool.timeouts),
+        ])
+
+    def _dumpMetrics(self):
+        """
+        Write the metrics to metrics.file in the Prometheus text format.
+        """
+        if self.metrics is None:
+            return
+        filename = conf.supybot.directories.data.dirize(
+            self.registryValue('metrics.file'))
+        with open(filename + '.tmp', 'w') as f:
+            f.write(self._metricsText())
+        os.replace(filename + '.tmp', filename)
+
+    def _getDeck(self):
+        with self.lock:
+            if self.deck is None:
+                self.deck = Deck()
+        return self.deck
+
+    def _getMacros(self):
+        """
+        Return the macro store, creating it on first use. The macros are read
+        from macros.file when they are first needed.
+        """
+        with self.lock:
+            if self.macros is None:
+                filename = self.registryValue('macros.file')
+                self.macros = MacroStore(
+                    conf.supybot.directories.data.dirize(filename) if filename else None)
+        self.macros.maxPerUser = self.registryValue('macros.maxPerUser')
+        return self.macros
+
+    def _getMoneyConverter(self):
+        """
+        Return the money converter, creating it on first use.
+
+        The money module (and requests, once a rate is requested) is only
+        imported then.
+        """
+        with self.lock:
+            if self.moneyConverter is None:
+                from .money import MoneyConverter
+                self.moneyConverter = MoneyConverter(None,
+                    providers=self._makeProviders(),
+                    cache_size=self.registryValue('money.cacheSize'))
+        return self.moneyConverter
+
+    def _makeProviders(self):
+        from .money import ProviderSet, PROVIDERS
+        providers = []
+        for name in self.registryValue('money.providers'):
+            if name in PROVIDERS:
+                providers.append(PROVIDERS[name]())
+            else:
+                self.log.warning('Unknown currency rate provider %s.', name)
+        if not providers:
+            providers.append(PROVIDERS['currencyconverterapi']())
+        return ProviderSet(providers)
+
+    def _schedulePrefetch(self):
+        """
+        Schedule the refresh of popular currency rates shortly after the next
+        UTC midnight, when the cached rates expire.
+        """
+        day = 24 * 60 * 60
+        when = (time.time() // day + 1) * day + \
+            self.registryValue('money.prefetchDelay')
+        schedule.addEvent(self._prefetchRates, when, self.PREFETCH_EVENT)
+
+    def _prefetchRates(self):
+        """
+        Start the refresh of popular currency rates and schedule the next one.
+
+        Scheduled events run in the main loop of the bot, the requests are
+        made in a thread so that they do not stop it.
+        """
+        try:
+            count = self.registryValue('money.prefetchCount')
+            converter = self.moneyConverter
+            if count and converter is not None:
+                threading.Thread(target=self._prefetch,
+                                 args=(converter, count),
+                                 name='Dicebot.prefetchRates',
+                                 daemon=True).start()
+        finally:
+            self._schedulePrefetch()
+
+    def _prefetch(self, converter, count):
+        try:
+            fetched = converter.prefetch(count)
+        except Exception:
+            self.log.exception('Error prefetching currency rates:')
+        else:
+            self.log.debug('Prefetched %d currency rates.', fetched)
+
+    def _updateBudget(self):
+        budget = self.budget
+        budget.message_limit = self.registryValue('budget.messageDice')
+        budget.user_capacity = self.registryValue('budget.userDice')
+        budget.user_rate = self.registryValue('budget.userDicePerSecond')
+        budget.channel_capacity = self.registryValue('budget.channelDice')
+        budget.channel_rate = self.registryValue('budget.channelDicePerSecond')
+        return budget
+
+    def _process(self, irc, msg, text):
+        metrics = self.metrics
+        if metrics is None:
+            return self._processMessage(irc, msg, text)
+        start = time.perf_counter()
+        try:
+            return self._processMessage(irc, msg, text)
+        finally:
+            metrics.observe('dicebot_process_seconds',
+                            time.perf_counter() - start)
+
+    def _processMessage(self, irc, msg, text):
         """
         Process a message and reply with roll results, if any.
 
         The message is split to the words and each word is checked against all
-        known expression forms (first applicable form is used). All results
-        are printed together in the IRC reply.
-        """
-        checklist = [
-                (self.rollReStandard, self._parseStandardRoll),
-                (self.rollReSR, self._parseShadowrunRoll),
-                (self.rollReSRX, self._parseShadowrunXRoll),
-                (self.rollReSRE, self._parseShadowrunExtRoll),
-                (self.rollRe7Sea, self._parse7SeaRoll),
-                (self.rollRe7Sea2ed, self._parse7Sea2edRoll),
-                (self.rollReWoD, self._parseWoDRoll),
-                (self.rollReDH, self._parseDHRoll),
-                (self.rollReWG, self._parseWGRoll),
-                ]
-        results = []
+        expression forms of the systems enabled in the channel (first
+        applicable form is used). A word repeated in the message is checked
+        only once and its rolls are drawn together. The matched words are
+        rolled by _rollMatched.
+        """
+        channel = msg.args[0] if irc.isChannel(msg.args[0]) else None
+        (matcher, checklist) = self._checklist(channel)
+        matched = []
+        seen = {}
         for word in text.split():
-            for expr, parser in checklist:
-                m = expr.match(word)
-                if m:
-                    r = parser(m)
-                    if r:
-                        results.append(r)
-                        break
-        if results:
-            irc.reply('; '.join(results))
-
-    def _parseStandardRoll(self, m):
-        """
-        Parse rolls such as 3#2d6+1d4+2.
-
-        This is a roll (or several rolls) of several dice with optional
-        static modifiers. It yields one number (the sum of results and
-        modifiers) for each roll series.
-        """
-        rolls = int(m.group('rolls') or 1)
-        spec = m.group('spec')
-        if not spec[0] in '+-':
-            spec = '+' + spec
-        r = re.compile(r'(?P<sign>[+-])((?P<dice>\d*)d(?P<sides>\d+)|(?P<mod>\d+))')
-
-        totalMod = 0
-        totalDice = {}
-        for m in r.finditer(spec):
-            if not m.group('mod') is None:
-                totalMod += int(m.group('sign') + m.group('mod'))
+            entry = seen.get(word)
+            if entry is None:
+                entry = seen[word] = self.engine.match(word, matcher, checklist)
+            if entry[0]:
+                matched.append((word,) + entry)
+        self._rollMatched(irc, msg, channel, matched)
+
+    def _rollMatched(self, irc, msg, channel, matched):
+        """
+        Roll the (word, candidates, dice) triples matched in a message and
+        reply with the results, all together.
+
+        dice is the estimate of the dice the word draws. When the message goes
+        over the work budget of the user or the channel, it is truncated
+        there. Messages drawing at least pool.minDice dice are rolled in a
+        worker process and replied to asynchronously.
+        """
+        allowance = None
+        spent = 0
+        rejectedTokens = 0
+        rejectedDice = 0
+        plans = []
+        for (word, candidates, dice) in matched:
+            if allowance is None:
+                allowance = self._updateBudget().allowance(msg.prefix, channel)
+            if rejectedTokens or spent + dice > allowance:
+                rejectedTokens += 1
+                rejectedDice += dice
                 continue
-            dice = int(m.group('dice') or 1)
-            sides = int(m.group('sides'))
-            if dice > self.MAX_DICE or sides > self.MAX_SIDES or sides < self.MIN_SIDES:
+            spent += dice
+            plans.append((word, candidates))
+        if spent:
+            self.budget.consume(msg.prefix, channel, spent)
+        note = None
+        if rejectedTokens:
+            self.budget.reject(rejectedTokens, rejectedDice)
+            self.log.debug('Rejected %d expressions (%d dice) from %s.',
+                           rejectedTokens, rejectedDice, msg.prefix)
+            if not plans:
+                irc.error('Too many dice.')
                 return
-            if m.group('sign') == '-':
-                sides *= -1
-            totalDice[sides] = totalDice.get(sides, 0) + dice
-
-        if len(totalDice) == 0:
+            note = format('too many dice, %n skipped',
+                          (rejectedTokens, 'expression'))
+        if not plans:
             return
 
-        results = []
-        for _ in range(rolls):
-            result = totalMod
-            for sides, dice in totalDice.items():
-                if sides > 0:
-                    result += self._roll(dice, sides)
-                else:
-                    result -= self._roll(dice, -sides)
-            results.append(result)
-
-        specFormatted = ''
-        self.log.debug(repr(totalDice))
-        for sides, dice in sorted(list(totalDice.items()), key=itemgetter(0), reverse=True):
-            if sides > 0:
-                if len(specFormatted) > 0:
-                    specFormatted += '+'
-                specFormatted += '%dd%d' % (dice, sides)
-            else:
-                specFormatted += '-%dd%d' % (dice, -sides)
-        specFormatted += self._formatMod(totalMod)
-
-        return '[%s] %s' % (specFormatted, ', '.join([str(i) for i in results]))
-
-    def _parseShadowrunRoll(self, m):
-        """
-        Parse Shadowrun-specific roll such as 3#sd.
-        """
-        rolls = int(m.group('rolls'))
-        if rolls < 1 or rolls > self.MAX_DICE:
+        # counters of the audit seeds are handed out here, also for the rolls
+        # in worker processes
+        seeder = self.auditLog.reserve(len(plans)) \
+            if self.auditLog is not None else None
+        if spent >= self.registryValue('pool.minDice') and self._updatePool().enabled:
+            def done(value):
+                (results, metrics, tally) = value
+                if metrics is not None and self.metrics is not None:
+                    self.metrics.merge(metrics)
+                self._remember(irc, msg, channel, results, tally)
+                self._reply(irc, results, note)
+            # the worker must not import modules either, see RollPool
+            importlib.import_module('.sevenSea2EdRaiseRoller', __package__)
+            try:
+                self.pool.submit(self._evaluateInWorker,
+                                 (plans, self.metrics is not None,
+                                  self.stats is not None, seeder), done,
+                                 lambda e: irc.error(format('%s.', e)))
+            except PoolBusyError as e:
+                irc.error(format('%s, try again later.', e))
             return
-        L = self._rollMultiple(1, 6, rolls)
-        self.log.debug(format("%L", [str(i) for i in L]))
-        return self._processSRResults(L, rolls)
+        tally = Tally() if self.stats is not None else None
+        records = self._evaluate(plans, self.metrics, tally, seeder)
+        self._remember(irc, msg, channel, records, tally)
+        self._reply(irc, records, note)
+
+    def _updatePool(self):
+        self.pool.workers = self.registryValue('pool.workers')
+        self.pool.timeout = self.registryValue('pool.timeout')
+        return self.pool
+
+    def _evaluate(self, plans, metrics=None, tally=None, seeder=None):
+        """
+        Roll the expressions matched by _process.
+
+        Each plan is a word and the list of (parser, match) pairs it matched,
+        see DiceEngine.rollPlans. Parser calls are measured if metrics are
+        given, the dice drawn are counted in tally if it is given and drawn
+        from the audit seeds of seeder if that is given. The records are
+        rendered by _reply.
+        """
+        self.engine.tally = tally
+        self.engine.seeder = seeder
+        try:
+            if metrics is None:
+                return self.engine.rollPlans(plans)
+            return self.engine.rollPlans(
+                plans, lambda parser, m: self._measure(metrics, parser, m))
+        finally:
+            self.engine.tally = None
+            self.engine.seeder = None
+
+    def _evaluateInWorker(self, plans, measure, count, seeder):
+        # runs in a forked worker, it fills its own metrics and tally
+        metrics = Metrics() if measure else None
+        tally = Tally() if count else None
+        return (self._evaluate(plans, metrics, tally, seeder), metrics, tally)
+
+    def _measure(self, metrics, parser, m):
+        labels = (('parser', parser.__name__[len('_parse'):-len('Roll')]),)
+        dice = self.engine.diceDrawn
+        start = time.perf_counter()
+        r = parser(m)
+        metrics.observe('dicebot_parser_seconds', time.perf_counter() - start,
+                        labels)
+        metrics.inc('dicebot_parser_calls_total', labels)
+        metrics.inc('dicebot_dice_drawn_total', labels,
+                    self.engine.diceDrawn - dice)
+        return r
 
-    def _parseShadowrunXRoll(self, m):
-        """
-        Parse Shadowrun-specific 'exploding' roll such as 3#sdx.
+    @staticmethod
+    def _reply(irc, records, note=None):
+        if records:
+            irc.reply(renderReply(records, note))
+
+    def _autoRollEnabled(self, irc, channel):
         """
-        rolls = int(m.group('rolls'))
-        if rolls < 1 or rolls > self.MAX_DICE:
-            return
-        L = self._rollMultiple(1, 6, rolls)
-        self.log.debug(format("%L", [str(i) for i in L]))
-        reroll = L.count(6)
-        while reroll:
-            rerolled = self._rollMultiple(1, 6, reroll)
-            self.log.debug(format("%L", [str(i) for i in rerolled]))
-            L.extend([r for r in rerolled if r >= 5])
-            reroll = rerolled.count(6)
-        return self._processSRResults(L, rolls, True)
+        Check if automatic rolling is enabled for this context.
 
-    @staticmethod
-    def _processSRResults(results, pool, isExploding=False):
-        hits = results.count(6) + results.count(5)
-        ones = results.count(1)
-        isHit = hits > 0
-        isGlitch = ones >= (pool + 1) / 2
-        explStr = ', exploding' if isExploding else ''
-        if isHit:
-            hitsStr = format('%n', (hits, 'hit'))
-            glitchStr = ', glitch' if isGlitch else ''
-            return '(pool %d%s) %s%s' % (pool, explStr, hitsStr, glitchStr)
-        if isGlitch:
-            return '(pool %d%s) critical glitch!' % (pool, explStr)
-        return '(pool %d%s) 0 hits' % (pool, explStr)
-
-    def _parseShadowrunExtRoll(self, m):
-        """
-        Parse Shadowrun-specific Extended test roll such as 14,3#sde.
-        """
-        pool = int(m.group('pool'))
-        if pool < 1 or pool > self.MAX_DICE:
-            return
-        threshold = int(m.group('thr'))
-        if threshold < 1 or threshold > self.MAX_DICE:
-            return
-        result = 0
-        passes = 0
-        glitches = []
-        critGlitch = None
-        while result < threshold:
-            L = self._rollMultiple(1, 6, pool)
-            self.log.debug(format('%L', [str(i) for i in L]))
-            hits = L.count(6) + L.count(5)
-            result += hits
-            passes += 1
-            isHit = hits > 0
-            isGlitch = L.count(1) >= (pool + 1) / 2
-            if isGlitch:
-                if not isHit:
-                    critGlitch = passes
-                    break
-                glitches.append(ordinal(passes))
-
-        glitchStr = format(', glitch at %L', glitches) if len(glitches) > 0 else ''
-        if critGlitch is None:
-            return format('(pool %i, threshold %i) %n, %n%s',
-                          pool, threshold, (passes, 'pass'), (result, 'hit'), glitchStr)
+        The decision is cached per network and target until the settings
+        change.
+        """
+        cache = self.settingsCache
+        key = ('autoRoll', irc.network, channel)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        if irc.isChannel(channel):
+            enabled = self._channelValue('autoRoll', channel)
         else:
-            return format('(pool %i, threshold %i) critical glitch at %s pass%s, %n so far',
-                          pool, threshold, ordinal(critGlitch), glitchStr, (result, 'hit'))
+            enabled = self.registryValue('autoRollInPrivate')
+        cache[key] = enabled
+        return enabled
 
-    def _parse7Sea2edRoll(self, m):
-        """
-        Parse 7th Sea 2ed roll (4s2 is its simplest form). Full spec: https://redd.it/80l7jm
-        """
-        rolls = m.group('rolls')
-        if rolls is None:
-            return
-        # additional validation
-        if not re.match(self.validation7sea2ed, rolls):
-            return
+    @wrap(['somethingWithoutSpaces'])
+    def roll(self, irc, msg, args, text):
+        """<dice>d<sides>[<modifier>]
 
-        roll_count = eval(rolls)
-        if roll_count < 1 or roll_count > self.MAX_ROLLS:
+        Rolls a die with <sides> number of sides <dice> times, summarizes the
+        results and adds optional modifier <modifier>
+        For example, 2d6 will roll 2 six-sided dice; 10d10-3 will roll 10
+        ten-sided dice and subtract 3 from the total result.
+        The name of one of your macros rolls its expressions instead, see the
+        macro command.
+        """
+        channel = msg.args[0] if irc.isChannel(msg.args[0]) else None
+        matched = None
+        user = self._macroUser(msg)
+        if user is not None:
+            matched = self._getMacros().compiled(user, text,
+                                                 *self._checklist(channel),
+                                                 self.engine.match)
+        if matched is not None:
+            self._rollMatched(irc, msg, channel, matched)
             return
-        skill = int(m.group('skill'))
-        vivre = m.group('vivre') == '-'
-        explode = m.group('explode') == 'ex'
-        lashes = 0 if m.group('lashes') is None else int(m.group('lashes'))
-        cursed = m.group('cursed') is not None
-        self.log.debug(format('7sea2ed: %i (%s) dices at %i skill. lashes = %i. explode is %s. vivre is %s',
-            roll_count,
-            str(rolls),
-            skill,
-            lashes,
-            "enabled" if explode else "disabled",
-            "enabled" if vivre else "disabled"
-        ))
-        roller = SevenSea2EdRaiseRoller(
-            lambda x: self._rollMultiple(1, 10, x),
-            skill_rank=skill,
-            explode=explode,
-            lash_count=lashes,
-            joie_de_vivre=vivre,
-            raise_target=15 if cursed else 10)
-
-        return '[%s]: %s' % (m.group(0), str(roller.roll_and_count(roll_count)))
-
-
-    def _parse7SeaRoll(self, m):
-        """
-        Parse 7th Sea-specific roll (4k2 is its simplest form).
-        """
-        rolls = int(m.group('rolls'))
-        if rolls < 1 or rolls > self.MAX_ROLLS:
+        if self._autoRollEnabled(irc, msg.args[0]):
             return
-        count = int(m.group('count') or 1)
-        keep = int(m.group('keep'))
-        mod = int(m.group('mod') or 0)
-        prefix = m.group('prefix')
-        k = m.group('k')
-        explode = prefix != '-'
-        if keep < 1 or keep > self.MAX_ROLLS:
+        self._process(irc, msg, text)
+
+    @staticmethod
+    def _macroUser(msg):
+        """
+        Return the key of the macros of the sender, their registered user id,
+        or None if they are not recognized as a registered user.
+        """
+        try:
+            return str(ircdb.users.getUserId(msg.prefix))
+        except KeyError:
+            return None
+
+    @wrap(['user', ('literal', ('set', 'show', 'remove', 'list')),
+           optional('somethingWithoutSpaces'), optional('text')])
+    def macro(self, irc, msg, args, user, action, name, text):
+        """set <name> <expressions> | show <name> | remove <name> | list
+
+        Manages your roll macros: set makes roll <name> roll <expressions>
+        (for example, macro set attack 1d20+7 2d6+4), show shows them, remove
+        removes the macro and list lists the names of your macros. Macros
+        belong to registered users, you have to be recognized by the bot.
+        """
+        macros = self._getMacros()
+        user = str(user.id)
+        if action == 'list':
+            names = macros.names(user)
+            if not names:
+                irc.error('You have no macros.')
+                return
+            irc.reply(format('%L', names))
             return
-        if keep > rolls:
-            keep = rolls
-        if rolls > 10:
-            keep += rolls - 10
-            rolls = 10
-        if keep > 10:
-            mod += (keep - 10) * 10
-            keep = 10
-        unkept = (prefix == '+' or k == 'kk') and keep < rolls
-        explodeStr = ', not exploding' if not explode else ''
-        results = []
-        for _ in range(count):
-            L = self._rollMultiple(1, 10, rolls)
-            if explode:
-                for i in range(len(L)):
-                    if L[i] == 10:
-                        while True:
-                            rerolled = self._roll(1, 10)
-                            L[i] += rerolled
-                            if rerolled < 10:
-                                break
-            self.log.debug(format("%L", [str(i) for i in L]))
-            L.sort(reverse=True)
-            keptDice, unkeptDice = L[:keep], L[keep:]
-            unkeptStr = ' | %s' % ', '.join([str(i) for i in unkeptDice]) if unkept else ''
-            keptStr = ', '.join([str(i) for i in keptDice])
-            results.append('(%d) %s%s' % (sum(keptDice) + mod, keptStr, unkeptStr))
-
-        return '[%dk%d%s%s] %s' % (rolls, keep, self._formatMod(mod), explodeStr,
-                                   '; '.join(results))
-
-    def _parseWoDRoll(self, m):
-        """
-        Parse New World of Darkness roll (5w)
-        """
-        rolls = int(m.group('rolls'))
-        if rolls < 1 or rolls > self.MAX_ROLLS:
+        if name is None:
+            irc.error(format('%s needs a macro name.', action))
             return
-        if m.group('explode') == '-':
-            explode = 0
-        elif m.group('explode') is not None and m.group('explode').isdigit():
-            explode = int(m.group('explode'))
-            if explode < 8 or explode > 10:
-                explode = 10
-        else:
-            explode = 10
-        L = self._rollMultiple(1, 10, rolls)
-        self.log.debug(format("%L", [str(i) for i in L]))
-        successes = len([x for x in L if x >= 8])
-        if explode:
-            for i in range(len(L)):
-                if L[i] >= explode:
-                    while True:
-                        rerolled = self._roll(1, 10)
-                        self.log.debug(str(rerolled))
-                        if rerolled >= 8:
-                            successes += 1
-                        if rerolled < explode:
-                            break
-
-        if explode == 0:
-            explStr = ', not exploding'
-        elif explode != 10:
-            explStr = ', %d-again' % explode
+        if action == 'set':
+            try:
+                macros.validate(name, text or '', *self.engine.checklist(),
+                                self.engine.match)
+                macros.set(user, name, text)
+            except MacroError as e:
+                irc.error(format('%s.', e))
+                return
+            irc.replySuccess()
+        elif action == 'show':
+            text = macros.get(user, name)
+            if text is None:
+                irc.error(format('You have no macro %s.', name))
+                return
+            irc.reply(format('%s: %s', name, text))
+        elif not macros.remove(user, name):
+            irc.error(format('You have no macro %s.', name))
         else:
-            explStr = ''
+            irc.replySuccess()
 
-        result = format('%n', (successes, 'success')) if successes > 0 else 'FAIL'
-        return '(%d%s) %s' % (rolls, explStr, result)
+    @wrap(['somethingWithoutSpaces', optional('positiveInt')])
+    def simulate(self, irc, msg, args, expression, trials):
+        """<expression> [<trials>]
 
-    def _parseDHRoll(self, m):
-        """
-        Parse Dark Heresy roll (3vs(20+30-10))
+        Rolls the 7th Sea 2ed <expression> (such as 8s3l1ex) <trials> times
+        (simulation.maxTrials by default and at most) and shows the mean,
+        percentiles and most common numbers of raises. The rolls are split
+        across worker processes, the reply comes when they are done.
         """
-        rolls = int(m.group('rolls') or 1)
-        if rolls < 1 or rolls > self.MAX_ROLLS:
+        from . import simulation
+        if simulation.parse(expression, self.engine) is None:
+            irc.error(format('%q is not a 7th Sea 2ed roll.', expression))
             return
-
-        thresholdExpr = m.group('thr')
-        # additional validation
-        if not re.match(self.validationDH, thresholdExpr):
+        maxTrials = self.registryValue('simulation.maxTrials')
+        trials = min(trials or maxTrials, maxTrials)
+
+        def done(histogram):
+            irc.reply(format('[%s] %n: %s', expression,
+                             (histogram.count, 'trial'),
+                             simulation.summary(histogram)))
+        pool = self._updatePool()
+        if not pool.enabled:
+            done(simulation.runChunk(expression, trials, None))
             return
-
-        threshold = eval(thresholdExpr)
-        rollResults = self._rollMultiple(1, 100, rolls)
-        results = [threshold - roll for roll in rollResults]
-        return '%s (%s vs %d)' % (', '.join([str(i) for i in results]),
-                                  ', '.join([str(i) for i in rollResults]),
-                                  threshold)
-
-    def _parseWGRoll(self, m):
-        """
-        Parse WH40K: Wrath & Glory roll (10#wg)
-        """
-        rolls = int(m.group('rolls') or 1)
-        if rolls < 1 or rolls > self.MAX_ROLLS:
+        if not pool.free:
+            irc.error('too many rolls in progress, try again later.')
             return
-
-        L = self._rollMultiple(1, 6, rolls)
-        self.log.debug(format("%L", [str(i) for i in L]))
-        return self._processWGResults(L, rolls)
+        chunks = simulation.split(
+            trials, min(self.registryValue('simulation.workers'), pool.free))
+        collector = simulation.Collector(
+            len(chunks), done, lambda e: irc.error(format('%s.', e)))
+        for (size, seed) in zip(chunks, simulation.chunkSeeds(None, len(chunks))):
+            try:
+                pool.submit(simulation.runChunk, (expression, size, seed),
+                            collector.add, collector.fail)
+            except PoolBusyError as e:
+                # other rolls took the free workers meanwhile, the chunks
+                # already submitted are dropped
+                collector.fail(format('%s, try again later', e))
+                return
 
     @staticmethod
-    def _processWGResults(results, pool):
-        wrathstrings=["❶","❷","❸","❹","❺","❻"]
-        strTag=""
-
-        wrathDie=results.pop(0)
-        n6 = results.count(6)
-        n5 = results.count(5)
-        n4 = results.count(4)
-        icons = 2 * n6 + n5 + n4
-
-        Glory = wrathDie == 6
-        Complication = wrathDie == 1
-
-        iconssymb = wrathstrings[wrathDie-1] + " "
-        if Glory:
-            strTag += "| Glory"
-            icons += 2
-        elif wrathDie > 3:
-            icons += 1
-        elif Complication:
-            strTag += "| Complication"
-        iconssymb += n6 * "➅ " + n5 * "5 " + n4 * "4 "
-        isNonZero = icons > 0
-        if isNonZero:
-            iconsStr = str(icons) + " icon(s): " + iconssymb + strTag
-            return '[pool %d] %s' % (pool, iconsStr)
+    def _formatEntry(entry, now):
+        values = 'not kept' if entry.values is None else joinNumbers(entry.values)
+        return format('%s %s: %s, %T ago', entry.nick, entry.expression, values,
+                      int(now - entry.when))
+
+    @wrap(['channel', optional('nick')])
+    def lastroll(self, irc, msg, args, channel, nick):
+        """[<channel>] [<nick>]
+
+        Shows the last roll of <nick> (you by default) in <channel>. <channel>
+        is only necessary if the message isn't sent in the channel itself.
+        """
+        nick = nick or msg.nick
+        history = self.histories.get((irc.network, channel))
+        entries = history.last(1, nick, ircutils.toLower) \
+            if history is not None else []
+        if not entries:
+            irc.error(format('%s has not rolled in %s.', nick, channel))
+            return
+        irc.reply(self._formatEntry(entries[0], time.time()))
 
-    def _autoRollEnabled(self, irc, channel):
-        """
-        Check if automatic rolling is enabled for this context.
-        """
-        return ((irc.isChannel(channel) and
-                self.registryValue('autoRoll', channel)) or
-                (not irc.isChannel(channel) and
-                self.registryValue('autoRollInPrivate')))
+    @wrap(['channel', optional('positiveInt', 5)])
+    def history(self, irc, msg, args, channel, count):
+        """[<channel>] [<count>]
 
-    @wrap(['somethingWithoutSpaces'])
-    def roll(self, irc, msg, args, text):
-        """<dice>d<sides>[<modifier>]
-
-        Rolls a die with <sides> number of sides <dice> times, summarizes the
-        results and adds optional modifier <modifier>
-        For example, 2d6 will roll 2 six-sided dice; 10d10-3 will roll 10
-        ten-sided dice and subtract 3 from the total result.
+        Shows the last <count> (5 by default) rolls in <channel>, newest
+        first. <channel> is only necessary if the message isn't sent in the
+        channel itself.
         """
-        if self._autoRollEnabled(irc, msg.args[0]):
+        history = self.histories.get((irc.network, channel))
+        entries = history.last(count) if history is not None else []
+        if not entries:
+            irc.error(format('There were no rolls in %s.', channel))
             return
-        self._process(irc, text)
+        now = time.time()
+        irc.reply('; '.join(self._formatEntry(entry, now) for entry in entries))
 
     @wrap
     def shuffle(self, irc, msg, args):
@@ -487,7 +765,7 @@ class Dicebot(callbacks.Plugin):
 
         Restores and shuffles the deck.
         """
-        self.deck.shuffle()
+        self._getDeck().shuffle()
         irc.reply('shuffled')
 
     @wrap([additional('positiveInt', 1)])
@@ -496,40 +774,162 @@ class Dicebot(callbacks.Plugin):
 
         Draws <count> cards (1 if omitted) from the deck and shows them.
         """
-        cards = [next(self.deck) for i in range(count)]
-        irc.reply(', '.join(cards))
+        irc.reply(', '.join(self._getDeck().draw(count)))
     deal = draw
 
+    # a slow currency rate lookup must not hold up the bot; all the state
+    # shared with other commands is locked or per-thread, so that
+    # supybot.debug.threadAllCommands is safe as well
+    @thread
     @wrap([rest('anything')])
     def money(self, irc, msg, args, user_input):
         """
         Converts money using some online service. Syntax is:
-        !m <amount> (<to>)*
-        amount is either $200, 200$, 200 $ or 200 USD
+        !m <amount>+ (<to>)*
+        amount is either $200, 200$, 200 $ or 200 USD, several amounts are
+        converted at once.
         if <to> is omitted, then it is assumed to be ['usd', 'eur'].
         """
+        from .money import UnknownCurrencyError, NoProviderError
         self.log.debug(user_input)
         if user_input is None:
             self.log.debug('user_input is None')
             return
 
-        user_input = self.convertMoney.match(user_input)
-
-        if user_input.group('prefix') is not None:
-            input = user_input.group('p_curr')
-            amount = float(user_input.group('p_amount'))
-        elif user_input.group('suffix') is not None:
-            input = user_input.group('s_curr')
-            amount = float(user_input.group('s_amount'))
-        else:
-            self.log.debug('user_input does not have prefix and suffix.')
+        amounts = []
+        outputs = []
+        for m in self.convertMoney.finditer(user_input):
+            if m.group('prefix') is not None:
+                input = m.group('p_curr')
+                amount = m.group('p_amount')
+            else:
+                input = m.group('s_curr')
+                amount = m.group('s_amount')
+            amounts.append((float(amount.replace(',', '.')), input))
+            for x in m.group('output').split():
+                if x not in outputs:
+                    outputs.append(x)
+        if not amounts:
+            self.log.debug('user_input does not have any amounts.')
             return
 
-        outputs = ('' if user_input.group('output') is None else user_input.group('output')).split()
-        outputs = ['usd', 'eur'] if len(outputs) == 0 else [x for x in outputs if x is not None and len(x) > 0]
-        irc.reply(self.money.convert(amount, input, outputs))
+        outputs = outputs or ['usd', 'eur']
+        try:
+            irc.reply(self._getMoneyConverter().convert_many(amounts, outputs))
+        except UnknownCurrencyError as e:
+            irc.error(format('Unknown currency pair %s.', e.args[0]))
+        except (NoProviderError, TimeoutError) as e:
+            irc.error(str(e))
     m = money
 
+    @wrap
+    def moneystats(self, irc, msg, args):
+        """takes no arguments
+
+        Shows the currency rate cache statistics.
+        """
+        money = self._getMoneyConverter()
+        cache = money.cache
+        irc.reply('%d lookups, %.1f%% hit ratio, %d prefetched, '
+                  '%d prefetch errors; %d entries, %d bytes, %d evictions, '
+                  '%d expirations' % (money.hits + money.misses,
+                                      money.hit_ratio * 100,
+                                      money.prefetches, money.prefetch_errors,
+                                      len(cache), cache.bytes,
+                                      cache.evictions, cache.expirations) +
+                  ''.join('; %s %s, %d failures, p95 %.2fs' % (
+                      x.name, 'up' if health.available() else 'down',
+                      health.failures, health.p95())
+                      for (x, health) in money.providers.health.items()))
+
+    @staticmethod
+    def _formatDieStats(stats):
+        text = 'd%d: %d dice, mean %.2f (%.2f expected), sd %.2f' % (
+            stats.sides, stats.count, stats.mean(), (stats.sides + 1) / 2,
+            stats.stddev())
+        # the approximation needs at least 5 rolls of every face expected
+        if stats.count < 5 * stats.sides:
+            return text + ', too few for chi-square'
+        return text + ', chi-square %.1f (p %.2f)' % (stats.chiSquare(),
+                                                  stats.pValue())
+
+    @wrap([optional('nick')])
+    def dicestats(self, irc, msg, args, nick):
+        """[<nick>]
+
+        Shows how many dice <nick> rolled on every die size, their mean and
+        standard deviation and the chi-square fairness score with its p-value,
+        when stats are enabled. Without <nick>, shows the number of calls,
+        dice drawn and median and 99th percentile latency of every game
+        system, when metrics are enabled; this requires the admin capability.
+        """
+        if nick is not None:
+            if self.stats is None:
+                irc.error('Stats are disabled, see the stats.enabled '
+                          'configuration variable.')
+                return
+            dice = self.stats.get(ircutils.toLower(nick))
+            if not dice:
+                irc.error(format('%s has not rolled any dice.', nick))
+                return
+            irc.reply('%s: %s' % (nick, '; '.join(self._formatDieStats(s)
+                                                  for s in dice)))
+            return
+        if not ircdb.checkCapability(msg.prefix, 'admin'):
+            irc.errorNoCapability('admin')
+            return
+        metrics = self.metrics
+        if metrics is None:
+            irc.error('Metrics are disabled, see the metrics.enabled '
+                      'configuration variable.')
+            return
+        process = metrics.histogram('dicebot_process_seconds')
+        stats = ['%d messages, p50 %.2fms, p99 %.2fms' % (
+            process.count, process.percentile(50) * 1000,
+            process.percentile(99) * 1000)]
+        for parser in metrics.labels('dicebot_parser_calls_total', 'parser'):
+            labels = (('parser', parser),)
+            latency = metrics.histogram('dicebot_parser_seconds', labels)
+            stats.append('%s: %d calls, %d dice, p50 %.2fms, p99 %.2fms' % (
+                parser, metrics.counter('dicebot_parser_calls_total', labels),
+                metrics.counter('dicebot_dice_drawn_total', labels),
+                latency.percentile(50) * 1000, latency.percentile(99) * 1000))
+        money = self.moneyConverter
+        if money is not None:
+            stats.append('money: %d hits, %d misses' % (money.hits, money.misses))
+        irc.reply('; '.join(stats))
+
+    @wrap(['owner', 'positiveInt',
+           optional(('literal', ('messages', 'seconds')), 'messages')])
+    def profile(self, irc, msg, args, amount, unit):
+        """<amount> [messages|seconds]
+
+        Profiles message processing and money conversion for the next <amount>
+        messages (default) or seconds, then writes the stats in the pstats
+        format to the data directory.
+        """
+        if self.profiler is not None:
+            irc.error('Already profiling.')
+            return
+        filename = conf.supybot.directories.data.dirize(
+            time.strftime('Dicebot-%Y%m%d-%H%M%S.pstats'))
+        def done(filename):
+            self.profiler = None
+            try:
+                schedule.removeEvent(self.PROFILE_EVENT)
+            except KeyError:
+                pass
+            self.log.info('Profile written to %s.', filename)
+            irc.reply(format('Profile written to %s.', filename))
+        self.profiler = MethodProfiler(self,
+            ['_process', 'doPrivmsg', 'money', 'm'], filename,
+            messages=amount if unit == 'messages' else None, on_done=done)
+        self.profiler.start()
+        if unit == 'seconds':
+            schedule.addEvent(self.profiler.stop, time.time() + amount,
+                              self.PROFILE_EVENT)
+        irc.replySuccess()
+
     def doPrivmsg(self, irc, msg):
         if not self._autoRollEnabled(irc, msg.args[0]):
             return
@@ -537,7 +937,7 @@ class Dicebot(callbacks.Plugin):
             text = ircmsgs.unAction(msg)
         else:
             text = msg.args[1]
-        self._process(irc, text)
+        self._process(irc, msg, text)
 
 Class = Dicebot
 
@@ -0,0 +1,141 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import cProfile
+import functools
+import pstats
+import threading
+
+_missing = object()
+
+
+class MethodProfiler:
+    """
+    cProfile collection over some methods of an object.
+
+    start() shadows the methods with profiled wrappers set on the instance,
+    stop() deletes them again, so there is no cost at all when not profiling.
+    Profiling stops by itself after messages calls of count_method, if given.
+    The stats are written to filename and passed to on_done.
+
+    cProfile only sees the thread it is enabled in, so every thread calling
+    the methods gets its own profile and call depth, and the profiles are
+    merged by stop(). Calls still running in other threads then are left out.
+    """
+
+    def __init__(self, obj, names, filename, messages=None,
+                 count_method='doPrivmsg', on_done=None):
+        self.obj = obj
+        self.names = names
+        self.filename = filename
+        self.messages = messages
+        self.count_method = count_method
+        self.on_done = on_done
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.profiles = []
+        self.active = set()
+        self.calls = 0
+        self.running = False
+
+    def _enable(self):
+        """
+        Enable the profile of the calling thread, return it or None if it
+        cannot be profiled.
+        """
+        profile = getattr(self.local, 'profile', None)
+        with self.lock:
+            if not self.running:
+                return None
+            if profile is None:
+                profile = self.local.profile = cProfile.Profile()
+                self.profiles.append(profile)
+            self.active.add(profile)
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ has one profiler for all threads, it is taken
+            with self.lock:
+                self.active.discard(profile)
+            return None
+        return profile
+
+    def _disable(self, profile, name):
+        if profile is not None:
+            profile.disable()
+            with self.lock:
+                self.active.discard(profile)
+        if name != self.count_method:
+            return
+        with self.lock:
+            self.calls += 1
+            done = self.messages is not None and self.calls >= self.messages
+        if done:
+            self.stop()
+
+    def _wrap(self, name):
+        method = getattr(type(self.obj), name)
+        profiler = self
+
+        # Limnoria recognizes commands by the names of their positional
+        # arguments, so the wrapper keeps (self, irc, msg, args).
+        @functools.wraps(method)
+        def wrapper(self, irc, msg, args=_missing, *rest, **kwargs):
+            call_args = (irc, msg) if args is _missing else (irc, msg, args) + rest
+            local = profiler.local
+            depth = getattr(local, 'depth', 0)
+            local.depth = depth + 1
+            if depth == 0:
+                profile = profiler._enable()
+            try:
+                return method(self, *call_args, **kwargs)
+            finally:
+                local.depth = depth
+                if depth == 0:
+                    profiler._disable(profile, name)
+        return wrapper
+
+    def start(self):
+        for name in self.names:
+            setattr(self.obj, name, self._wrap(name).__get__(self.obj))
+        self.running = True
+
+    def stop(self):
+        with self.lock:
+            if not self.running:
+                return
+            self.running = False
+            profiles = [p for p in self.profiles if p not in self.active]
+        for name in self.names:
+            delattr(self.obj, name)
+        stats = pstats.Stats(*profiles[:1])
+        stats.add(*profiles[1:])
+        stats.dump_stats(self.filename)
+        if self.on_done is not None:
+            self.on_done(self.filename)
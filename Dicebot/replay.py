@@ -0,0 +1,261 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+"""
+Replay of IRC logs through the plugin, for load testing automatic rolling.
+
+Run as python -m Dicebot.replay LOGFILE. Every message of an irssi or
+weechat log is passed to doPrivmsg as a PRIVMSG (or an ACTION) to the same
+channel, which has autoRoll enabled, as fast as possible or at --speed times
+the pace of the log. The log is read line by line, so it may be of any size.
+Messages per second, replies per second and doPrivmsg latency percentiles
+are reported at the end.
+"""
+
+from collections import namedtuple
+import argparse
+import datetime
+import re
+import sys
+import threading
+import time
+
+import supybot.conf as conf
+import supybot.ircmsgs as ircmsgs
+
+from .benchmark import FakeIrc, make_plugin
+from .metrics import Histogram
+
+LogLine = namedtuple('LogLine', 'time nick text action')
+
+# 1 us to 10 s, ten buckets per decade
+LATENCY_BOUNDS = tuple(10 ** (e / 10) for e in range(-60, 11))
+
+NICK_MODES = '~&@%+'
+
+irssiLine = re.compile(r'(?P<time>\d\d:\d\d(:\d\d)?) +'
+                       r'(<[ ~&@%+]?(?P<nick>[^>]+)> (?P<text>.*)|'
+                       r'\* (?P<anick>\S+) (?P<atext>.*))$')
+
+
+def parse_irssi(line):
+    """
+    Parse a line of an irssi log: "12:34 <@nick> text" or "12:34  * nick
+    text". The time is in seconds since midnight.
+    """
+    m = irssiLine.match(line)
+    if not m:
+        return None
+    parts = [int(x) for x in m.group('time').split(':')]
+    seconds = parts[0] * 3600 + parts[1] * 60 + (parts[2] if len(parts) > 2 else 0)
+    if m.group('nick') is not None:
+        return LogLine(seconds, m.group('nick'), m.group('text'), False)
+    return LogLine(seconds, m.group('anick'), m.group('atext'), True)
+
+
+def parse_weechat(line):
+    """
+    Parse a line of a weechat log: "2026-10-19 12:34:56<TAB>@nick<TAB>text",
+    actions have " *" in place of the nick. The time is a Unix timestamp.
+    """
+    fields = line.split('\t', 2)
+    if len(fields) != 3:
+        return None
+    (stamp, nick, text) = fields
+    nick = nick.strip()
+    action = nick == '*'
+    if action:
+        (nick, _, text) = text.partition(' ')
+    elif not nick or nick in ('-->', '<--', '--', '=!=') or nick[0] == '-':
+        return None
+    nick = nick.lstrip(NICK_MODES)
+    try:
+        seconds = datetime.datetime.strptime(stamp, '%Y-%m-%d %H:%M:%S').timestamp()
+    except ValueError:
+        seconds = None
+    return LogLine(seconds, nick, text, action)
+
+
+def parse_any(line):
+    return parse_weechat(line) if '\t' in line else parse_irssi(line)
+
+
+FORMATS = {'irssi': parse_irssi, 'weechat': parse_weechat, 'auto': parse_any}
+
+
+def read_log(lines, parse=parse_any):
+    """
+    Yield a LogLine for every message in lines, skipping everything else.
+
+    Times going back by more than half a day are taken as the next day, as
+    irssi logs only have the time of day.
+    """
+    offset = 0
+    last = None
+    for line in lines:
+        record = parse(line.rstrip('\r\n'))
+        if record is None or not record.nick:
+            continue
+        if record.time is not None:
+            if last is not None and record.time + offset < last - 43200:
+                offset += 86400
+            last = record.time + offset
+            record = record._replace(time=last)
+        yield record
+
+
+class CountingIrc(FakeIrc):
+    """
+    Fake irc which only counts the replies, so that memory use stays flat.
+    """
+
+    def __init__(self):
+        super(CountingIrc, self).__init__()
+        self.lock = threading.Lock()
+        self.replyCount = 0
+        self.errorCount = 0
+
+    def reply(self, s, *args, **kwargs):
+        with self.lock:
+            self.replyCount += 1
+
+    def error(self, s, *args, **kwargs):
+        with self.lock:
+            self.errorCount += 1
+
+
+class Replay:
+    """
+    Feed log records to the doPrivmsg of plugin and measure it.
+
+    With speed 0 the records are sent as fast as possible, otherwise the
+    delays between them are those of the log divided by speed.
+    """
+
+    def __init__(self, plugin, irc=None, channel='#replay', speed=0):
+        self.plugin = plugin
+        self.irc = irc or CountingIrc()
+        self.channel = channel
+        self.speed = speed
+        self.latency = Histogram(LATENCY_BOUNDS)
+        self.maxLatency = 0.0
+        self.messages = 0
+        self.elapsed = 0.0
+
+    def message(self, record):
+        prefix = '{0}!{0}@replay'.format(record.nick)
+        if record.action:
+            return ircmsgs.action(self.channel, record.text, prefix=prefix)
+        return ircmsgs.privmsg(self.channel, record.text, prefix=prefix)
+
+    def run(self, records, limit=None):
+        start = time.perf_counter()
+        first = None
+        for record in records:
+            if limit is not None and self.messages >= limit:
+                break
+            if self.speed and record.time is not None:
+                if first is None:
+                    first = record.time
+                delay = start + (record.time - first) / self.speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            msg = self.message(record)
+            before = time.perf_counter()
+            self.plugin.doPrivmsg(self.irc, msg)
+            latency = time.perf_counter() - before
+            self.latency.observe(latency)
+            if latency > self.maxLatency:
+                self.maxLatency = latency
+            self.messages += 1
+        self.elapsed = time.perf_counter() - start
+
+    def wait(self, timeout):
+        """
+        Wait up to timeout seconds for the rolls running in worker processes.
+        """
+        deadline = time.monotonic() + timeout
+        while self.plugin.pool.running and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def report(self):
+        elapsed = self.elapsed or float('inf')
+        replies = self.irc.replyCount + self.irc.errorCount
+        return '\n'.join([
+            'messages: {0} in {1:.2f} s, {2:.1f}/s'.format(
+                self.messages, self.elapsed, self.messages / elapsed),
+            'replies: {0} ({1} errors), {2:.1f}/s'.format(
+                replies, self.irc.errorCount, replies / elapsed),
+            'latency: p50 {0} p95 {1} p99 {2} max {3}'.format(
+                *[_formatSeconds(min(self.latency.percentile(p), self.maxLatency))
+                  for p in (50, 95, 99)],
+                _formatSeconds(self.maxLatency)),
+        ])
+
+
+def _formatSeconds(seconds):
+    if seconds < 1e-3:
+        return '{0:.1f}us'.format(seconds * 1e6)
+    if seconds < 1:
+        return '{0:.2f}ms'.format(seconds * 1e3)
+    return '{0:.2f}s'.format(seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m Dicebot.replay',
+                                     description='Replay an IRC log through Dicebot.')
+    parser.add_argument('log', help='irssi or weechat log file, - for stdin')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='auto')
+    parser.add_argument('--speed', type=float, default=0,
+                        help='replay at this multiple of the log pace, '
+                             '0 for as fast as possible (default)')
+    parser.add_argument('--channel', default='#replay')
+    parser.add_argument('--limit', type=int, help='stop after this many messages')
+    args = parser.parse_args(argv)
+
+    plugin = make_plugin()
+    conf.supybot.plugins.Dicebot.autoRoll.setValue(True)
+    replay = Replay(plugin, channel=args.channel, speed=args.speed)
+    if args.log == '-':
+        log = sys.stdin
+    else:
+        log = open(args.log, encoding='utf-8', errors='replace')
+    try:
+        replay.run(read_log(log, FORMATS[args.format]), args.limit)
+        replay.wait(plugin.registryValue('pool.timeout'))
+    finally:
+        if log is not sys.stdin:
+            log.close()
+        plugin.die()
+    print(replay.report())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
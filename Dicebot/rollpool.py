@@ -0,0 +1,155 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import logging
+import multiprocessing
+import os
+import random
+import threading
+
+
+def _run(function, args, conn):
+    # The worker is forked from the bot, whose other threads may hold locks
+    # at that moment, which then stay locked in the worker for good. So jobs
+    # must not log nor use locks shared with the bot, and the worker leaves
+    # with os._exit() instead of the cleanup of multiprocessing, which flushes
+    # the standard streams.
+    logging.disable(logging.CRITICAL)
+    random.seed()
+    try:
+        try:
+            conn.send((True, function(*args)))
+        except Exception as e:
+            conn.send((False, '%s: %s' % (type(e).__name__, e)))
+    finally:
+        conn.close()
+        os._exit(0)
+
+
+class PoolBusyError(Exception):
+    pass
+
+
+class RollPool:
+    """
+    Bounded pool of worker processes for expensive rolls.
+
+    Each job runs in its own forked process, so that it does not hold the GIL
+    of the bot and can be killed when it takes longer than timeout seconds.
+    At most workers jobs run at the same time. The results are passed to
+    callback (or the error to errback) from a watcher thread.
+
+    Only the forking thread exists in the worker, locks held by the others
+    are never released there. Logging is disabled in the workers, and jobs
+    must not use other locks shared with the threads of the bot, such as
+    those of Metrics or DiceStats: they get their own objects to fill and
+    return. They must not import modules the bot has not imported yet
+    either, the import of another thread may hold its lock.
+    """
+
+    available = 'fork' in multiprocessing.get_all_start_methods()
+
+    def __init__(self, workers=2, timeout=10):
+        self.workers = workers
+        self.timeout = timeout
+        self.running = set()
+        self.lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self):
+        return self.available and self.workers > 0
+
+    @property
+    def free(self):
+        """
+        Number of jobs which can be submitted now.
+        """
+        return max(0, self.workers - len(self.running))
+
+    def submit(self, function, args, callback, errback):
+        """
+        Run function(*args) in a worker process. The function must not use
+        locks shared with other threads, see the class docstring.
+
+        Raises PoolBusyError if all workers are busy.
+        """
+        context = multiprocessing.get_context('fork')
+        with self.lock:
+            if len(self.running) >= self.workers:
+                self.rejected += 1
+                raise PoolBusyError('too many rolls in progress')
+            (parent, child) = context.Pipe(duplex=False)
+            process = context.Process(target=_run, args=(function, args, child),
+                                      daemon=True)
+            process.start()
+            child.close()
+            self.running.add(process)
+        threading.Thread(target=self._watch,
+                         args=(process, parent, callback, errback),
+                         daemon=True).start()
+
+    def _watch(self, process, conn, callback, errback):
+        counter = 'failed'
+        try:
+            if conn.poll(self.timeout):
+                (ok, value) = conn.recv()
+                if ok:
+                    counter = 'completed'
+                else:
+                    value = RuntimeError(value)
+            else:
+                counter = 'timeouts'
+                (ok, value) = (False, TimeoutError('roll took too long'))
+        except EOFError:
+            (ok, value) = (False, RuntimeError('roll worker died'))
+        finally:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+            conn.close()
+            # the counters are updated by all watcher threads
+            with self.lock:
+                self.running.discard(process)
+                setattr(self, counter, getattr(self, counter) + 1)
+        if ok:
+            callback(value)
+        else:
+            errback(value)
+
+    def close(self):
+        """
+        Kill all running jobs.
+        """
+        with self.lock:
+            for process in self.running:
+                process.terminate()
@@ -29,7 +29,6 @@
 ###
 
 import random
-import pytest
 from collections import defaultdict
 
 class RollResult:
@@ -142,12 +141,12 @@ class RaiseAggregator:
 
             target = self.raise_target - raise_sum
             next_dice = self.get_lower_dice(target) if down else self.get_higher_dice(target)
+            if next_dice is None and down:
+                # we are going down. Let's grab one dice above and continue,
+                # lashed dice (worth 0) are never grabbed
+                next_dice = self.get_higher_dice(0)
             if next_dice is not None:
                 raise_candidate.append(next_dice)
-            elif self.dice_count > 0 and down:
-                # we are going down. Let's grab one dice above and continue
-                raise_candidate.append(self.get_higher_dice(0))
-                continue
             elif self.ten_is_still_raise and raise_sum >= 10:
                 return Raise(1, raise_candidate)
             else:
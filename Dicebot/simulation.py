@@ -0,0 +1,243 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+"""
+Monte Carlo simulation of 7th Sea 2ed raise counts.
+
+Raises of a 7th Sea 2ed roll have no closed form, the dice are paired
+greedily by RaiseAggregator. simulate() rolls an expression such as 8s3l1ex
+many times, split into chunks run by worker processes, each with its own
+random generator, and merges the histograms of raises as the chunks finish.
+
+    python -m Dicebot.simulation 8s3l1ex --trials 100000 --workers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+
+from .engine import DiceEngine
+
+MAX_TRIALS = 10000000
+
+
+class RaiseHistogram:
+    """
+    Number of trials giving each number of raises: counts[i] trials gave i
+    raises.
+    """
+
+    def __init__(self):
+        self.counts = []
+        self.count = 0
+        self.sum = 0
+
+    def add(self, raises, trials=1):
+        if raises >= len(self.counts):
+            self.counts.extend([0] * (raises + 1 - len(self.counts)))
+        self.counts[raises] += trials
+        self.count += trials
+        self.sum += raises * trials
+
+    def merge(self, other):
+        for (raises, count) in enumerate(other.counts):
+            if count:
+                self.add(raises, count)
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """
+        Smallest number of raises at least p percent of the trials got.
+        """
+        rank = p * self.count / 100
+        seen = 0
+        for (raises, count) in enumerate(self.counts):
+            seen += count
+            if seen >= rank and seen:
+                return raises
+        return 0
+
+
+def split(trials, chunks):
+    """
+    Split trials into at most chunks chunks differing by at most one trial.
+    """
+    chunks = max(1, min(chunks, trials))
+    (size, extra) = divmod(trials, chunks)
+    return [size + 1 if i < extra else size for i in range(chunks)]
+
+
+def chunkSeeds(seed, chunks):
+    """
+    Return independent seeds for chunks random generators, derived from
+    seed, or from the system's randomness if seed is None.
+    """
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for _ in range(chunks)]
+
+
+def parse(expression, engine=None):
+    """
+    Check a 7th Sea 2ed roll expression, return its match or None.
+    """
+    engine = engine or DiceEngine()
+    m = engine.rollRe7Sea2ed.match(expression)
+    if m is None or engine.raiseRoller(m) is None:
+        return None
+    return m
+
+
+def runChunk(expression, trials, seed):
+    """
+    Roll expression trials times with a generator seeded with seed, return
+    the RaiseHistogram. This runs in the worker processes.
+    """
+    engine = DiceEngine()
+    rng = random.Random(seed)
+    dice = range(1, 11)
+    (count, roller) = engine.raiseRoller(
+        engine.rollRe7Sea2ed.match(expression),
+        lambda n: rng.choices(dice, k=n))
+    histogram = RaiseHistogram()
+    for _ in range(trials):
+        result = roller.roll_and_count(count)
+        histogram.add(sum(x.raise_count for x in result.raises))
+    return histogram
+
+
+def _runChunk(args):
+    return runChunk(*args)
+
+
+def simulate(expression, trials, workers=None, seed=None):
+    """
+    Roll expression trials times in workers processes (one per CPU by
+    default) and return the merged RaiseHistogram.
+
+    Raises ValueError if expression is not a valid 7th Sea 2ed roll.
+    """
+    if parse(expression) is None:
+        raise ValueError('not a 7th Sea 2ed roll: %s' % expression)
+    trials = min(trials, MAX_TRIALS)
+    chunks = split(trials, workers or os.cpu_count() or 1)
+    jobs = [(expression, size, s)
+            for (size, s) in zip(chunks, chunkSeeds(seed, len(chunks)))]
+    if len(jobs) == 1:
+        return runChunk(*jobs[0])
+    histogram = RaiseHistogram()
+    with multiprocessing.Pool(len(jobs)) as pool:
+        for result in pool.imap_unordered(_runChunk, jobs):
+            histogram.merge(result)
+    return histogram
+
+
+class Collector:
+    """
+    Merges the histograms of chunks run separately, such as in RollPool jobs,
+    and passes the total to callback when the last one arrives. The first
+    error is passed to errback, and the results are dropped then.
+    """
+
+    def __init__(self, chunks, callback, errback):
+        self.pending = chunks
+        self.histogram = RaiseHistogram()
+        self.callback = callback
+        self.errback = errback
+        self.failed = False
+        self.lock = threading.Lock()
+
+    def add(self, histogram):
+        with self.lock:
+            if self.failed:
+                return
+            self.histogram.merge(histogram)
+            self.pending -= 1
+            if self.pending:
+                return
+        self.callback(self.histogram)
+
+    def fail(self, error):
+        with self.lock:
+            if self.failed:
+                return
+            self.failed = True
+        self.errback(error)
+
+
+def summary(histogram):
+    """
+    Return the mean, percentiles and most common raise counts as text.
+    """
+    common = sorted((i for (i, count) in enumerate(histogram.counts) if count),
+                    key=lambda i: histogram.counts[i], reverse=True)[:3]
+    return ('mean %.2f, 10%%: %d, median: %d, 90%%: %d, 99%%: %d raises; '
+            'most common: %s' % (
+                histogram.mean, histogram.percentile(10),
+                histogram.percentile(50), histogram.percentile(90),
+                histogram.percentile(99),
+                ', '.join('%d (%.1f%%)' % (i, 100 * histogram.counts[i] / histogram.count)
+                          for i in sorted(common))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m Dicebot.simulation',
+                                     description='Simulate raises of a 7th Sea 2ed roll.')
+    parser.add_argument('expression', help='roll such as 8s3l1ex')
+    parser.add_argument('--trials', type=int, default=100000,
+                        help='number of rolls (default: 100000)')
+    parser.add_argument('--workers', type=int,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--seed', type=int, help='seed the random generators')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        histogram = simulate(args.expression, args.trials, args.workers,
+                             args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+    print('[%s] %d trials: %s' % (args.expression, histogram.count,
+                                  summary(histogram)))
+    for (raises, count) in enumerate(histogram.counts):
+        print('%3d %8.4f%%' % (raises, 100 * count / histogram.count))
+    print('%.2f s, %.0f trials/s' % (elapsed, histogram.count / elapsed),
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+"""
+Per-user statistics of the dice rolled.
+
+The engine counts the faces it draws into a Tally while rolling a message,
+DiceStats merges the tallies into running counters per user and die size and
+saves them to a file from time to time.
+"""
+
+import json
+import math
+import os
+import threading
+
+
+class DieStats:
+    """
+    Running counters of a die size: rolls of every face, their sum and the
+    sum of their squares.
+    """
+
+    __slots__ = ('sides', 'counts', 'count', 'total', 'squares')
+
+    def __init__(self, sides, counts=None, total=0, squares=0):
+        self.sides = sides
+        self.counts = counts or [0] * sides
+        self.count = sum(self.counts)
+        self.total = total
+        self.squares = squares
+
+    def copy(self):
+        return DieStats(self.sides, list(self.counts), self.total,
+                        self.squares)
+
+    def add(self, results):
+        counts = self.counts
+        for face in results:
+            counts[face - 1] += 1
+            self.total += face
+            self.squares += face * face
+        self.count += len(results)
+
+    def merge(self, other):
+        for (i, n) in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.squares += other.squares
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def stddev(self):
+        count = self.count
+        if count < 2:
+            return 0.0
+        variance = (self.squares - self.total * self.total / count) / (count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def chiSquare(self):
+        """
+        Return Pearson's chi-square statistic of the face counts against a
+        fair die.
+        """
+        expected = self.count / self.sides
+        if not expected:
+            return 0.0
+        return sum((n - expected) ** 2 for n in self.counts) / expected
+
+    def pValue(self):
+        """
+        Return the probability of a fair die giving at least this chi-square,
+        by the Wilson-Hilferty approximation.
+        """
+        df = self.sides - 1
+        s = 2 / (9 * df)
+        z = ((self.chiSquare() / df) ** (1 / 3) - (1 - s)) / math.sqrt(s)
+        return math.erfc(z / math.sqrt(2)) / 2
+
+
+class Tally:
+    """
+    DieStats of the dice drawn by the engine for a single message.
+    """
+
+    def __init__(self):
+        self.dice = {}
+
+    def add(self, sides, results):
+        stats = self.dice.get(sides)
+        if stats is None:
+            stats = self.dice[sides] = DieStats(sides)
+        stats.add(results)
+
+
+class DiceStats:
+    """
+    DieStats of every user and die size, merged from the tallies of their
+    messages and saved to filename by save() when changed.
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.users = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def add(self, user, tally):
+        if not tally.dice:
+            return
+        with self.lock:
+            dice = self.users.setdefault(user, {})
+            for (sides, stats) in tally.dice.items():
+                if sides in dice:
+                    dice[sides].merge(stats)
+                else:
+                    dice[sides] = stats.copy()
+            self.dirty = True
+
+    def get(self, user):
+        """
+        Return the list of DieStats of user, by die size.
+        """
+        with self.lock:
+            dice = self.users.get(user, {})
+            return [s.copy() for (sides, s) in sorted(dice.items())]
+
+    def load(self):
+        """
+        Read the counters saved by save(), if there are any.
+        """
+        if self.filename is None:
+            return
+        try:
+            with open(self.filename) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        users = {}
+        for (user, dice) in data.items():
+            users[user] = {int(sides): DieStats(int(sides), *values)
+                           for (sides, values) in dice.items()}
+        with self.lock:
+            self.users = users
+            self.dirty = False
+
+    def save(self):
+        """
+        Write the counters to filename if they changed since the last save.
+        """
+        with self.lock:
+            if not self.dirty or self.filename is None:
+                return
+            data = {user: {sides: [list(s.counts), s.total, s.squares]
+                           for (sides, s) in dice.items()}
+                    for (user, dice) in self.users.items()}
+            self.dirty = False
+        with open(self.filename + '.tmp', 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(self.filename + '.tmp', self.filename)
@@ -27,7 +27,19 @@
 # POSSIBILITY OF SUCH DAMAGE.
 ###
 
-from supybot.test import PluginTestCase
+import os
+import threading
+import time
+import supybot.conf as conf
+import supybot.ircdb as ircdb
+import supybot.registry as registry
+import supybot.schedule as schedule
+from supybot.test import PluginTestCase, ChannelPluginTestCase
+from .audit import readAudit, verify
+from .history import readLog
+from .money import MoneyConverter
+from . import rollpool
+from .test_Money import DummyRequester
 
 class DicebotTestCase(PluginTestCase):
     plugins = ('Dicebot',)
@@ -59,6 +71,15 @@ class DicebotTestCase(PluginTestCase):
         self.assertRegexp('dicebot roll 2#2d20-1', r'\[2d20-1\] \d+, \d+')
         self.assertNoResponse('dicebot roll 2#1d1')
 
+    def testRollModifiers(self):
+        self.assertRegexp('dicebot roll 4d6kh3', r'\[4d6kh3\] \d+')
+        self.assertRegexp('dicebot roll 4d6dl1', r'\[4d6kh3\] \d+')
+        self.assertRegexp('dicebot roll 2d20kl1+5', r'\[2d20kl1\+5\] \d+')
+        self.assertRegexp('dicebot roll 10d10!>=8', r'\[10d10!>=8\] \d+')
+        self.assertRegexp('dicebot roll 2#2d6r1+1d6', r'\[2d6r<=1\+1d6\] \d+, \d+')
+        self.assertNoResponse('dicebot roll 1d6kh2')
+        self.assertNoResponse('dicebot roll 1d6!>=1')
+
     def testRollSR(self):
         self.assertRegexp('dicebot roll 2#sd', r'\(pool 2\) (\d hits?|critical glitch!)')
         self.assertRegexp('dicebot roll 4#sd', r'\(pool 4\) (\d hits?(, glitch)?|critical glitch!)')
@@ -108,8 +129,316 @@ class DicebotTestCase(PluginTestCase):
         self.assertRegexp('dicebot roll vs(10+20-5)', r'-?\d+ \(\d+ vs 25\)')
         self.assertRegexp('dicebot roll 3vs(10+20)', r'-?\d+, -?\d+, -?\d+ \(\d+, \d+, \d+ vs 30\)')
 
+    def testMoney(self):
+        cb = self.irc.getCallback('Dicebot')
+        cb.moneyConverter = MoneyConverter(DummyRequester({"USD_EUR":0.5,"EUR_USD":2,"RUB_USD":0.01,"RUB_EUR":0.005,"USD_GBP":0.8}))
+        self.assertResponse('dicebot money $5', '$5: €2.50')
+        self.assertResponse('dicebot money 5 usd gbp', '$5: £4')
+        self.assertResponse('dicebot money $5 €12 200₽',
+                            '$5: €2.50; €12: $24; 200₽: $2, €1')
+        self.assertResponse('dicebot money $1,5 eur', '$1.50: €0.75')
+        self.assertNoResponse('dicebot money nothing')
+
+    def testMoneyStats(self):
+        self.assertRegexp('dicebot moneystats',
+                          r'0 lookups, 0\.0% hit ratio, 0 prefetched.*'
+                          r'0 entries, 0 bytes, 0 evictions')
+
+    def testPrefetchRates(self):
+        cb = self.irc.getCallback('Dicebot')
+        release = threading.Event()
+        prefetched = []
+        class SlowConverter:
+            def prefetch(self, count):
+                release.wait(10)
+                prefetched.append(count)
+                return count
+            def close(self):
+                pass
+        cb.moneyConverter = SlowConverter()
+        with conf.supybot.plugins.Dicebot.money.prefetchCount.context(3):
+            # the requests do not block the scheduled event
+            start = time.time()
+            # as if the scheduled event fired
+            schedule.removeEvent(cb.PREFETCH_EVENT)
+            cb._prefetchRates()
+            self.assertTrue(time.time() - start < 1)
+            release.set()
+            for _ in range(100):
+                if prefetched:
+                    break
+                time.sleep(0.01)
+        self.assertEqual(prefetched, [3])
+
+    def testBudget(self):
+        start = time.time()
+        self.assertError('dicebot roll 1000000#1d6')
+        self.assertError('dicebot roll 1000#1000d100')
+        self.assertTrue(time.time() - start < 1)
+        self.assertRegexp('dicebot roll 30#1000d100', r'\[1000d100\] (\d+, ){29}\d+')
+
+    def testPool(self):
+        pool = conf.supybot.plugins.Dicebot.pool
+        with pool.minDice.context(1):
+            self.assertRegexp('dicebot roll 2d6', r'\[2d6\] \d+')
+            self.assertRegexp('dicebot roll 1000#sd', r'\(pool 1000\) \d+ hits')
+            with pool.workers.context(0):
+                self.assertRegexp('dicebot roll 2d6', r'\[2d6\] \d+')
+        cb = self.irc.getCallback('Dicebot')
+        self.assertEqual(cb.pool.completed, 2)
+
+    def testMacro(self):
+        self.assertError('dicebot macro set attack 1d20+7')
+        user = ircdb.users.newUser()
+        user.name = 'player'
+        user.addHostmask(self.prefix)
+        ircdb.users.setUser(user)
+        self.assertError('dicebot macro list')
+        self.assertError('dicebot macro show attack')
+        self.assertNotError('dicebot macro set attack 1d20+7 2d6+4')
+        self.assertError('dicebot macro set d20 1d20')
+        self.assertError('dicebot macro set heal 2d4 and more')
+        self.assertError('dicebot macro set')
+        self.assertRegexp('dicebot roll attack',
+                          r'^\[1d20\+7\] \d+; \[2d6\+4\] \d+$')
+        self.assertRegexp('dicebot macro show attack', r'attack: 1d20\+7 2d6\+4')
+        self.assertNotError('dicebot macro set attack 2#1d20+8')
+        self.assertRegexp('dicebot roll attack', r'^\[1d20\+8\] \d+, \d+$')
+        self.assertRegexp('dicebot macro list', r'^attack$')
+        self.assertRegexp('dicebot roll 1d20', r'\[1d20\] \d+')
+        # someone else taking the nick gets nothing of the macros
+        other = 'test!someone@elsewhere.example'
+        self.assertError('dicebot macro remove attack', frm=other)
+        self.assertError('dicebot macro set attack 1d4', frm=other)
+        self.assertError('dicebot macro list', frm=other)
+        self.assertNoResponse('dicebot roll attack', frm=other)
+        self.assertRegexp('dicebot macro show attack', r'attack: 2#1d20\+8')
+        filename = conf.supybot.directories.data.dirize(
+            conf.supybot.plugins.Dicebot.macros.file())
+        self.assertTrue(os.path.exists(filename))
+        self.assertNotError('dicebot macro remove attack')
+        self.assertError('dicebot macro remove attack')
+        self.assertNoResponse('dicebot roll attack')
+        os.remove(filename)
+
+    def testSimulate(self):
+        self.assertRegexp('dicebot simulate 4s2 200',
+                          r'\[4s2\] 200 trials: mean \d+\.\d\d, 10%: \d+, median: \d+')
+        with conf.supybot.plugins.Dicebot.pool.workers.context(0):
+            self.assertRegexp('dicebot simulate 6s3l1ex 100', r'100 trials')
+        with conf.supybot.plugins.Dicebot.simulation.maxTrials.context(50):
+            self.assertRegexp('dicebot simulate 4s2 1000', r'\] 50 trials')
+        self.assertError('dicebot simulate 4d6')
+
+    def testSimulateBusy(self):
+        pool = self.irc.getCallback('Dicebot')._updatePool()
+        submit = pool.submit
+        def busy(*args):
+            # another roll takes the second worker after the first chunk;
+            # rollpool is reloaded with the plugin, so the class is looked up
+            # here
+            if pool.running:
+                raise rollpool.PoolBusyError('too many rolls in progress')
+            submit(*args)
+        pool.submit = busy
+        try:
+            self.assertRegexp('dicebot simulate 4s2 200',
+                              'too many rolls in progress, try again later')
+        finally:
+            del pool.submit
+
+    def testDiceStats(self):
+        self.assertError('dicebot dicestats')
+        metrics = conf.supybot.plugins.Dicebot.metrics
+        with metrics.enabled.context(True):
+            self.assertNotError('dicebot roll 3#2d6')
+            self.assertNotError('dicebot roll 4w')
+            self.assertNotError('dicebot roll 1d20')
+            self.assertRegexp('dicebot dicestats',
+                              r'3 messages, p50 [\d.]+ms, p99 [\d.]+ms; '
+                              r'Standard: 2 calls, 7 dice, .*; '
+                              r'WoD: 1 calls, [4-9] dice')
+            with metrics.file.context('dicebot.prom'):
+                cb = self.irc.getCallback('Dicebot')
+                cb._dumpMetrics()
+                filename = conf.supybot.directories.data.dirize('dicebot.prom')
+                with open(filename) as f:
+                    text = f.read()
+                os.remove(filename)
+                self.assertIn('dicebot_parser_calls_total{parser="WoD"} 1', text)
+                self.assertIn('dicebot_money_lookups{result="hit"} 0', text)
+        cb = self.irc.getCallback('Dicebot')
+        self.assertIsNone(cb.metrics)
+
+    def testUserDiceStats(self):
+        self.assertError('dicebot dicestats %s' % self.nick)
+        stats = conf.supybot.plugins.Dicebot.stats
+        with stats.enabled.context(True), stats.file.context(''):
+            self.assertError('dicebot dicestats %s' % self.nick)
+            self.assertNotError('dicebot roll 40#1d6')
+            self.assertNotError('dicebot roll 1d20')
+            self.assertRegexp('dicebot dicestats %s' % self.nick,
+                              r'^%s: d6: 40 dice, mean [\d.]+ \(3.50 expected\), '
+                              r'sd [\d.]+, chi-square [\d.]+ \(p [\d.]+\); '
+                              r'd20: 1 dice, .*too few for chi-square$'
+                              % self.nick)
+            with conf.supybot.plugins.Dicebot.pool.minDice.context(1):
+                self.assertNotError('dicebot roll 2d8')
+            self.assertRegexp('dicebot dicestats %s' % self.nick.upper(),
+                              r'd8: 2 dice')
+        cb = self.irc.getCallback('Dicebot')
+        self.assertIsNone(cb.stats)
+
+    def testStatsFile(self):
+        stats = conf.supybot.plugins.Dicebot.stats
+        filename = conf.supybot.directories.data.dirize(stats.file())
+        with stats.enabled.context(True):
+            self.assertNotError('dicebot roll 3d4')
+            self.assertFalse(os.path.exists(filename))
+        # the counters are saved when stats are disabled and loaded back
+        self.assertTrue(os.path.exists(filename))
+        with stats.enabled.context(True):
+            self.assertRegexp('dicebot dicestats %s' % self.nick, r'd4: 3 dice')
+        os.remove(filename)
+
+    def testProfile(self):
+        cb = self.irc.getCallback('Dicebot')
+        self.assertNotError('dicebot profile 60 seconds')
+        self.assertError('dicebot profile 10')
+        self.assertIn('_process', vars(cb))
+        self.assertRegexp('dicebot roll 1d20', r'\[1d20\] \d+')
+        self.assertHelp('dicebot money')
+        filename = cb.profiler.filename
+        cb.profiler.stop()
+        self.assertIn('Profile written to', self.irc.takeMsg().args[1])
+        self.assertIsNone(cb.profiler)
+        self.assertNotIn('_process', vars(cb))
+        self.assertTrue(os.path.exists(filename))
+        os.remove(filename)
+
+    def testUserBudget(self):
+        budget = conf.supybot.plugins.Dicebot.budget
+        with budget.userDice.context(100), budget.userDicePerSecond.context(1):
+            self.assertNotError('dicebot roll 60#1d6')
+            self.assertRegexp('dicebot roll 60#1d6', 'Too many dice')
+        cb = self.irc.getCallback('Dicebot')
+        self.assertTrue(cb.budget.rejected_tokens >= 1)
+
     def testWG(self):
         self.assertRegexp('dicebot roll 10#wg', r'\[pool 10\] \d+ icon\(s\): [❶❷❸❹❺❻] ([1-5➅] )*(\| Glory|\| Complication)?')
 
+class DicebotChannelTestCase(ChannelPluginTestCase):
+    plugins = ('Dicebot',)
+
+    def tearDown(self):
+        # channel values stay set explicitly after a context, drop them so
+        # that they follow the global values in other tests again
+        plugin = conf.supybot.plugins.Dicebot
+        for value in (plugin.autoRoll, plugin.systems):
+            try:
+                value.unregister(self.channel)
+            except registry.NonExistentRegistryEntry:
+                pass
+        super(DicebotChannelTestCase, self).tearDown()
+
+    def testAutoRoll(self):
+        with conf.supybot.plugins.Dicebot.autoRoll.context(True):
+            self.assertRegexp('I roll 1d20+3', r'\[1d20\+3\] \d+',
+                              usePrefixChar=False)
+
+    def testAutoRollSettings(self):
+        autoRoll = conf.supybot.plugins.Dicebot.autoRoll
+        self.assertNoResponse('I roll 1d20', usePrefixChar=False)
+        with autoRoll.context(True):
+            self.assertRegexp('I roll 1d20', r'\[1d20\] \d+', usePrefixChar=False)
+        self.assertNoResponse('I roll 1d20', usePrefixChar=False)
+        with autoRoll.get(self.channel).context(True):
+            self.assertRegexp('I roll 1d20', r'\[1d20\] \d+', usePrefixChar=False)
+        self.assertNoResponse('I roll 1d20', usePrefixChar=False)
+
+    def testSystems(self):
+        systems = conf.supybot.plugins.Dicebot.systems
+        with conf.supybot.plugins.Dicebot.autoRoll.context(True):
+            self.assertRegexp('I roll 1d20 5w', r'\[1d20\] \d+; \(5\)',
+                              usePrefixChar=False)
+            with systems.context([]):
+                self.assertNoResponse('I roll 1d20', usePrefixChar=False)
+            with systems.get(self.channel).context(['standard']):
+                self.assertRegexp('I roll 1d20 5w', r'^\[1d20\] \d+$',
+                                  usePrefixChar=False)
+                self.assertNoResponse('I roll 5w', usePrefixChar=False)
+            self.assertRegexp('I roll 5w 2d6', r'\(5\).*; \[2d6\] \d+',
+                              usePrefixChar=False)
+        self.assertError('config plugins.Dicebot.systems standard dnd')
+
+    def testAutoRollBudget(self):
+        with conf.supybot.plugins.Dicebot.autoRoll.context(True):
+            start = time.time()
+            self.assertRegexp(' '.join(['30#1000d100'] * 20),
+                              r'\[1000d100\] (\d+, ){29}\d+; '
+                              r'too many dice, 19 expressions skipped',
+                              usePrefixChar=False)
+            self.assertTrue(time.time() - start < 1)
+            self.assertRegexp(' '.join(['1000#1000d100'] * 20),
+                              'Too many dice', usePrefixChar=False)
+
+    def testAutoRollChatter(self):
+        budget = conf.supybot.plugins.Dicebot.budget
+        with conf.supybot.plugins.Dicebot.autoRoll.context(True), \
+                budget.userDice.context(100):
+            for text in ('I have 1000000w of stuff', 'version 2000000#sd',
+                         'call 1000000vs(50)'):
+                self.assertNoResponse(text, usePrefixChar=False)
+            cb = self.irc.getCallback('Dicebot')
+            bucket = cb.budget.users[self.prefix]
+            self.assertEqual(bucket.tokens, bucket.capacity)
+            self.assertNotError('dicebot roll 60#1d6')
+
+    def testHistory(self):
+        self.assertError('dicebot lastroll')
+        self.assertError('dicebot history')
+        self.assertRegexp('dicebot roll 2#1d20', r'\[1d20\] \d+, \d+')
+        self.assertRegexp('dicebot roll 3w', r'\(3\)')
+        self.assertRegexp('dicebot lastroll', r'^%s 3w: \d+, \d+ seconds? ago$'
+                          % self.nick)
+        self.assertRegexp('dicebot lastroll %s' % self.nick.upper(),
+                          r'^%s 3w: ' % self.nick)
+        self.assertError('dicebot lastroll someone')
+        self.assertRegexp('dicebot history',
+                          r'^%s 3w: \d+, .* ago; %s 2#1d20: \d+, \d+, .* ago$'
+                          % (self.nick, self.nick))
+        self.assertRegexp('dicebot history 1', r'^%s 3w: \d+, [^;]*$' % self.nick)
+
+    def testHistoryLog(self):
+        history = conf.supybot.plugins.Dicebot.history
+        with history.logFile.context('rolls.log'):
+            self.assertRegexp('dicebot roll 1d6+1', r'\[1d6\+1\] \d+')
+            filename = conf.supybot.directories.data.dirize('rolls.log')
+            self.assertFalse(os.path.exists(filename))
+        # the log is flushed when it is closed
+        with open(filename, 'rb') as f:
+            entries = list(readLog(f))
+        os.remove(filename)
+        self.assertEqual([(e.channel, e.nick, e.expression) for e in entries],
+                         [(self.channel, self.nick, '1d6+1')])
+
+    def testAuditLog(self):
+        audit = conf.supybot.plugins.Dicebot.audit
+        with audit.logFile.context('audit.log'):
+            self.assertRegexp('dicebot roll 2#1d20', r'\[1d20\] \d+, \d+')
+            with conf.supybot.plugins.Dicebot.pool.minDice.context(1):
+                self.assertRegexp('dicebot roll 3w', r'\(3\)')
+            cb = self.irc.getCallback('Dicebot')
+            key = cb.auditLog.key
+        filename = conf.supybot.directories.data.dirize('audit.log')
+        with open(filename, 'rb') as f:
+            checked = list(verify(readAudit(f), key))
+        for suffix in ('', '.key', '.next'):
+            os.remove(filename + suffix)
+        self.assertEqual([(counter, entry.channel, entry.expression, ok)
+                          for (counter, entry, record, ok) in checked],
+                         [(0, self.channel, '2#1d20', True),
+                          (1, self.channel, '3w', True)])
+
 
 # vim:set shiftwidth=4 tabstop=8 expandtab textwidth=78:
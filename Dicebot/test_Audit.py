@@ -0,0 +1,91 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import os
+from .audit import AuditLog, Seeder, deriveSeed, main, readAudit, verify
+from .engine import DiceEngine
+from .formatter import render
+
+class TestAudit:
+    def test_seeder(self):
+        seeder = Seeder(b'key', 5)
+        assert [seeder.next(), seeder.next()] == [5, 6]
+        assert deriveSeed(b'key', 5) == deriveSeed(b'key', 5)
+        assert deriveSeed(b'key', 5) != deriveSeed(b'key', 6)
+        assert deriveSeed(b'key', 5) != deriveSeed(b'other', 5)
+        assert seeder.rng(5).random() == Seeder(b'key').rng(5).random()
+
+    def test_engine_seeds(self):
+        engine = DiceEngine()
+        engine.seeder = Seeder(b'key', 10)
+        records = engine.evaluate('3#1d20 4w 3#1d20 1d6 vs(40)')
+        assert [r.seed for r in records] == [10, 12, 11, 13, 14]
+        # every roll is drawn from its own seed, repeated words as well
+        engine.seeder = Seeder(b'key', 11)
+        assert engine.evaluate('3#1d20') == [records[2]]
+        engine.seeder = None
+        assert engine.evaluate('1d20')[0].seed is None
+
+    def test_log(self, tmpdir):
+        path = str(tmpdir.join('audit.log'))
+        log = AuditLog(path)
+        assert len(log.key) == 32
+        assert oct(os.stat(path + '.key').st_mode & 0o777) == '0o600'
+        engine = DiceEngine()
+        engine.seeder = log.reserve(3)
+        records = engine.evaluate('1000d100 5w 8s3l1ex')
+        for record in records:
+            log.add(1.5, '#chan', 'nick', record)
+        log.flush()
+        # the size of an entry does not depend on the number of dice
+        assert tmpdir.join('audit.log').size() < 3 * 50
+        # counters are not reused after a restart
+        assert AuditLog(path).reserve(1).next() >= 3
+        with open(path, 'rb') as f:
+            checked = list(verify(readAudit(f), log.key))
+        assert [(counter, entry.expression, ok)
+                for (counter, entry, record, ok) in checked] == \
+            [(0, '1000d100', True), (1, '5w', True), (2, '8s3l1ex', True)]
+        assert [render(record) for (counter, entry, record, ok) in checked] == \
+            [render(record) for record in records]
+
+    def test_tampered(self, tmpdir, capsys):
+        path = str(tmpdir.join('audit.log'))
+        log = AuditLog(path)
+        engine = DiceEngine()
+        engine.seeder = log.reserve(2)
+        (first, second) = engine.evaluate('2d6 2d6')
+        log.add(1.5, '#chan', 'nick', first)
+        second.totals = [second.totals[0] % 12 + 1]
+        log.add(1.5, '#chan', 'nick', second)
+        log.flush()
+        assert main([path + '.key', path, '--dice']) == 1
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0].startswith('0 #chan nick 2d6: ok [2d6] ')
+        assert lines[1].startswith('1 #chan nick 2d6: MISMATCH')
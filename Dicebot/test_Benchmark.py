@@ -0,0 +1,93 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import io
+import os
+import subprocess
+import sys
+from .benchmark import StubRequester, cases, compare, report, run, deck_cases
+from .money import MoneyConverter
+
+class TestBenchmark:
+    def test_main(self, tmpdir):
+        # a new interpreter, the plugin is set up by the tool itself
+        path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run(
+            [sys.executable, '-m', 'Dicebot.benchmark', '--filter', 'deck.draw',
+             '--repeat', '1'],
+            cwd=str(tmpdir), env=dict(os.environ, PYTHONPATH=path),
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            universal_newlines=True)
+        assert result.returncode == 0, result.stdout
+        assert 'deck.draw ' in result.stdout
+
+    def test_compare(self):
+        baseline = {'a': 1.0, 'b': 1.0, 'c': 1.0}
+        results = {'a': 1.1, 'b': 1.3, 'd': 5.0}
+        assert compare(results, baseline, 0.2) == [('b', 1.0, 1.3)]
+        assert compare(results, baseline, 0.05) == [('a', 1.0, 1.1), ('b', 1.0, 1.3)]
+
+    def test_import_time(self):
+        results = run(cases(), repeat=1, pattern='import.')
+        assert 0 < results['import.plugin'] < 10
+
+    def test_run(self):
+        results = run(deck_cases(), repeat=1, pattern='draw')
+        assert list(results) == ['deck.draw']
+        assert results['deck.draw'] > 0
+
+    def test_cases(self):
+        names = [name for (name, function) in cases()]
+        assert 'money.hit' in names and 'money.miss' in names
+        assert 'raise.skill4.30' in names
+        assert 'import.plugin' in names
+        assert 'parser._parseWoDRoll' in names
+        assert 'format._parse7Sea2edRoll' in names
+        assert 'expression.4d6kh3' in names and 'plan.explode' in names
+        assert 'repeat.message' in names
+        assert 'simulate.8s3l1ex' in names
+        assert 'history.append' in names
+        assert 'stats.message' in names
+        assert 'macro.compiled' in names
+        assert 'audit.message' in names
+        assert not [name for name in names if name.startswith('matcher.')]
+        for (name, function) in cases():
+            function()
+
+    def test_empty_cache_misses(self):
+        requester = StubRequester(2)
+        converter = MoneyConverter(requester, cache_size=0)
+        assert converter.convert(10, 'USD', ['EUR']) == '$10: €20'
+        converter.convert(10, 'USD', ['EUR'])
+        assert requester.query_count == 2
+
+    def test_report(self):
+        out = io.StringIO()
+        report({'a': 2e-6}, {'a': 1e-6}, out)
+        assert out.getvalue().split() == ['a', '2.00', 'us', '+100.0%']
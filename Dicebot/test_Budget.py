@@ -0,0 +1,90 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+from .budget import TokenBucket, WorkBudget
+
+class TestTokenBucket:
+    def test_refill(self):
+        b = TokenBucket(10, 2, now=0)
+        assert b.level(0) == 10
+        b.consume(8, 0)
+        assert b.level(0) == 2
+        assert b.level(1) == 4
+        assert b.level(100) == 10
+
+    def test_debt(self):
+        b = TokenBucket(10, 1, now=0)
+        b.consume(15, 0)
+        assert b.level(0) == -5
+        assert b.level(10) == 5
+
+class TestWorkBudget:
+    def test_message_limit(self):
+        w = WorkBudget(5, 100, 1, 100, 1)
+        assert w.allowance("user", "#chan", now=0) == 5
+
+    def test_user_budget(self):
+        w = WorkBudget(50, 60, 10, 1000, 10)
+        assert w.allowance("user", "#chan", now=0) == 50
+        w.consume("user", "#chan", 50, now=0)
+        assert w.allowance("user", "#chan", now=0) == 10
+        assert w.allowance("other", "#chan", now=0) == 50
+        assert w.allowance("user", "#chan", now=2) == 30
+
+    def test_channel_budget(self):
+        w = WorkBudget(50, 1000, 10, 60, 10)
+        w.allowance("user", "#chan", now=0)
+        w.consume("user", "#chan", 50, now=0)
+        assert w.allowance("other", "#chan", now=0) == 10
+        assert w.allowance("other", "#other", now=0) == 50
+        assert w.allowance("other", None, now=0) == 50
+
+    def test_exhausted(self):
+        w = WorkBudget(50, 10, 1, 1000, 10)
+        w.allowance("user", None, now=0)
+        w.consume("user", None, 20, now=0)
+        assert w.allowance("user", None, now=0) == 0
+
+    def test_prune(self):
+        w = WorkBudget(50, 100, 10, 100, 10, max_keys=2)
+        for user in ["a", "b", "c"]:
+            w.allowance(user, None, now=0)
+            w.consume(user, None, 10, now=0)
+        assert len(w.users) == 3
+        w.allowance("d", None, now=100)
+        w.consume("d", None, 10, now=100)
+        assert list(w.users) == ["d"]
+
+    def test_reject(self):
+        w = WorkBudget(50, 100, 10, 100, 10)
+        w.reject(2, 2000)
+        w.reject(1, 100)
+        assert w.rejected_tokens == 3
+        assert w.rejected_dice == 2100
+        assert w.truncated_messages == 2
@@ -0,0 +1,178 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import itertools
+import sys
+import threading
+import pytest
+from .audit import Seeder
+from .budget import WorkBudget
+from .deck import Deck
+from .engine import DiceEngine
+from .formatter import render
+from .metrics import Metrics
+from .money import MoneyConverter
+from .stats import DiceStats, Tally
+from .test_Money import DummyRequester
+
+THREADS = 16
+
+@pytest.fixture(autouse=True)
+def contention():
+    # switch threads as often as possible to make races likely
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+def hammer(function, threads=THREADS):
+    """
+    Run function(i) in threads threads at once, return the results.
+    """
+    results = [None] * threads
+    errors = []
+    barrier = threading.Barrier(threads)
+
+    def run(i):
+        barrier.wait()
+        try:
+            results[i] = function(i)
+        except Exception as e:
+            errors.append(e)
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if errors:
+        raise errors[0]
+    return results
+
+class TestConcurrency:
+    def test_deck(self):
+        deck = Deck()
+
+        def deal(i):
+            hands = []
+            for _ in range(50):
+                hands.append(deck.draw(54))
+                deck.shuffle()
+            return hands
+        for hands in hammer(deal):
+            # every full deck drawn at once is dealt without interleaving
+            # other draws
+            assert all(len(set(hand)) == 54 for hand in hands)
+        assert len(deck.deck) == 54
+
+    def test_money(self):
+        currencies = ['USD', 'EUR', 'RUB', 'UAH', 'GBP', 'JPY', 'CNY', 'BYN']
+        rates = {'%s_%s' % pair: 2.0 for pair in
+                 itertools.permutations(currencies, 2)}
+        money = MoneyConverter(DummyRequester(rates), cache_size=10)
+
+        def convert(i):
+            for j in range(200):
+                (input, output) = (currencies[(i + j) % 8],
+                                   currencies[(i + 3 * j + 1) % 8])
+                if input != output:
+                    # the inverse of a cached rate is cached as well
+                    assert money.get_rates(input, [output])[output] in (2.0, 0.5)
+            money.prefetch(3)
+        hammer(convert)
+        cache = money.cache
+        assert len(cache) <= 10
+        assert cache.bytes == sum(cache.entry_size(k, v)
+                                  for (k, v) in cache.entries.items())
+        assert money.hits + money.misses == sum(money.popularity.values())
+
+    def test_metrics(self):
+        metrics = Metrics()
+
+        def update(i):
+            labels = (('parser', str(i % 4)),)
+            for _ in range(1000):
+                metrics.inc('calls', labels)
+                metrics.observe('seconds', 0.001, labels)
+            other = Metrics()
+            other.inc('calls', labels, 10)
+            metrics.merge(other)
+            metrics.prometheus()
+        hammer(update)
+        for parser in metrics.labels('calls', 'parser'):
+            labels = (('parser', parser),)
+            assert metrics.counter('calls', labels) == 4 * 1010
+            assert metrics.histogram('seconds', labels).count == 4 * 1000
+
+    def test_budget(self):
+        budget = WorkBudget(100, 1000, 1, 10 ** 6, 1, max_keys=5)
+
+        def spend(i):
+            for j in range(500):
+                user = 'user%d' % ((i + j) % 20)
+                budget.allowance(user, '#chan', now=j)
+                budget.consume(user, '#chan', 1, now=j)
+                budget.reject(1, 2)
+        hammer(spend)
+        assert (budget.truncated_messages, budget.rejected_tokens,
+                budget.rejected_dice) == (THREADS * 500, THREADS * 500,
+                                          THREADS * 1000)
+        assert budget.channels['#chan'].tokens <= 10 ** 6 - THREADS * 500 + 500
+
+    def test_engine(self):
+        engine = DiceEngine()
+        line = ' '.join(['1d20+7'] * 5 + ['2d6+4'] * 5 + ['8w', '4#sd'])
+        stats = DiceStats()
+
+        def roll(i):
+            tally = Tally()
+            drawn = engine.diceDrawn
+            engine.tally = tally
+            try:
+                for _ in range(50):
+                    assert len(engine.evaluate(line)) == 12
+            finally:
+                engine.tally = None
+            assert sum(s.count for s in tally.dice.values()) == \
+                engine.diceDrawn - drawn
+            stats.add('nick', tally)
+            # rolls audited in one thread are not disturbed by the sampler
+            # or the generators of the others
+            engine.seeder = Seeder(b'key', i * 100)
+            try:
+                records = engine.evaluate(line)
+            finally:
+                engine.seeder = None
+            return ([r.seed for r in records], [render(r) for r in records])
+        results = hammer(roll)
+        for (i, (seeds, texts)) in enumerate(results):
+            engine.seeder = Seeder(b'key', i * 100)
+            assert [render(r) for r in engine.evaluate(line)] == texts
+            engine.seeder = None
+        assert sum(s.count for s in stats.get('nick') if s.sides == 20) == \
+            THREADS * 50 * 5
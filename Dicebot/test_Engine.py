@@ -0,0 +1,159 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+from .cli import run
+from .engine import DiceEngine
+from .formatter import render
+
+class TestEngine:
+    def test_evaluate(self):
+        engine = DiceEngine()
+        results = engine.evaluate('I roll 3#1d6+2 and 4w and 1d1000 with 2vs(50)')
+        assert len(results) == 3
+        assert [r.system for r in results] == ['standard', 'wod', 'dh']
+        assert results[0].expression == '3#1d6+2'
+        assert len(results[0].totals) == 3
+        assert all(3 <= total <= 8 for total in results[0].totals)
+        assert render(results[0]).startswith('[1d6+2] ')
+        assert render(results[1]).startswith('(4) ')
+        assert engine.diceDrawn >= 3 + 4 + 2
+        assert engine.evaluate('nothing to roll') == []
+
+    def test_repeated(self):
+        engine = DiceEngine()
+        results = engine.evaluate('1d20 4w 1d20 x 1d20 4w 3#1d6')
+        assert [r.system for r in results] == \
+            ['standard', 'wod', 'standard', 'standard', 'wod', 'standard']
+        assert all(1 <= r.totals[0] <= 20 for r in results[:4:2])
+        assert len(results[5].totals) == 3
+        # dice left in the batches are not counted
+        assert engine.diceDrawn == sum(len(r.values) if r.system == 'wod' else
+                                       sum(map(len, r.values)) for r in results)
+        assert engine.sampler is None
+
+    def test_repeated_fallback(self):
+        engine = DiceEngine()
+        calls = []
+        def first(m):
+            calls.append('first')
+            return None if len(calls) % 2 else 'first'
+        def second(m):
+            calls.append('second')
+            return 'second'
+        assert engine.rollRepeated([(first, None), (second, None)], 4) == \
+            ['second', 'first', 'second', 'first']
+        assert calls.count('second') == 2
+
+    def test_systems(self):
+        engine = DiceEngine()
+        assert len(engine.evaluate('1d6 4w', ['standard'])) == 1
+        assert engine.evaluate('1d6 4w', []) == []
+        (matcher, checks) = engine.checklist(['shadowrun'])
+        assert len(checks) == 3
+        assert matcher.match('3#sdx') and not matcher.match('1d6')
+        assert engine.checklist(['shadowrun']) is engine.checklist(['shadowrun'])
+
+    def test_cost(self):
+        engine = DiceEngine()
+        (matcher, checks) = engine.checklist()
+        assert engine.match('10#sd', matcher, checks)[1] == 10
+        assert engine.match('20s3l2', matcher, checks)[1] == 23
+        # too many dice for the parsers, nothing is drawn
+        for word in ('1000000w', '2000000#sd', '2000000#sdx', '10,2000000#sde',
+                     '1000000vs(50)', '1000000#wg', '1000000k2', '99s3'):
+            (candidates, dice) = engine.match(word, matcher, checks)
+            assert candidates and dice == 0, word
+            assert engine.evaluate(word) == []
+
+    def test_seeded(self):
+        random.seed(3)
+        first = DiceEngine().evaluate('10#1d20 5k3 8s3 4w')
+        random.seed(3)
+        second = DiceEngine().evaluate('10#1d20 5k3 8s3 4w')
+        assert first[:2] == second[:2] and first[3] == second[3]
+        assert [render(r) for r in first] == [render(r) for r in second]
+
+    def test_cli(self):
+        out = io.StringIO()
+        assert run(['1d6 2d6\n', 'nothing\n', '3w\n'], out) == 3
+        lines = out.getvalue().split('\n')
+        assert lines[0].startswith('[1d6] ') and '; [2d6] ' in lines[0]
+        assert lines[1] == ''
+        assert lines[2].startswith('(3) ')
+        out = io.StringIO()
+        run(['1d6 3w\n'], out, systems=['wod'], as_json=True)
+        record = json.loads(out.getvalue())
+        assert record['input'] == '1d6 3w'
+        assert len(record['results']) == 1
+        result = record['results'][0]
+        assert result['system'] == 'wod' and result['expression'] == '3w'
+        # rolled dice, with any added by explosions
+        assert len(result['values']) >= 3
+        assert result['text'].startswith('(3) ')
+
+    def test_without_supybot(self):
+        code = ('import sys\n'
+                'class Block:\n'
+                '    def find_spec(self, name, path=None, target=None):\n'
+                '        if name.split(".")[0] == "supybot":\n'
+                '            raise ImportError(name)\n'
+                'sys.meta_path.insert(0, Block())\n'
+                'from Dicebot.cli import main\n'
+                'sys.exit(main(["--seed", "1"]))\n')
+        path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, '-c', code], cwd=path,
+                                input='1d20+1\n', stdout=subprocess.PIPE,
+                                universal_newlines=True, check=True)
+        assert result.stdout.startswith('[1d20+1] ')
+
+    def test_cli_output(self, tmpdir):
+        # with supybot installed, the CLI must not load the plugin: its
+        # logging would end up among the results
+        path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=path)
+        command = [sys.executable, '-m', 'Dicebot.cli', '--seed', '1']
+        result = subprocess.run(command, cwd=str(tmpdir), env=env,
+                                input='1d20 3#sd\n', stdout=subprocess.PIPE,
+                                universal_newlines=True, check=True)
+        lines = result.stdout.splitlines()
+        assert len(lines) == 1
+        assert lines[0].startswith('[1d20] ') and '; ' in lines[0]
+        result = subprocess.run(command + ['--json'], cwd=str(tmpdir), env=env,
+                                input='1d20 3#sd\n', stdout=subprocess.PIPE,
+                                universal_newlines=True, check=True)
+        lines = result.stdout.splitlines()
+        assert len(lines) == 1
+        assert len(json.loads(lines[0])['results']) == 2
+        assert tmpdir.listdir() == []
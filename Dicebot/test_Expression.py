@@ -0,0 +1,132 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+from .expression import (Add, Count, Explode, Keep, Reroll, Roll, Sampler, Sum,
+                         compileStandard, execute, executePlan)
+
+def scripted(*rolls):
+    """
+    Return a draw function giving the rolls in order.
+    """
+    rolls = list(rolls)
+    def draw(n, sides):
+        result, rolls[:n] = rolls[:n], []
+        assert len(result) == n
+        return result
+    return draw
+
+def standard(spec):
+    return compileStandard(spec, 1000, 2, 100)
+
+class TestPrimitives:
+    def test_sum(self):
+        pool = execute((Roll(3, 6), Sum(), Add(2)), scripted(1, 5, 6))
+        assert pool.dice == [1, 5, 6]
+        assert pool.total == 14
+
+    def test_keep(self):
+        pool = execute((Roll(4, 6), Keep(3, True), Sum()), scripted(3, 1, 6, 4))
+        assert (pool.dice, pool.dropped, pool.total) == ([6, 4, 3], [1], 13)
+        pool = execute((Roll(2, 20), Keep(1, False), Sum()), scripted(15, 4))
+        assert (pool.dice, pool.dropped, pool.total) == ([4], [15], 4)
+
+    def test_explode(self):
+        # new dice are added and may explode again
+        pool = execute((Roll(3, 10), Explode(8, False), Count(8)),
+                       scripted(9, 2, 10, 8, 3, 1))
+        assert pool.dice == [9, 2, 10, 8, 3, 1]
+        assert pool.total == 3
+        # compound explosions add to the exploding die
+        pool = execute((Roll(2, 10), Explode(10, True), Sum()),
+                       scripted(10, 4, 10, 3))
+        assert pool.dice == [23, 4]
+
+    def test_reroll(self):
+        pool = execute((Roll(3, 6), Reroll(2, False), Sum()),
+                       scripted(1, 4, 2, 2, 2, 5, 6))
+        assert pool.dice == [5, 4, 6]
+        pool = execute((Roll(2, 6), Reroll(1, True), Sum()), scripted(1, 3, 1))
+        assert pool.dice == [1, 3]
+
+class TestCompiler:
+    def test_plain(self):
+        plan = standard('1d20+4+d6-3+d20')
+        assert plan.mod == 1
+        assert [(t.sign, t.dice, t.sides, t.suffix) for t in plan.terms] == \
+            [(1, 2, 20, ''), (1, 1, 6, '')]
+        assert executePlan(plan, scripted(3, 4, 5)) == (13, [3, 4, 5])
+
+    def test_modifiers(self):
+        assert standard('4d6kh3').terms[0].ops == \
+            (Roll(4, 6), Keep(3, True), Sum())
+        assert standard('4d6dl1').terms[0].suffix == 'kh3'
+        assert standard('2d20dh1').terms[0].suffix == 'kl1'
+        assert standard('2d20k1').terms[0].suffix == 'kh1'
+        assert standard('10d10!>=8').terms[0].ops == \
+            (Roll(10, 10), Explode(8, False), Sum())
+        assert standard('3d6!').terms[0].suffix == '!'
+        assert standard('2d6ro<=2!kh1').terms[0].ops == \
+            (Roll(2, 6), Reroll(2, True), Explode(6, False), Keep(1, True), Sum())
+        # terms with modifiers are not merged
+        plan = standard('4d6kh3+4d6-2d6')
+        assert [(t.sign, t.dice, t.suffix) for t in plan.terms] == \
+            [(1, 4, 'kh3'), (1, 4, ''), (-1, 2, '')]
+        assert executePlan(plan, scripted(1, 2, 3, 4, 1, 1, 1, 1, 2, 2)) == \
+            (9 + 4 - 4, [4, 3, 2, 1, 1, 1, 1, 1, 2, 2])
+
+    def test_invalid(self):
+        assert standard('1d6kh2') is None
+        assert standard('1d6kh0') is None
+        assert standard('1d6!>=1') is None
+        assert standard('1d6r6') is None
+        assert standard('1d1') is None
+        assert standard('1001d6') is None
+
+    def test_cost(self):
+        assert standard('4d6kh3').terms[0].cost == 4
+        assert standard('10d10!>=8').terms[0].cost > 10
+
+class TestSampler:
+    def test_batches(self):
+        calls = []
+        def source(n, sides):
+            calls.append((n, sides))
+            return list(range(1, n + 1))
+        sampler = Sampler(source)
+        assert sampler.draw(2, 20) == [1, 2]
+        sampler.draw(1, 8)
+        sampler.reserve(3)
+        assert calls[2:] == [(6, 20), (3, 8)]
+        assert sampler.draw(2, 20) == [1, 2]
+        assert sampler.draw(2, 20) == [3, 4]
+        assert sampler.draw(3, 20) == [5, 6, 1]
+        # the batch is used up, the rest comes from the source
+        assert calls[-1] == (1, 20)
+        assert sampler.draw(2, 6) == [1, 2]
+        assert calls[-1] == (2, 6)
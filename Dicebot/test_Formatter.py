@@ -0,0 +1,121 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import json
+import pickle
+from .engine import RollRecord
+from .formatter import commaAndify, nItems, ordinal, render, renderReply, toDict
+from .sevenSea2EdRaiseRoller import Raise, RaiseRollResult, RollResult
+
+class TestFormatter:
+    def test_helpers(self):
+        assert [nItems(n, 'hit') for n in (0, 1, 2)] == ['0 hits', '1 hit', '2 hits']
+        assert nItems(3, 'pass') == '3 passes'
+        assert nItems(2, 'success') == '2 successes'
+        assert commaAndify([]) == ''
+        assert commaAndify(['1st']) == '1st'
+        assert commaAndify(['1st', '2nd']) == '1st and 2nd'
+        assert commaAndify(['1st', '2nd', '3rd']) == '1st, 2nd, and 3rd'
+        assert [ordinal(i) for i in (1, 2, 3, 4, 11, 12, 13, 21, 102, 111)] == \
+            ['1st', '2nd', '3rd', '4th', '11th', '12th', '13th', '21st', '102nd', '111th']
+
+    def test_standard(self):
+        terms = [(1, 2, 6, ''), (1, 1, 4, ''), (-1, 1, 8, '')]
+        record = RollRecord('standard', '2#1d4+2d6-1d8-1', totals=[5, 9],
+                            params={'terms': terms, 'mod': -1})
+        assert render(record) == '[2d6+1d4-1d8-1] 5, 9'
+        assert toDict(record)['params']['terms'][2] == \
+            {'sign': -1, 'dice': 1, 'sides': 8, 'modifiers': ''}
+        terms = [(-1, 4, 6, 'kh3'), (1, 2, 20, '!')]
+        record.params = {'terms': terms, 'mod': 0}
+        assert render(record) == '[-4d6kh3+2d20!] 5, 9'
+        json.dumps(toDict(record))
+
+    def test_shadowrun(self):
+        record = RollRecord('shadowrun', '4#sdx', [6, 1, 1, 5], [2],
+                            ('exploding', 'glitch'), {'pool': 4})
+        assert render(record) == '(pool 4, exploding) 2 hits, glitch'
+        record = RollRecord('shadowrun', '3#sd', [1, 1, 2], [0], ('critical',),
+                            {'pool': 3})
+        assert render(record) == '(pool 3) critical glitch!'
+        record = RollRecord('shadowrun', '3#sd', [3, 1, 2], [0], (), {'pool': 3})
+        assert render(record) == '(pool 3) 0 hits'
+
+    def test_shadowrun_extended(self):
+        params = {'pool': 2, 'threshold': 3, 'passes': 4, 'glitches': [1, 3]}
+        record = RollRecord('shadowrun', '2,3#sde', totals=[3],
+                            flags=('glitch',), params=params)
+        assert render(record) == \
+            '(pool 2, threshold 3) 4 passes, 3 hits, glitch at 1st and 3rd'
+        record.flags = ('glitch', 'critical')
+        assert render(record) == \
+            '(pool 2, threshold 3) critical glitch at 4th pass, glitch at 1st and 3rd, 3 hits so far'
+
+    def test_7sea(self):
+        record = RollRecord('7sea', '2#+3k2', [[14, 5, 2], [9, 9, 1]], [21, 20],
+                            ('exploding',),
+                            {'rolls': 3, 'keep': 2, 'mod': 2, 'showUnkept': True})
+        assert render(record) == '[3k2+2] (21) 14, 5 | 2; (20) 9, 9 | 1'
+        record.flags = ()
+        record.params['showUnkept'] = False
+        assert render(record) == '[3k2+2, not exploding] (21) 14, 5; (20) 9, 9'
+
+    def test_7sea2ed(self):
+        result = RaiseRollResult([Raise(1, [RollResult(10)])], [RollResult(3)])
+        record = RollRecord('7sea2ed', '2s1', totals=[1],
+                            params={'result': result})
+        assert render(record) == '[2s1]: 1 raise: *(10), unused: 3'
+        data = toDict(record)
+        assert data['params'] == {'raises': [{'raises': 1, 'dice': [10]}],
+                                  'unused': [3], 'discarded': []}
+        json.dumps(data)
+
+    def test_wod_dh_wg(self):
+        assert render(RollRecord('wod', '3w', [8, 3, 10], [3],
+                                 params={'rolls': 3, 'explode': 10})) == '(3) 3 successes'
+        assert render(RollRecord('wod', '2w-', [3, 1], [0],
+                                 params={'rolls': 2, 'explode': 0})) == '(2, not exploding) FAIL'
+        assert render(RollRecord('wod', '1w9', [9], [1],
+                                 params={'rolls': 1, 'explode': 9})) == '(1, 9-again) 1 success'
+        assert render(RollRecord('dh', '2vs(40)', [30, 55], [10, -15],
+                                 params={'threshold': 40})) == '10, -15 (30, 55 vs 40)'
+        record = RollRecord('wg', '4#wg', [6, 4, 2], [5], ('glory',),
+                            {'pool': 4, 'wrath': 6})
+        assert render(record) == '[pool 4] 5 icon(s): ❻ ➅ 4 | Glory'
+
+    def test_reply(self):
+        records = [RollRecord('dh', 'vs(40)', [30], [10], params={'threshold': 40}),
+                   RollRecord('wod', '1w', [3], [0], params={'rolls': 1, 'explode': 10})]
+        assert renderReply(records) == '10 (30 vs 40); (1) FAIL'
+        assert renderReply(records, 'note') == '10 (30 vs 40); (1) FAIL; note'
+
+    def test_pickle(self):
+        # records come back from the worker processes
+        record = RollRecord('wod', '1w', [3], [0], params={'rolls': 1, 'explode': 10})
+        assert pickle.loads(pickle.dumps(record)) == record
@@ -0,0 +1,96 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+from .engine import RollRecord
+from .history import HistoryLog, RollHistory, readLog
+
+def roll(expression, *totals):
+    return RollRecord('standard', expression, totals=list(totals))
+
+class TestRollHistory:
+    def test_ring(self):
+        h = RollHistory(3)
+        assert h.last() == []
+        for i in range(5):
+            h.append(100 + i, 'nick%d' % (i % 2), roll('1d%d' % (i + 2), i))
+        assert len(h) == 3
+        assert [e.expression for e in h.last()] == ['1d6', '1d5', '1d4']
+        assert [e.values for e in h.last(2)] == [[4], [3]]
+        last = h.last(1, 'nick1')[0]
+        assert (last.when, last.nick, last.system, last.values) == \
+            (103, 'nick1', 'standard', [3])
+        assert h.last(nick='nobody') == []
+        assert h.last(1, 'NICK1') == []
+        assert h.last(1, 'NICK1', str.lower)[0].when == 103
+
+    def test_values_wrap(self):
+        h = RollHistory(2, valuesPerRoll=2, maxValues=3)
+        h.append(1, 'a', roll('3#1d6', 1, 2, 3))
+        h.append(2, 'a', roll('5#1d6', 4, 5, 6, 7, 8))
+        (newest, oldest) = h.last()
+        assert newest.values == [4, 5, 6]
+        # the ring of 4 values wrapped over the older roll
+        assert oldest.values is None
+        h.append(3, 'a', roll('1d6+100000000000000000000', 10 ** 20))
+        assert h.last(1)[0].values is None
+
+    def test_memory_fixed(self):
+        h = RollHistory(10)
+        sizes = (len(h.times), len(h.values), len(h.nicks))
+        for i in range(100):
+            h.append(i, 'nick', roll('2#1d6', 1, 2))
+        assert (len(h.times), len(h.values), len(h.nicks)) == sizes
+
+class TestHistoryLog:
+    def test_roundtrip(self, tmpdir):
+        path = str(tmpdir.join('rolls.log'))
+        log = HistoryLog(path)
+        log.add(1.5, '#chan', 'nick', roll('2#1d6', 3, -4))
+        log.add(2.5, '#chan', 'ник', RollRecord('wod', '5w', totals=[2]))
+        assert not tmpdir.join('rolls.log').exists()
+        log.flush()
+        log.add(3.5, '#other', 'nick', roll('1d20', 20))
+        log.flush()
+        with open(path, 'rb') as f:
+            entries = list(readLog(f))
+        assert [(e.when, e.channel, e.nick, e.system, e.expression, e.values)
+                for e in entries] == [
+            (1.5, '#chan', 'nick', 'standard', '2#1d6', [3, -4]),
+            (2.5, '#chan', 'ник', 'wod', '5w', [2]),
+            (3.5, '#other', 'nick', 'standard', '1d20', [20])]
+
+    def test_batches(self, tmpdir):
+        path = str(tmpdir.join('rolls.log'))
+        log = HistoryLog(path, maxBuffer=100)
+        for i in range(10):
+            log.add(i, '#chan', 'nick', roll('1d6', 1))
+        assert 0 < tmpdir.join('rolls.log').size() < 10 * 40
+        log.flush()
+        with open(path, 'rb') as f:
+            assert len(list(readLog(f))) == 10
@@ -0,0 +1,91 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import pytest
+from .engine import DiceEngine
+from .macros import MacroError, MacroStore
+
+class TestMacroStore:
+    def setup_method(self):
+        self.engine = DiceEngine()
+        self.checklist = self.engine.checklist()
+
+    def validate(self, store, name, text):
+        store.validate(name, text, *self.checklist, self.engine.match)
+
+    def compiled(self, store, user, name, systems=None):
+        return store.compiled(user, name, *self.engine.checklist(systems),
+                              self.engine.match)
+
+    def test_validate(self):
+        store = MacroStore()
+        self.validate(store, 'attack', '1d20+7 2d6+4 5w')
+        for (name, text) in [('d20', '1d20'), ('4#sd', '1d20'),
+                             ('1attack', '1d20'), ('attack', 'hit 1d20'),
+                             ('attack', ''), ('attack', '1d6 ' * 21)]:
+            with pytest.raises(MacroError):
+                self.validate(store, name, text)
+
+    def test_compiled(self):
+        store = MacroStore(maxPerUser=2)
+        assert self.compiled(store, 'nick', 'attack') is None
+        store.set('nick', 'attack', ' 1d20+7  2d6+4 1d20+7 5w')
+        assert store.get('nick', 'attack') == '1d20+7 2d6+4 1d20+7 5w'
+        matched = self.compiled(store, 'nick', 'attack')
+        assert [(word, dice) for (word, candidates, dice) in matched] == \
+            [('1d20+7', 1), ('2d6+4', 2), ('1d20+7', 1), ('5w', 5)]
+        # the same word is matched once
+        assert matched[0][1] is matched[2][1]
+        assert self.compiled(store, 'nick', 'attack') is matched
+        assert [word for (word, candidates, dice) in
+                self.compiled(store, 'nick', 'attack', ['standard'])] == \
+            ['1d20+7', '2d6+4', '1d20+7']
+        assert self.compiled(store, 'other', 'attack') is None
+        store.set('nick', 'attack', '1d20+8')
+        assert [word for (word, candidates, dice) in
+                self.compiled(store, 'nick', 'attack')] == ['1d20+8']
+        store.set('nick', 'damage', '2d6')
+        with pytest.raises(MacroError):
+            store.set('nick', 'heal', '2d4')
+        assert store.names('nick') == ['attack', 'damage']
+        assert store.remove('nick', 'attack')
+        assert not store.remove('nick', 'attack')
+        assert self.compiled(store, 'nick', 'attack') is None
+
+    def test_persistence(self, tmpdir):
+        path = str(tmpdir.join('macros.json'))
+        store = MacroStore(path)
+        store.set('nick', 'attack', '1d20+7 2d6+4')
+        store.set('other', 'save', '1d20')
+        store.remove('other', 'save')
+        loaded = MacroStore(path)
+        assert loaded.macros is None
+        assert loaded.names('nick') == ['attack']
+        assert loaded.names('other') == []
+        assert loaded.get('nick', 'attack') == '1d20+7 2d6+4'
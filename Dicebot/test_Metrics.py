@@ -0,0 +1,99 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import pytest
+from .metrics import Histogram, Metrics
+
+class TestHistogram:
+    def test_observe(self):
+        h = Histogram((0.1, 1))
+        h.observe(0.05)
+        h.observe(0.1)
+        h.observe(0.5)
+        h.observe(5)
+        assert h.counts == [2, 1, 1]
+        assert h.count == 4
+        assert h.sum == pytest.approx(5.65)
+
+    def test_percentile(self):
+        h = Histogram((0.1, 1))
+        assert h.percentile(50) == 0
+        for _ in range(98):
+            h.observe(0.01)
+        h.observe(0.5)
+        h.observe(2)
+        assert h.percentile(50) == 0.1
+        assert h.percentile(99) == 1
+        assert h.percentile(100) == float('inf')
+
+    def test_merge(self):
+        a = Histogram((0.1, 1))
+        b = Histogram((0.1, 1))
+        a.observe(0.01)
+        b.observe(0.5)
+        a.merge(b)
+        assert a.counts == [1, 1, 0]
+        assert a.count == 2
+
+class TestMetrics:
+    def test_counters(self):
+        m = Metrics()
+        m.inc('calls', (('parser', 'WoD'),))
+        m.inc('calls', (('parser', 'WoD'),), 2)
+        m.inc('calls', (('parser', 'DH'),))
+        assert m.counter('calls', (('parser', 'WoD'),)) == 3
+        assert m.counter('calls', (('parser', 'WG'),)) == 0
+        assert m.labels('calls', 'parser') == ['DH', 'WoD']
+
+    def test_merge(self):
+        a = Metrics()
+        b = Metrics()
+        a.inc('calls')
+        b.inc('calls', amount=2)
+        b.observe('latency', 0.01)
+        a.merge(b)
+        assert a.counter('calls') == 3
+        assert a.histogram('latency').count == 1
+
+    def test_prometheus(self):
+        m = Metrics()
+        m.inc('dice_total', (('parser', 'WoD'),), 5)
+        m.observe('seconds', 0.003, (('parser', 'WoD'),))
+        text = m.prometheus([('entries', (), 7)])
+        lines = text.splitlines()
+        assert '# TYPE dice_total counter' in lines
+        assert 'dice_total{parser="WoD"} 5' in lines
+        assert '# TYPE entries gauge' in lines
+        assert 'entries 7' in lines
+        assert '# TYPE seconds histogram' in lines
+        assert 'seconds_bucket{parser="WoD",le="0.001"} 0' in lines
+        assert 'seconds_bucket{parser="WoD",le="0.005"} 1' in lines
+        assert 'seconds_bucket{parser="WoD",le="+Inf"} 1' in lines
+        assert 'seconds_count{parser="WoD"} 1' in lines
+        assert text.endswith('\n')
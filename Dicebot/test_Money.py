@@ -29,8 +29,16 @@
 ###
 
 from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+import json
+import threading
+import time
 import pytest
-from .money import MoneyConverter, HttpRequester
+from .money import MoneyConverter, HttpRequester, RateCache, CachedRate, UnknownCurrencyError
+from .money import CurrencyConverterProvider, ExchangeRateApiProvider, ProviderSet, ProviderHealth, NoProviderError
 
 class TestMoney:
     def test_normalize(self):
@@ -73,6 +81,20 @@ class TestMoney:
         assert m.convert(25, "usd", ["грн"]) == "$25: ₴625"
         assert r.query_count == 1
 
+    def test_convert_many(self):
+        r = DummyRequester({"USD_EUR":0.5,"USD_RUB":100,"EUR_USD":2,"EUR_RUB":200,"RUB_USD":0.01,"RUB_EUR":0.005})
+        m = MoneyConverter(r)
+        assert m.convert_many([(5, "$"), (12, "€"), (200, "₽"), (7, "usd")], ["usd", "eur"]) == \
+            "$5: €2.50; €12: $24; 200₽: $2, €1; $7: €3.50"
+        assert r.query_count == 3
+
+    def test_convert_many_single_fetch_per_pair(self):
+        r = DummyRequester({"USD_EUR":0.5})
+        m = MoneyConverter(r)
+        assert m.convert_many([(x, "$") for x in range(1, 30)], ["eur"]).count("€") == 29
+        assert r.query_count == 1
+        assert m.popularity[("USD", "EUR")] == 1
+
     def test_no_op(self):
         r = DummyRequester({"UAH_USD":0.04})
         m = MoneyConverter(r)
@@ -101,6 +123,284 @@ class TestMoney:
         assert m.convert(1, "uah", ["usd"]) == "₴1: $0.04"
         assert r.query_count == 2
 
+    def test_hit_ratio(self):
+        r = DummyRequester({"UAH_USD":0.04})
+        m = MoneyConverter(r)
+        assert m.hit_ratio == 0
+        m.convert(1, "uah", ["usd"])
+        m.convert(1, "uah", ["usd"])
+        m.convert(1, "usd", ["uah"])
+        assert m.misses == 1
+        assert m.hits == 2
+        assert m.hit_ratio == 2 / 3
+
+    def test_popular_pairs(self):
+        r = DummyRequester({"UAH_USD":0.04,"UAH_EUR":0.03,"UAH_RUB":2.5})
+        m = MoneyConverter(r)
+        m.convert(1, "uah", ["usd", "eur"])
+        m.convert(1, "uah", ["eur", "rub"])
+        m.convert(1, "грн", ["eur"])
+        assert m.popular_pairs(1) == [("UAH", "EUR")]
+        assert len(m.popular_pairs(5)) == 3
+
+    def test_prefetch(self):
+        r = DummyRequester({"UAH_USD":0.04,"UAH_EUR":0.03,"UAH_RUB":2.5})
+        m = MoneyConverter(r)
+        m.convert(1, "uah", ["usd", "eur"])
+        m.convert(1, "uah", ["eur"])
+        assert r.query_count == 2
+
+        assert m.prefetch(1) == 0
+        assert r.query_count == 2
+
+        m.cache["UAH_EUR"].created_at = date(1980, 1, 1)
+        m.cache["UAH_USD"].created_at = date(1980, 1, 1)
+        assert m.prefetch(1) == 1
+        assert r.query_count == 3
+        assert r.last_query == "UAH_EUR"
+        assert m.prefetches == 1
+
+        assert m.convert(1, "uah", ["eur"]) == "₴1: €0.03"
+        assert r.query_count == 3
+
+    def test_prefetch_errors(self):
+        r = FailingRequester()
+        m = MoneyConverter(r)
+        m.popularity[("UAH", "USD")] += 1
+        assert m.prefetch(5) == 0
+        assert m.prefetch_errors == 1
+
+    def test_coalescing(self):
+        with StubServer({"USD_EUR":0.9}, delay=0.2) as server:
+            m = MoneyConverter(HttpRequester(server.url))
+            with ThreadPoolExecutor(20) as pool:
+                results = list(pool.map(lambda _: m.convert(1, "usd", ["eur"]), range(20)))
+            assert results == ["$1: €0.90"] * 20
+            assert server.queries == ["USD_EUR"]
+            assert m.coalesced == 19
+            assert m.inflight == {}
+
+    def test_coalescing_per_key(self):
+        with StubServer({"USD_EUR":0.9,"USD_GBP":0.8}, delay=0.2) as server:
+            m = MoneyConverter(HttpRequester(server.url))
+            outputs = [["eur"], ["gbp"]] * 10
+            with ThreadPoolExecutor(20) as pool:
+                list(pool.map(lambda x: m.convert(1, "usd", x), outputs))
+            assert sorted(server.queries) == ["USD_EUR", "USD_GBP"]
+
+    def test_coalescing_error(self):
+        with StubServer({}, delay=0.2) as server:
+            m = MoneyConverter(HttpRequester(server.url))
+            def convert(_):
+                with pytest.raises(UnknownCurrencyError):
+                    m.convert(1, "usd", ["eur"])
+            with ThreadPoolExecutor(5) as pool:
+                list(pool.map(convert, range(5)))
+            assert server.queries == ["USD_EUR"]
+            assert m.inflight == {}
+
+    def test_coalescing_timeout(self):
+        with StubServer({"USD_EUR":0.9}, delay=0.5) as server:
+            m = MoneyConverter(HttpRequester(server.url), fetch_timeout=0.1)
+            leader = threading.Thread(target=m.convert, args=(1, "usd", ["eur"]))
+            leader.start()
+            time.sleep(0.1)
+            with pytest.raises(TimeoutError):
+                m.convert(1, "usd", ["eur"])
+            leader.join()
+            assert server.queries == ["USD_EUR"]
+
+    def test_unknown_currency(self):
+        r = DummyRequester({})
+        m = MoneyConverter(r)
+        with pytest.raises(UnknownCurrencyError):
+            m.convert(200, "foo", ["usd"])
+        with pytest.raises(UnknownCurrencyError):
+            m.convert(200, "foo", ["usd"])
+        with pytest.raises(UnknownCurrencyError):
+            m.convert(200, "usd", ["foo"])
+        assert r.query_count == 1
+        assert len(m.popularity) == 0
+
+    def test_cache_eviction(self):
+        r = DummyRequester({"UAH_USD":0.04,"UAH_EUR":0.03,"UAH_RUB":2.5})
+        m = MoneyConverter(r, cache_size=4)
+        m.convert(1, "uah", ["usd", "eur"])
+        assert len(m.cache) == 4
+        m.convert(1, "uah", ["usd"])
+        m.convert(1, "uah", ["rub"])
+        assert len(m.cache) == 4
+        assert m.cache.evictions == 2
+        assert "UAH_EUR" not in m.cache
+        assert "UAH_USD" in m.cache
+
+class TestRateCache:
+    def test_lru(self):
+        c = RateCache(2)
+        c["a"] = CachedRate(1)
+        c["b"] = CachedRate(2)
+        c["a"]
+        c["c"] = CachedRate(3)
+        assert "a" in c
+        assert "b" not in c
+        assert c.evictions == 1
+
+    def test_bytes(self):
+        c = RateCache(2)
+        assert c.bytes == 0
+        c["a"] = CachedRate(1.5)
+        size = c.bytes
+        assert size > 0
+        c["a"] = CachedRate(2.5)
+        assert c.bytes == size
+        c["b"] = CachedRate(1.5)
+        c["c"] = CachedRate(1.5)
+        assert c.bytes == 2 * size
+
+    def test_purge(self):
+        c = RateCache(10)
+        today = date.today()
+        c["a"] = CachedRate(1)
+        c["b"] = CachedRate(2)
+        c["a"].created_at = date(1980, 1, 1)
+        c["b"].created_at = today
+        assert c.get("b", today).rate == 2
+        assert len(c) == 1
+        assert c.expirations == 1
+        assert c.get("a", today) is None
+
+class TestProviders:
+    def test_exchange_rate_api(self):
+        p = ExchangeRateApiProvider(DummyRequester({"result": "success", "rates": {"EUR": 0.9}}))
+        assert p.get_rate("USD", "EUR") == 0.9
+        with pytest.raises(UnknownCurrencyError):
+            p.get_rate("USD", "FOO")
+        p = ExchangeRateApiProvider(DummyRequester({"result": "error", "error-type": "unsupported-code"}))
+        with pytest.raises(UnknownCurrencyError):
+            p.get_rate("FOO", "EUR")
+
+    def test_p95(self):
+        h = ProviderHealth(default_delay=2)
+        assert h.p95() == 2
+        for x in range(1, 101):
+            h.success(x / 100)
+        assert h.p95() == 0.95
+
+    def test_circuit_breaker(self):
+        h = ProviderHealth(failure_threshold=2, cooldown=0.1)
+        h.failure()
+        assert h.available()
+        h.failure()
+        assert not h.available()
+        time.sleep(0.1)
+        assert h.available()
+        h.success(0.1)
+        assert h.consecutive_failures == 0
+
+    def test_failover(self):
+        with StubServer({"USD_EUR":0.5}, status=500) as failing, \
+                StubServer({"USD_EUR":0.9}) as healthy:
+            m = MoneyConverter(None, providers=providers(failing, healthy))
+            assert m.convert(1, "usd", ["eur"]) == "$1: €0.90"
+            assert failing.queries == ["USD_EUR"]
+            assert healthy.queries == ["USD_EUR"]
+            m.close()
+
+    def test_hedged_request(self):
+        with StubServer({"USD_EUR":0.5}, delay=1) as slow, \
+                StubServer({"USD_EUR":0.9}) as healthy:
+            p = providers(slow, healthy)
+            for health in p.health.values():
+                health.default_delay = 0.05
+            m = MoneyConverter(None, providers=p)
+            start = time.monotonic()
+            assert m.convert(1, "usd", ["eur"]) == "$1: €0.90"
+            assert time.monotonic() - start < 0.5
+            assert slow.queries == ["USD_EUR"]
+            m.close()
+
+    def test_no_hedge_for_fast_primary(self):
+        with StubServer({"USD_EUR":0.9}) as primary, \
+                StubServer({"USD_EUR":0.5}) as secondary:
+            m = MoneyConverter(None, providers=providers(primary, secondary))
+            assert m.convert(1, "usd", ["eur"]) == "$1: €0.90"
+            assert secondary.queries == []
+            m.close()
+
+    def test_circuit_opens(self):
+        with StubServer({}, status=500) as failing, \
+                StubServer({"USD_EUR":0.9}) as healthy:
+            p = providers(failing, healthy)
+            for _ in range(5):
+                assert p.get_rate("USD", "EUR") == 0.9
+            assert len(failing.queries) == 3
+            assert len(healthy.queries) == 5
+            p.close()
+
+    def test_all_failing(self):
+        with StubServer({}, status=500) as first, \
+                StubServer({}, status=500) as second:
+            p = providers(first, second)
+            for _ in range(3):
+                with pytest.raises(Exception):
+                    p.get_rate("USD", "EUR")
+            with pytest.raises(NoProviderError):
+                p.get_rate("USD", "EUR")
+            p.close()
+
+    def test_unknown_everywhere(self):
+        with StubServer({}) as first, StubServer({}) as second:
+            m = MoneyConverter(None, providers=providers(first, second))
+            with pytest.raises(UnknownCurrencyError):
+                m.convert(1, "usd", ["foo"])
+            assert len(first.queries) == len(second.queries) == 1
+            m.close()
+
+def providers(*servers):
+    return ProviderSet([CurrencyConverterProvider(HttpRequester(x.url)) for x in servers])
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    """
+    Local rate server counting the queries, answering in the
+    currencyconverterapi format after an optional delay.
+    """
+    daemon_threads = True
+
+    def __init__(self, rates, delay=0, status=200):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.rates = rates
+        self.delay = delay
+        self.status = status
+        self.queries = []
+        self.url = 'http://127.0.0.1:%d/convert?q={0}' % self.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)['q'][0]
+        self.server.queries.append(query)
+        time.sleep(self.server.delay)
+        body = json.dumps({k: v for (k, v) in self.server.rates.items() if k == query}).encode()
+        self.send_response(self.server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class FailingRequester:
+    def request(self, query):
+        raise ConnectionError(query)
+
 class DummyRequester:
     def __init__(self, response):
         self.response = response
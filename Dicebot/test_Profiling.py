@@ -0,0 +1,117 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import pstats
+import threading
+from .profiling import MethodProfiler
+
+class Plugin:
+    commandArgs = ['self', 'irc', 'msg', 'args']
+
+    def __init__(self):
+        self.messages = []
+
+    def doPrivmsg(self, irc, msg):
+        self._process(irc, msg, msg.upper())
+
+    def _process(self, irc, msg, text):
+        self.messages.append(text)
+
+    def command(self, irc, msg, args, text=None):
+        """help"""
+        return (args, text)
+
+class TestMethodProfiler:
+    def test_shadowing(self, tmp_path):
+        plugin = Plugin()
+        profiler = MethodProfiler(plugin, ['doPrivmsg', '_process', 'command'],
+                                  str(tmp_path / 'out.pstats'))
+        profiler.start()
+        assert 'doPrivmsg' in vars(plugin)
+        assert plugin.command.__doc__ == 'help'
+        assert plugin.command.__func__.__code__.co_varnames[:4] == ('self', 'irc', 'msg', 'args')
+        assert plugin.command(None, None, [1], text='x') == ([1], 'x')
+        plugin.doPrivmsg(None, 'a')
+        assert plugin.messages == ['A']
+        profiler.stop()
+        assert vars(plugin) == {'messages': ['A']}
+
+    def test_stop_after_messages(self, tmp_path):
+        plugin = Plugin()
+        done = []
+        filename = str(tmp_path / 'out.pstats')
+        profiler = MethodProfiler(plugin, ['doPrivmsg', '_process'], filename,
+                                  messages=2, on_done=done.append)
+        profiler.start()
+        plugin.doPrivmsg(None, 'a')
+        assert not done
+        plugin.doPrivmsg(None, 'b')
+        assert done == [filename]
+        assert not profiler.running
+        assert 'doPrivmsg' not in vars(plugin)
+        plugin.doPrivmsg(None, 'c')
+        stats = pstats.Stats(filename)
+        calls = {func[2]: stat[1] for (func, stat) in stats.stats.items()}
+        assert calls['_process'] == 2
+
+    def test_stop_twice(self, tmp_path):
+        done = []
+        profiler = MethodProfiler(Plugin(), ['doPrivmsg'],
+                                  str(tmp_path / 'out.pstats'),
+                                  on_done=done.append)
+        profiler.start()
+        profiler.stop()
+        profiler.stop()
+        assert len(done) == 1
+
+    def test_threads(self, tmp_path):
+        barrier = threading.Barrier(4)
+        class ThreadedPlugin(Plugin):
+            def _process(self, irc, msg, text):
+                # all threads are in a profiled call at the same time
+                barrier.wait(5)
+                super()._process(irc, msg, text)
+        plugin = ThreadedPlugin()
+        filename = str(tmp_path / 'out.pstats')
+        profiler = MethodProfiler(plugin, ['doPrivmsg', '_process'], filename)
+        profiler.start()
+        def run():
+            for _ in range(5):
+                plugin.doPrivmsg(None, 'a')
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        profiler.stop()
+        assert len(plugin.messages) == 20 and profiler.calls == 20
+        stats = pstats.Stats(filename)
+        calls = {func[2]: stat[1] for (func, stat) in stats.stats.items()}
+        assert calls['_process'] == 20
+        assert calls['doPrivmsg'] == 20
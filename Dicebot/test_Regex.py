@@ -0,0 +1,115 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import re
+import time
+import pytest
+from .engine import DiceEngine
+from .plugin import Dicebot
+
+# Timing fuzzer for the class-level regexes of the engine and the plugin. Inputs are long
+# repetitions of short fragments built from the pattern alphabets, which is
+# what makes backtracking regexes go quadratic. The worst input found at
+# SMALL_SIZE is timed again at INPUT_SIZE.
+
+SMALL_SIZE = 1024
+INPUT_SIZE = 10240
+TIME_BOUND = 0.05
+# linear patterns grow about 10 times from SMALL_SIZE to INPUT_SIZE
+GROWTH_BOUND = 40
+
+PREFIXES = ['', '1', '$', '1#', '1d', '(', '+']
+FRAGMENTS = ['1', '1+', '+1', '-', '1-1', '1d', 'd1', '1d1+', '1,', ',1',
+             '1.', '.1', '1.1', '$1', '1$', '€', '1 a', ' a', 'a', '1 ', ' 1',
+             '1k', 'k1', '1#', '1s', 'ex', 'l1', 'w', 'vs(', '#sd', ',1#']
+SUFFIXES = ['', 'x', '!', ' ', '1', ')', 'a', '$']
+
+Pattern = type(re.compile(''))
+OWNERS = {name: cls for cls in (DiceEngine, Dicebot)
+          for (name, value) in vars(cls).items() if isinstance(value, Pattern)}
+PATTERNS = sorted(OWNERS)
+
+# money() scans its whole argument, roll expressions are matched per word
+SCANNED = {'convertMoney'}
+
+
+def operation(name):
+    pattern = getattr(OWNERS[name], name)
+    if name in SCANNED:
+        return lambda s: list(pattern.finditer(s))
+    return pattern.match
+
+
+def build(prefix, fragment, suffix, size):
+    return prefix + fragment * ((size - len(prefix)) // len(fragment)) + suffix
+
+
+def shapes():
+    for prefix in PREFIXES:
+        for fragment in FRAGMENTS:
+            for suffix in SUFFIXES:
+                yield (prefix, fragment, suffix)
+
+
+def timed(function, s, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(s)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def worst_shape(function):
+    return max(shapes(),
+               key=lambda shape: timed(function, build(*shape, SMALL_SIZE), 1))
+
+
+class TestRegex:
+    def test_patterns_found(self):
+        assert 'convertMoney' in PATTERNS
+        assert 'rollRe7Sea2ed' in PATTERNS
+
+    @pytest.mark.parametrize('name', PATTERNS)
+    def test_linear(self, name):
+        function = operation(name)
+        shape = worst_shape(function)
+        small_time = timed(function, build(*shape, SMALL_SIZE))
+        large_time = timed(function, build(*shape, INPUT_SIZE))
+        assert large_time < TIME_BOUND, (shape, large_time)
+        assert large_time < max(small_time, 1e-5) * GROWTH_BOUND, \
+            (shape, small_time, large_time)
+
+    def test_money_matches(self):
+        pattern = Dicebot.convertMoney
+        assert [m.group(0) for m in pattern.finditer('$5 12,5 eur, .5usd rub')] == \
+            ['$5', '12,5 eur,', '.5usd rub']
+        assert [m.group('s_amount') for m in pattern.finditer('1234usd 1.5.3 usd')] == \
+            ['1234', '1.5', '3']
+        assert not list(pattern.finditer('1' * 100))
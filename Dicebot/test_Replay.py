@@ -0,0 +1,99 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import io
+import os
+import subprocess
+import sys
+from .replay import LogLine, Replay, CountingIrc, parse_irssi, parse_weechat, read_log
+
+class Plugin:
+    def __init__(self):
+        self.messages = []
+
+    def doPrivmsg(self, irc, msg):
+        self.messages.append((msg.command, msg.prefix, msg.args))
+        if 'd' in msg.args[1]:
+            irc.reply('rolled')
+
+
+class TestReplay:
+    def test_main(self, tmpdir):
+        tmpdir.join('irc.log').write('12:34 <gm> I roll 1d20\n'
+                                     '12:35 <bob> hi\n'
+                                     '12:36 <bob> 3w please\n')
+        path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run(
+            [sys.executable, '-m', 'Dicebot.replay', 'irc.log'],
+            cwd=str(tmpdir), env=dict(os.environ, PYTHONPATH=path),
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            universal_newlines=True)
+        assert result.returncode == 0, result.stdout
+        assert 'messages: 3 in ' in result.stdout
+        assert 'replies: 2 (0 errors)' in result.stdout
+
+    def test_irssi(self):
+        assert parse_irssi('12:34 <@gm> 3d6 please') == LogLine(45240, 'gm', '3d6 please', False)
+        assert parse_irssi('12:34:56 < alice> hi') == LogLine(45296, 'alice', 'hi', False)
+        assert parse_irssi('12:34  * bob rolls 1d20') == LogLine(45240, 'bob', 'rolls 1d20', True)
+        assert parse_irssi('12:34 -!- gm [~gm@host] has joined #dnd') is None
+        assert parse_irssi('--- Day changed Tue Oct 20 2026') is None
+
+    def test_weechat(self):
+        line = parse_weechat('2026-10-19 12:34:56\t@gm\t3d6 please')
+        assert (line.nick, line.text, line.action) == ('gm', '3d6 please', False)
+        assert parse_weechat('2026-10-19 12:34:57\t *\tbob rolls 1d20')[1:] == ('bob', 'rolls 1d20', True)
+        assert parse_weechat('2026-10-19 12:34:58\t-->\tgm (~gm@host) has joined #dnd') is None
+        assert parse_weechat('2026-10-19 12:34:58\t--\tMode #dnd [+o gm]') is None
+
+    def test_read_log(self):
+        log = io.StringIO('23:59 <gm> 1d6\n'
+                          '--- Day changed Tue Oct 20 2026\n'
+                          '00:01 <gm> 2d6\n'
+                          '2026-10-20 00:02:00\tgm\tthree\n')
+        records = list(read_log(log))
+        assert [r.text for r in records] == ['1d6', '2d6', 'three']
+        assert records[1].time - records[0].time == 120
+
+    def test_replay(self):
+        plugin = Plugin()
+        irc = CountingIrc()
+        replay = Replay(plugin, irc, '#dnd')
+        replay.run(read_log(io.StringIO('12:00 <gm> 1d6\n12:00  * bob waves\n12:01 <gm> 2d6\n')))
+        assert plugin.messages[0] == ('PRIVMSG', 'gm!gm@replay', ('#dnd', '1d6'))
+        assert plugin.messages[1] == ('PRIVMSG', 'bob!bob@replay', ('#dnd', '\x01ACTION waves\x01'))
+        assert replay.messages == 3
+        assert irc.replyCount == 2
+        assert replay.latency.count == 3
+        assert 'messages: 3 in' in replay.report()
+
+    def test_limit(self):
+        replay = Replay(Plugin())
+        replay.run(read_log(['12:00 <gm> hi\n'] * 10), limit=4)
+        assert replay.messages == 4
@@ -0,0 +1,122 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import logging
+import os
+import random
+import threading
+import time
+import pytest
+from .rollpool import RollPool, PoolBusyError
+
+pytestmark = pytest.mark.skipif(not RollPool.available, reason="fork is not available")
+
+class Result:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+    def callback(self, value):
+        self.value = value
+        self.event.set()
+
+    def errback(self, error):
+        self.error = error
+        self.event.set()
+
+def submit(pool, function, *args):
+    result = Result()
+    pool.submit(function, args, result.callback, result.errback)
+    return result
+
+def fail():
+    raise ValueError("bad roll")
+
+def logging_enabled():
+    return logging.getLogger('Dicebot').isEnabledFor(logging.CRITICAL)
+
+class TestRollPool:
+    def test_result(self):
+        pool = RollPool(2, 5)
+        r = submit(pool, os.getpid)
+        assert r.event.wait(5)
+        assert r.error is None
+        assert r.value != os.getpid()
+        assert pool.completed == 1
+        assert not pool.running
+
+    def test_error(self):
+        pool = RollPool(2, 5)
+        r = submit(pool, fail)
+        assert r.event.wait(5)
+        assert str(r.error) == "ValueError: bad roll"
+        assert pool.failed == 1
+
+    def test_timeout(self):
+        pool = RollPool(2, 0.2)
+        start = time.monotonic()
+        r = submit(pool, time.sleep, 10)
+        assert r.event.wait(5)
+        assert isinstance(r.error, TimeoutError)
+        assert time.monotonic() - start < 5
+        assert pool.timeouts == 1
+        assert not pool.running
+
+    def test_busy(self):
+        pool = RollPool(1, 5)
+        slow = submit(pool, time.sleep, 0.3)
+        with pytest.raises(PoolBusyError):
+            submit(pool, os.getpid)
+        assert pool.rejected == 1
+        assert slow.event.wait(5)
+        fast = submit(pool, os.getpid)
+        assert fast.event.wait(5)
+
+    def test_close(self):
+        pool = RollPool(1, 5)
+        r = submit(pool, time.sleep, 10)
+        pool.close()
+        assert r.event.wait(5)
+        assert isinstance(r.error, RuntimeError)
+
+    def test_independent_random(self):
+        pool = RollPool(2, 5)
+        r1 = submit(pool, random.random)
+        r2 = submit(pool, random.random)
+        assert r1.event.wait(5) and r2.event.wait(5)
+        assert r1.value != r2.value
+
+    def test_no_logging(self):
+        # log handler locks may be held by other threads at the fork
+        pool = RollPool(1, 5)
+        r = submit(pool, logging_enabled)
+        assert r.event.wait(5)
+        assert r.value is False
+        assert logging_enabled()
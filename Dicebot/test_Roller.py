@@ -107,6 +107,19 @@ class TestRoller:
         ).roll_and_count(7)
         assert str(rolls) == "6 raises: **(10 + 5), **(10 + 5), **(6 + 4x + 4 + 3x), unused: 3, discarded: 2r"
 
+    def test_lashes(self):
+        rolls = SevenSea2EdRaiseRoller(
+            RerollRoller([9, 1, 1]).roll,
+            lash_count=2
+        ).roll_and_count(3)
+        assert str(rolls) == "0 raises, unused: 9, 0 [1], 0 [1]"
+
+        rolls = SevenSea2EdRaiseRoller(
+            RerollRoller([9, 1, 6, 1]).roll,
+            lash_count=2
+        ).roll_and_count(4)
+        assert str(rolls) == "1 raise: *(9 + 6), unused: 0 [1], 0 [1]"
+
     # will wait boosting trees
     # def test_optimal_solution_is_one_step_up3(self):
     #     rolls = SevenSea2EdRaiseRoller(
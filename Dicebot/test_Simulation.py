@@ -0,0 +1,107 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import pytest
+from .simulation import (Collector, RaiseHistogram, chunkSeeds, runChunk,
+                         simulate, split, summary)
+
+class TestRaiseHistogram:
+    def test_stats(self):
+        h = RaiseHistogram()
+        for raises in (0, 2, 2, 3, 5):
+            h.add(raises)
+        assert h.counts == [1, 0, 2, 1, 0, 1]
+        assert h.mean == 2.4
+        assert h.percentile(10) == 0
+        assert h.percentile(50) == 2
+        assert h.percentile(100) == 5
+        other = RaiseHistogram()
+        other.add(7, 5)
+        h.merge(other)
+        assert (h.count, h.sum, h.percentile(90)) == (10, 47, 7)
+
+    def test_empty(self):
+        h = RaiseHistogram()
+        assert (h.mean, h.percentile(50)) == (0.0, 0)
+
+class TestSimulation:
+    def test_split(self):
+        assert split(10, 3) == [4, 3, 3]
+        assert split(2, 4) == [1, 1]
+        assert split(5, 0) == [5]
+
+    def test_seeds(self):
+        assert chunkSeeds(1, 4) == chunkSeeds(1, 4)
+        assert len(set(chunkSeeds(1, 4))) == 4
+        assert chunkSeeds(None, 2) != chunkSeeds(None, 2)
+
+    def test_chunk(self):
+        h = runChunk('4s2', 300, 5)
+        assert h.count == 300
+        assert runChunk('4s2', 300, 5).counts == h.counts
+        assert 0 < h.mean < 4
+
+    def test_lashes(self):
+        h = runChunk('20s3l2', 300, 5)
+        assert h.count == 300
+        assert h.mean > 1
+
+    def test_summary(self):
+        h = RaiseHistogram()
+        h.add(0, 3)
+        h.add(4)
+        assert summary(h).endswith('most common: 0 (75.0%), 4 (25.0%)')
+
+    def test_simulate(self):
+        h = simulate('6s3l1', 400, workers=2, seed=9)
+        expected = RaiseHistogram()
+        for (size, seed) in zip(split(400, 2), chunkSeeds(9, 2)):
+            expected.merge(runChunk('6s3l1', size, seed))
+        assert h.counts == expected.counts
+        assert summary(h).startswith('mean ')
+        with pytest.raises(ValueError):
+            simulate('4d6', 10)
+        with pytest.raises(ValueError):
+            simulate('40s2', 10)
+
+    def test_collector(self):
+        results = []
+        collector = Collector(2, results.append, results.append)
+        h = RaiseHistogram()
+        h.add(2)
+        collector.add(h)
+        assert results == []
+        collector.add(h)
+        assert results[0].count == 2
+        collector = Collector(2, results.append, results.append)
+        collector.fail('boom')
+        collector.fail('again')
+        collector.add(h)
+        collector.add(h)
+        assert results[1:] == ['boom']
@@ -0,0 +1,102 @@
+###
+# Copyright (c) 2026, Andrey Rahmatullin
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions, and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions, and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#   * Neither the name of the author of this software nor the name of
+#     contributors to this software may be used to endorse or promote products
+#     derived from this software without specific prior written consent.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+###
+
+import math
+import pickle
+from .engine import DiceEngine
+from .stats import DiceStats, DieStats, Tally
+
+class TestDieStats:
+    def test_counters(self):
+        s = DieStats(6)
+        s.add([1, 6, 6])
+        s.add([3])
+        assert (s.counts, s.count, s.total, s.squares) == \
+            ([1, 0, 1, 0, 0, 2], 4, 16, 82)
+        assert s.mean() == 4
+        assert math.isclose(s.stddev(), math.sqrt(6))
+        other = DieStats(6)
+        other.add([2, 2])
+        s.merge(other)
+        assert (s.counts, s.count, s.total) == ([1, 2, 1, 0, 0, 2], 6, 20)
+        assert pickle.loads(pickle.dumps(s)).counts == s.counts
+
+    def test_chi_square(self):
+        fair = DieStats(6, [100] * 6, 2100, 9100)
+        assert fair.chiSquare() == 0
+        assert fair.pValue() > 0.99
+        loaded = DieStats(6, [50, 50, 50, 50, 50, 350], 2850, 0)
+        assert math.isclose(loaded.chiSquare(), 750)
+        assert loaded.pValue() < 0.001
+        # 11.07 is the 95th percentile of chi-square with 5 degrees of freedom
+        s = DieStats(6, [80, 120, 85, 115, 100, 100])
+        assert math.isclose(s.chiSquare(), 12.5)
+        assert 0.02 < s.pValue() < 0.05
+        assert DieStats(20).chiSquare() == 0
+
+class TestDiceStats:
+    def test_engine_tally(self):
+        engine = DiceEngine()
+        engine.tally = Tally()
+        engine.evaluate('3#2d6 4w 1d20')
+        dice = engine.tally.dice
+        assert dice[6].count == 6
+        assert dice[20].count == 1
+        assert dice[10].count >= 4
+        assert dice[6].total == sum(i * n for (i, n) in
+                                    enumerate(dice[6].counts, 1))
+
+    def test_save_load(self, tmpdir):
+        path = str(tmpdir.join('stats.json'))
+        stats = DiceStats(path)
+        stats.load()
+        assert stats.get('nick') == []
+        tally = Tally()
+        tally.add(20, [20, 1])
+        tally.add(6, [3])
+        stats.add('nick', tally)
+        stats.add('nick', tally)
+        stats.add('other', Tally())
+        # the tally is copied, not shared
+        tally.add(6, [6])
+        assert [(s.sides, s.count, s.total) for s in stats.get('nick')] == \
+            [(6, 2, 6), (20, 4, 42)]
+        assert stats.get('other') == []
+        stats.save()
+        assert not stats.dirty
+        mtime = tmpdir.join('stats.json').mtime()
+        tmpdir.join('stats.json').setmtime(mtime - 10)
+        stats.save()
+        assert tmpdir.join('stats.json').mtime() == mtime - 10
+        loaded = DiceStats(path)
+        loaded.load()
+        assert [(s.sides, s.counts, s.count, s.total, s.squares)
+                for s in loaded.get('nick')] == \
+            [(s.sides, s.counts, s.count, s.total, s.squares)
+             for s in stats.get('nick')]